@@ -29,10 +29,14 @@
     #'data/museo_models_data.xml',
     'data/museo_demo.xml',
     'data/museo_categoria_data.xml',
+    'data/museo_config_data.xml',
+    'data/museo_cron_data.xml',
     
     'views/res_partner_views.xml',
     'views/museo_views.xml',
     'views/objeto_views.xml',
+    'views/objeto_analitica_views.xml',
+    'views/objeto_conservacion_views.xml',
     'views/historia_barrio_views.xml',
     'views/convenio_views.xml',
     'views/actividad_views.xml',
@@ -56,7 +60,9 @@
     'views/menu_views.xml',
 
     'templates/museo_landing.xml',
-    'templates/museo_templates.xml',
+    'templates/museo_objetos.xml',
+    'templates/museo_secciones.xml',
+    'templates/museo_busqueda.xml',
     'templates/layout_museo.xml',
     'templates/historia_barrio_detalle.xml',
     
@@ -1,13 +1,178 @@
 # -*- coding: utf-8 -*-
 from odoo import http
-from odoo.http import request
+from odoo.http import request, Response, content_disposition
+from odoo.tools import lazy, SQL, date_utils, html2plaintext
+from urllib.parse import urlencode
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+from ..models.museo_imagen_mixin import MODELOS_IMAGEN_PUBLICA
+import base64
+import binascii
+import hashlib
+import json
 import logging
+import threading
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Fotos de la galería incluidas en la primera carga y en cada página JSON
+FOTOS_POR_PAGINA = 8
+
+# Secciones de la página del museo: modelo, registros mostrados en la
+# portada, registros por página en el listado completo y campos que se
+# precargan de una vez para el lote
+SECCIONES_MUSEO = {
+    'actividades': {
+        'modelo': 'museo.actividad',
+        'limite': 6,
+        'por_pagina': 20,
+        'plantilla': 'museos.museo_actividades_template',
+        'campos': ['name', 'fecha_inicio', 'tipo_actividad', 'sala', 'descripcion'],
+    },
+    'objetos': {
+        'modelo': 'museo.objeto',
+        'limite': 12,
+        'campos': ['name', 'categoria', 'codigo_inventario', 'estado_conservacion',
+                   'historia', 'valor_estimado', 'ubicacion_actual'],
+    },
+    'historias': {
+        'modelo': 'museo.historia.barrio',
+        'limite': 6,
+        'por_pagina': 18,
+        'plantilla': 'museos.museo_historias_template',
+        'campos': ['name', 'fuente', 'fecha_registro', 'barrio', 'ciudad', 'estado_investigacion',
+                   'extracto', 'extracto_testimonio', 'minutos_lectura', 'investigador_responsable'],
+    },
+    'convenios': {
+        'modelo': 'museo.convenio',
+        'limite': 6,
+        'por_pagina': 18,
+        'plantilla': 'museos.museo_convenios_template',
+        'campos': ['name', 'estado', 'partner_id', 'tipo_convenio', 'fecha_inicio', 'fecha_fin',
+                   'monto', 'descripcion', 'responsable_museo'],
+    },
+}
+
+# API pública de museos: tamaño de página por defecto y máximo
+API_LIMITE = 20
+API_LIMITE_MAXIMO = 100
+# Campos que se pueden pedir con fields=; los almacenados se leen en un solo
+# read() y el resto se derivan de ellos
+API_CAMPOS_ALMACENADOS = (
+    'name', 'direccion', 'telefono', 'email', 'website', 'fecha_creacion',
+    'total_objetos', 'total_actividades', 'total_convenios',
+)
+API_CAMPOS_DERIVADOS = ('url', 'imagen', 'descripcion_corta')
+API_CAMPOS_DEFECTO = ('name', 'total_objetos', 'url')
+
+# Campos del equipo mostrados en la página del museo
+CAMPOS_TRABAJADOR = ['name', 'cargo', 'especialidad', 'fecha_ingreso', 'horas_semanales']
+
+# Objetos por página del catálogo público
+OBJETOS_POR_PAGINA = 20
+
+# Páginas del catálogo servidas sin clave desde cada extremo (con offset) y
+# saltos máximos desde la clave de la página actual: ninguna consulta del
+# catálogo salta más de PAGINAS_SIN_CLAVE páginas
+PAGINAS_SIN_CLAVE = 3
+
+# Búsquedas permitidas por IP y ventana de segundos, en cada proceso del
+# servidor: el tráfico de búsqueda no puede saturar la base de datos
+BUSQUEDAS_POR_IP = 20
+VENTANA_BUSQUEDAS = 60
+_busquedas_por_ip = {'ventana': None, 'contadores': {}}
+_bloqueo_busquedas = threading.Lock()
+
+
+def _permitir_busqueda(ip):
+    """Cuenta una búsqueda de la IP en la ventana actual; False si la IP ya
+    agotó su cupo. Los contadores se descartan al cambiar de ventana"""
+    ventana = int(time.time() // VENTANA_BUSQUEDAS)
+    with _bloqueo_busquedas:
+        if _busquedas_por_ip['ventana'] != ventana:
+            _busquedas_por_ip['ventana'] = ventana
+            _busquedas_por_ip['contadores'] = {}
+        contadores = _busquedas_por_ip['contadores']
+        if contadores.get(ip, 0) >= BUSQUEDAS_POR_IP:
+            return False
+        contadores[ip] = contadores.get(ip, 0) + 1
+        return True
+
+# Filas leídas por consulta al generar el sitemap
+SITEMAP_LOTE = 1000
+
+# Zoom máximo del mapa de historias; a partir de ahí la rejilla no se afina
+ZOOM_MAXIMO_MAPA = 20
+
+
+def _filas_sitemap(env, consulta):
+    """Recorre por lotes, en orden de id, las filas (id, ...) de una consulta
+    cuyo alias principal es ``t``. Cada lote es una consulta por clave sobre
+    la clave primaria: no se cargan todos los registros y el generador puede
+    abandonarse sin dejar nada abierto."""
+    ultimo_id = 0
+    while True:
+        env.cr.execute(SQL("%s AND t.id > %s ORDER BY t.id LIMIT %s", consulta, ultimo_id, SITEMAP_LOTE))
+        filas = env.cr.fetchall()
+        yield from filas
+        if len(filas) < SITEMAP_LOTE:
+            return
+        ultimo_id = filas[-1][0]
+
+
+def _loc_sitemap(loc, lastmod, qs):
+    """Entrada del sitemap, o None si no coincide con la búsqueda ``qs``"""
+    if not qs or qs.lower() in loc:
+        return {'loc': loc, 'lastmod': lastmod.date()} if lastmod else {'loc': loc}
+    return None
+
+
+def sitemap_museos(env, rule, qs):
+    """Páginas de los museos activos. Su fecha de publicación se mueve con
+    cualquier cambio de su contenido"""
+    consulta = SQL("SELECT t.id, t.fecha_publicacion FROM museo_museo t WHERE t.active")
+    for museo_id, publicacion in _filas_sitemap(env, consulta):
+        loc = _loc_sitemap(f'/museos/{museo_id}', publicacion, qs)
+        if loc:
+            yield loc
+
+
+def sitemap_objetos(env, rule, qs):
+    """Páginas del catálogo de objetos de cada museo, según su contador
+    almacenado de objetos"""
+    consulta = SQL("SELECT t.id, t.fecha_publicacion, t.total_objetos FROM museo_museo t WHERE t.active")
+    for museo_id, publicacion, total_objetos in _filas_sitemap(env, consulta):
+        if not total_objetos:
+            continue
+        paginas = -(-total_objetos // OBJETOS_POR_PAGINA)
+        for pagina in range(1, paginas + 1):
+            if min(pagina - 1, paginas - pagina) > PAGINAS_SIN_CLAVE:
+                continue
+            url = f'/museos/{museo_id}/objetos' + (f'/page/{pagina}' if pagina > 1 else '')
+            loc = _loc_sitemap(url, publicacion, qs)
+            if loc:
+                yield loc
+
+
+def sitemap_historias(env, rule, qs):
+    """Fichas de las historias de barrio publicadas en museos activos. La
+    ficha muestra también datos del museo, de ahí el GREATEST"""
+    consulta = SQL("""
+        SELECT t.id, GREATEST(t.write_date, m.fecha_publicacion)
+          FROM museo_historia_barrio t
+          JOIN museo_museo m ON m.id = t.museo_id
+         WHERE t.active AND m.active
+    """)
+    for historia_id, write_date in _filas_sitemap(env, consulta):
+        loc = _loc_sitemap(f'/historia/barrio/{historia_id}', write_date, qs)
+        if loc:
+            yield loc
+
+
 class MuseoController(http.Controller):
     
-    @http.route('/museos/<int:museo_id>', type='http', auth='public', website=True)
+    @http.route('/museos/<int:museo_id>', type='http', auth='public', website=True,
+                sitemap=sitemap_museos)
     def museo_detalle(self, museo_id, **kwargs):
         """Mostrar detalle completo de un museo"""
         try:
@@ -19,11 +184,32 @@ class MuseoController(http.Controller):
             if not museo:
                 return request.render('website.404')
             
+            # Cualquier cambio en el contenido de la página incrementa la versión
+            # pública del museo y mueve su fecha de publicación
+            no_modificado = self._comprobar_no_modificado(
+                ('museo', museo.id, museo.version_publica), museo.fecha_publicacion
+            )
+            if no_modificado:
+                return no_modificado
+            
+            # Solo la primera página de la galería; el resto se carga al desplazarse.
+            # Diferidos: si el fragmento está en caché no se consultan
+            galeria = lazy(lambda: self._fotos_galeria(museo))
+            
             # Preparar datos adicionales
             valores = {
                 'museo': museo,
+                'fotos_galeria': lazy(lambda: galeria[0]),
+                'total_fotos': lazy(lambda: galeria[1]),
+                'fotos_por_pagina': FOTOS_POR_PAGINA,
+                'trabajadores': lazy(lambda: self._trabajadores_museo(museo)),
                 'format_amount': self._format_amount,
             }
+            # Cada sección recibe un lote acotado y ya ordenado, y su total
+            # para el enlace "ver todos"
+            for seccion in SECCIONES_MUSEO:
+                valores[seccion] = lazy(lambda seccion=seccion: self._registros_seccion(museo, seccion))
+                valores[f'total_{seccion}'] = lazy(lambda seccion=seccion: self._total_seccion(museo, seccion))
             
             return request.render('museos.museo_template', valores)
             
@@ -35,6 +221,10 @@ class MuseoController(http.Controller):
     def museo_lista(self, **kwargs):
         """Listar todos los museos"""
         try:
+            no_modificado = self._comprobar_no_modificado(('museos', *self._sello_museos()))
+            if no_modificado:
+                return no_modificado
+            
             museos = request.env['museo.museo'].sudo().search([
                 ('active', '=', True)
             ], order='name')
@@ -49,13 +239,478 @@ class MuseoController(http.Controller):
             _logger.error(f"Error al listar museos: {e}")
             return request.render('website.500')
     
+    @http.route(['/museos/<int:museo_id>/objetos', '/museos/<int:museo_id>/objetos/page/<int:page>'],
+                type='http', auth='public', website=True, sitemap=sitemap_objetos)
+    def museo_objetos(self, museo_id, page=1, despues=None, antes=None, salto=None, **kwargs):
+        """Catálogo de objetos de un museo con navegación por facetas.
+        
+        Los enlaces a otras páginas llevan la clave (name, id) del borde de
+        la página actual en ``antes``/``despues`` y, en ``salto``, las páginas
+        que hay entre medias. Solo las PAGINAS_SIN_CLAVE primeras y últimas
+        páginas se sirven sin clave; el resto redirige a la primera.
+        """
+        Museo = request.env['museo.museo'].sudo()
+        Objeto = request.env['museo.objeto'].sudo()
+        
+        museo = Museo.browse(museo_id)
+        if not museo.exists() or not museo.active:
+            return request.not_found()
+        
+        # Las facetas cuentan objetos de todos los museos: la página depende
+        # del estado de todo el catálogo
+        no_modificado = self._comprobar_no_modificado(('catalogo', *self._sello_museos()))
+        if no_modificado:
+            return no_modificado
+        
+        # El museo de la URL actúa como filtro de la faceta "museo"
+        filtros = Objeto._normalizar_filtros_catalogo(dict(kwargs, museo_id=museo.id))
+        facetas = Objeto.get_facetas_catalogo(dict(filtros))
+        
+        url_args = {faceta: valor for faceta, valor in filtros if faceta != 'museo_id'}
+        # Sin más filtros que el museo, su contador almacenado es el total
+        total = facetas['total'] if url_args else museo.total_objetos
+        pager = request.website.pager(
+            url=f'/museos/{museo.id}/objetos',
+            total=total,
+            page=page,
+            step=OBJETOS_POR_PAGINA,
+            scope=2 * PAGINAS_SIN_CLAVE + 1,
+            url_args=url_args,
+        )
+        pagina, paginas = pager['page']['num'], pager['page_count']
+        
+        clave_despues, clave_antes = self._decodificar_clave(despues), self._decodificar_clave(antes)
+        if clave_despues or clave_antes:
+            try:
+                salto = min(max(int(salto or 0), 0), PAGINAS_SIN_CLAVE)
+            except ValueError:
+                salto = 0
+            objetos = Objeto._buscar_catalogo(
+                filtros, limit=OBJETOS_POR_PAGINA, offset=salto * OBJETOS_POR_PAGINA,
+                despues=clave_despues, antes=clave_antes,
+            )
+        elif pagina - 1 <= PAGINAS_SIN_CLAVE:
+            objetos = Objeto._buscar_catalogo(filtros, limit=OBJETOS_POR_PAGINA, offset=pager['offset'])
+        elif paginas - pagina <= PAGINAS_SIN_CLAVE:
+            # Objetos detrás de esta página (negativo en la última, que está incompleta)
+            siguientes = total - pagina * OBJETOS_POR_PAGINA
+            objetos = Objeto._buscar_catalogo(
+                filtros, limit=OBJETOS_POR_PAGINA + min(siguientes, 0),
+                offset=max(siguientes, 0), desde_final=True,
+            )
+        else:
+            return request.redirect(self._url_catalogo(museo.id, url_args, 'museo_id'))
+        
+        if objetos:
+            objetos.fetch(['name'])
+            url_pagina = f'/museos/{museo.id}/objetos/page/%s'
+            primero, ultimo = self._codificar_clave(objetos[0]), self._codificar_clave(objetos[-1])
+            enlaces = [pager['page_previous'], pager['page_next'], pager['page_start'], pager['page_end'], *pager['pages']]
+            for enlace in enlaces:
+                num = enlace['num']
+                # La primera y la última página se sirven sin clave
+                if num in (1, paginas, pagina):
+                    continue
+                clave = {'despues': ultimo} if num > pagina else {'antes': primero}
+                enlace['url'] = f"{url_pagina % num}?" + urlencode(
+                    dict(url_args, **clave, salto=abs(num - pagina) - 1))
+        
+        museos_faceta = Museo.browse([valor for valor, _total in facetas['museo_id']])
+        valores = {
+            'museo': museo,
+            'objetos': objetos,
+            'pager': pager,
+            'facetas': facetas,
+            'total': total,
+            'filtros': dict(filtros),
+            'nombres_museos': {m.id: m.name for m in museos_faceta},
+            'etiquetas_categoria': dict(Objeto._fields['categoria'].selection),
+            'etiquetas_estado': dict(Objeto._fields['estado_conservacion'].selection),
+            'url_faceta': lambda faceta, valor=None: self._url_catalogo(museo.id, url_args, faceta, valor),
+        }
+        return request.render('museos.museo_objetos_template', valores)
+    
+    @http.route(['/museos/<int:museo_id>/<any(actividades,historias,convenios):seccion>',
+                 '/museos/<int:museo_id>/<any(actividades,historias,convenios):seccion>/page/<int:page>'],
+                type='http', auth='public', website=True)
+    def museo_seccion(self, museo_id, seccion, page=1, **kwargs):
+        """Listado completo y paginado de una sección de la página del museo"""
+        museo = request.env['museo.museo'].sudo().browse(museo_id)
+        if not museo.exists() or not museo.active:
+            return request.not_found()
+        
+        no_modificado = self._comprobar_no_modificado(
+            ('seccion', museo.id, museo.version_publica), museo.fecha_publicacion
+        )
+        if no_modificado:
+            return no_modificado
+        
+        config = SECCIONES_MUSEO[seccion]
+        total = self._total_seccion(museo, seccion)
+        pager = request.website.pager(
+            url=f'/museos/{museo.id}/{seccion}',
+            total=total,
+            page=page,
+            step=config['por_pagina'],
+            scope=7,
+        )
+        registros = self._registros_seccion(
+            museo, seccion, limit=config['por_pagina'], offset=pager['offset']
+        )
+        valores = {
+            'museo': museo,
+            'registros': registros,
+            'total': total,
+            'pager': pager,
+        }
+        return request.render(config['plantilla'], valores)
+    
+    def _registros_seccion(self, museo, seccion, limit=None, offset=0):
+        """Registros de una sección en el orden del modelo (desempatando por
+        id para paginar de forma estable), con sus campos precargados en una
+        sola lectura"""
+        config = SECCIONES_MUSEO[seccion]
+        Modelo = request.env[config['modelo']].sudo()
+        registros = Modelo.search(
+            [('museo_id', '=', museo.id)],
+            limit=limit or config['limite'],
+            offset=offset,
+            order=f'{Modelo._order}, id desc'
+        )
+        registros.fetch(config['campos'])
+        return registros
+    
+    def _total_seccion(self, museo, seccion):
+        """Total de registros de una sección; los contadores almacenados del
+        museo evitan un COUNT cuando existen"""
+        if f'total_{seccion}' in museo._fields:
+            return museo[f'total_{seccion}']
+        return request.env[SECCIONES_MUSEO[seccion]['modelo']].sudo().search_count([('museo_id', '=', museo.id)])
+    
+    @http.route('/museos/<int:museo_id>/galeria/json', type='http', auth='public',
+                methods=['GET'], website=True, sitemap=False)
+    def museo_galeria_json(self, museo_id, page=1, **kwargs):
+        """Página de la galería en JSON para la carga diferida"""
+        museo = request.env['museo.museo'].sudo().browse(museo_id)
+        if not museo.exists() or not museo.active:
+            return request.not_found()
+        
+        try:
+            page = max(int(page), 1)
+        except ValueError:
+            page = 1
+        fotos, total = self._fotos_galeria(museo, page)
+        return request.make_json_response({
+            'pagina': page,
+            'total': total,
+            'hay_mas': page * FOTOS_POR_PAGINA < total,
+            'fotos': [{
+                'id': foto.id,
+                'nombre': foto.name,
+                'categoria': foto.categoria or '',
+                'descripcion': foto.descripcion or '',
+                'principal': foto.es_imagen_principal,
+                'imagen': foto._url_imagen('portada'),
+                'miniatura': foto._url_imagen('tarjeta'),
+                'srcset': foto._srcset_imagen(),
+            } for foto in fotos],
+        })
+    
+    @http.route('/api/museos', type='http', auth='public', methods=['GET'],
+                website=True, sitemap=False)
+    def api_museos(self, limit=API_LIMITE, cursor=None, fields=None, **kwargs):
+        """Lista de museos activos en JSON, paginada por cursor.
+        
+        ``cursor`` es el valor ``siguiente`` de la respuesta anterior y
+        ``fields`` una lista separada por comas de los campos deseados.
+        """
+        try:
+            limit = min(max(int(limit), 1), API_LIMITE_MAXIMO)
+            ultimo_id = int(base64.urlsafe_b64decode(cursor.encode()).decode()) if cursor else 0
+        except (ValueError, binascii.Error):
+            return self._respuesta_api({'error': 'Parámetros limit o cursor no válidos'}, status=400)
+        
+        campos = [campo.strip() for campo in fields.split(',') if campo.strip()] if fields else list(API_CAMPOS_DEFECTO)
+        desconocidos = set(campos) - set(API_CAMPOS_ALMACENADOS) - set(API_CAMPOS_DERIVADOS)
+        if desconocidos:
+            return self._respuesta_api({'error': f"Campos desconocidos: {', '.join(sorted(desconocidos))}"}, status=400)
+        
+        no_modificado = self._comprobar_no_modificado(('api', *self._sello_museos()))
+        if no_modificado:
+            return no_modificado
+        
+        # Un registro de más indica si hay página siguiente sin contar el total
+        museos = request.env['museo.museo'].sudo().search(
+            [('active', '=', True), ('id', '>', ultimo_id)],
+            limit=limit + 1,
+            order='id'
+        )
+        hay_mas = len(museos) > limit
+        museos = museos[:limit]
+        
+        almacenados = [campo for campo in API_CAMPOS_ALMACENADOS if campo in campos]
+        if 'descripcion_corta' in campos:
+            almacenados.append('resenna_historica')
+        filas = museos.read(almacenados) if almacenados else [{'id': museo.id} for museo in museos]
+        
+        datos = []
+        for museo, fila in zip(museos, filas):
+            dato = {'id': museo.id}
+            dato.update((campo, fila[campo]) for campo in campos if campo in API_CAMPOS_ALMACENADOS)
+            if 'url' in campos:
+                dato['url'] = f'/museos/{museo.id}'
+            if 'imagen' in campos:
+                dato['imagen'] = museo._url_imagen_principal('tarjeta')
+            if 'descripcion_corta' in campos:
+                texto = html2plaintext(fila['resenna_historica'] or '').strip()
+                dato['descripcion_corta'] = texto[:200] + '...' if len(texto) > 200 else texto
+            datos.append(dato)
+        
+        siguiente = base64.urlsafe_b64encode(str(museos[-1].id).encode()).decode() if hay_mas else None
+        return self._respuesta_api({'datos': datos, 'siguiente': siguiente})
+    
+    def _respuesta_api(self, contenido, status=200):
+        """JSON compacto, sin espacios entre separadores"""
+        return request.make_response(
+            json.dumps(contenido, separators=(',', ':'), ensure_ascii=False, default=date_utils.json_default),
+            headers=[('Content-Type', 'application/json; charset=utf-8')],
+            status=status,
+        )
+    
+    @http.route(['/museos/actividades.ics', '/museos/<int:museo_id>/actividades.ics'],
+                type='http', auth='public', methods=['GET'], website=True, sitemap=False)
+    def museo_actividades_ics(self, museo_id=None, **kwargs):
+        """Feed iCalendar de las próximas actividades de un museo o de toda
+        la red. El contenido se genera una vez y queda en caché hasta que
+        cambia una actividad de la ventana publicada"""
+        if museo_id:
+            museo = request.env['museo.museo'].sudo().browse(museo_id)
+            if not museo.exists() or not museo.active:
+                return request.not_found()
+        
+        contenido = request.env['museo.actividad'].sudo().get_ics(museo_id or False)
+        no_modificado = self._comprobar_no_modificado(
+            ('ics', museo_id, hashlib.sha1(contenido).hexdigest()), False
+        )
+        if no_modificado:
+            return no_modificado
+        
+        nombre = f'museo-{museo_id}-actividades.ics' if museo_id else 'museos-actividades.ics'
+        return request.make_response(contenido, headers=[
+            ('Content-Type', 'text/calendar; charset=utf-8'),
+            ('Content-Disposition', content_disposition(nombre)),
+        ])
+    
+    @http.route('/museos/buscar', type='http', auth='public', methods=['GET'], website=True, sitemap=False)
+    def museo_buscar(self, q='', **kwargs):
+        """Búsqueda pública de museos, objetos e historias"""
+        resultados, limitado = self._resultados_busqueda(q)
+        valores = {
+            'q': q,
+            'resultados': resultados,
+            'limitado': limitado,
+        }
+        if limitado:
+            return request.render('museos.museo_busqueda_template', valores, status=429,
+                                  headers=[('Retry-After', str(VENTANA_BUSQUEDAS))])
+        return request.render('museos.museo_busqueda_template', valores)
+    
+    @http.route('/museos/buscar/json', type='http', auth='public', methods=['GET'], website=True, sitemap=False)
+    def museo_buscar_json(self, q='', **kwargs):
+        """Búsqueda pública en JSON, para el autocompletado"""
+        resultados, limitado = self._resultados_busqueda(q)
+        if limitado:
+            respuesta = self._respuesta_api({'error': 'Demasiadas búsquedas, inténtelo más tarde'}, status=429)
+            respuesta.headers['Retry-After'] = str(VENTANA_BUSQUEDAS)
+            return respuesta
+        return self._respuesta_api(resultados)
+    
+    @http.route('/museos/historias/mapa.json', type='http', auth='public', methods=['GET'],
+                website=True, sitemap=False)
+    def historias_mapa(self, bbox='', zoom=2, **kwargs):
+        """Marcadores agrupados de las historias de barrio para el mapa.
+        
+        ``bbox`` es el recuadro visible como ``oeste,sur,este,norte`` en
+        grados y ``zoom`` el nivel del mapa (0-20): cuanto mayor, más fina
+        la rejilla de agrupación.
+        """
+        try:
+            oeste, sur, este, norte = (float(valor) for valor in bbox.split(','))
+            zoom = min(max(int(zoom), 0), ZOOM_MAXIMO_MAPA)
+        except ValueError:
+            return self._respuesta_api({'error': 'Parámetros bbox o zoom no válidos'}, status=400)
+        if not (-180 <= oeste < este <= 180 and -90 <= sur < norte <= 90):
+            return self._respuesta_api({'error': 'Recuadro fuera de rango'}, status=400)
+        
+        total_historias, modificada = self._sello_historias()
+        total_museos, museo_modificado = self._sello_museos()
+        no_modificado = self._comprobar_no_modificado(
+            ('mapa', oeste, sur, este, norte, zoom, total_historias, total_museos),
+            max(filter(None, (modificada, museo_modificado)), default=False)
+        )
+        if no_modificado:
+            return no_modificado
+        
+        grupos = request.env['museo.historia.barrio'].sudo()._agrupar_mapa(oeste, sur, este, norte, zoom)
+        return self._respuesta_api({'grupos': grupos})
+    
+    def _resultados_busqueda(self, q):
+        """Resultados agrupados listos para mostrar y si la IP fue limitada.
+        Las búsquedas vacías o demasiado cortas no consultan ni cuentan"""
+        Busqueda = request.env['museo.busqueda'].sudo()
+        vacio = {'museos': [], 'objetos': [], 'historias': []}
+        if not Busqueda._normalizar_texto(q):
+            return vacio, False
+        if not _permitir_busqueda(request.httprequest.remote_addr):
+            return vacio, True
+        
+        grupos = Busqueda.buscar(q)
+        return {
+            'museos': [
+                {'id': registro_id, 'titulo': titulo, 'url': f'/museos/{registro_id}'}
+                for registro_id, titulo, _detalle, _museo_id in grupos['museo']
+            ],
+            'objetos': [
+                {'id': registro_id, 'titulo': titulo, 'detalle': detalle, 'url': f'/museos/{museo_id}/objetos'}
+                for registro_id, titulo, detalle, museo_id in grupos['objeto']
+            ],
+            'historias': [
+                {'id': registro_id, 'titulo': titulo, 'detalle': detalle, 'url': f'/historia/barrio/{registro_id}'}
+                for registro_id, titulo, detalle, _museo_id in grupos['historia']
+            ],
+        }, False
+    
+    @http.route('/museos/imagen/<string:ruta>/<int:registro_id>/<string:variante>/<string:version>',
+                type='http', auth='public', methods=['GET'], sitemap=False)
+    def museo_imagen(self, ruta, registro_id, variante, version, **kwargs):
+        """Sirve una variante de imagen pública. La URL lleva el checksum del
+        contenido, así que la respuesta se marca inmutable y navegadores y
+        CDN no necesitan revalidarla nunca"""
+        modelo = MODELOS_IMAGEN_PUBLICA.get(ruta)
+        if not modelo:
+            return request.not_found()
+        registro = request.env[modelo].sudo().browse(registro_id).exists()
+        if not registro or variante not in registro._variantes_imagen or not registro._imagen_publica():
+            return request.not_found()
+        
+        url = registro._url_imagen(variante)
+        if not url:
+            return request.not_found()
+        if url.rsplit('/', 1)[1] != version:
+            # Versión antigua: redirigir a la actual sin cachear la redirección
+            return request.redirect(url)
+        
+        campo = registro._variantes_imagen[variante][0]
+        stream = request.env['ir.binary']._get_stream_from(registro, campo)
+        return stream.get_response(immutable=True)
+    
+    def _trabajadores_museo(self, museo):
+        """Equipo del museo a partir de los ids cacheados en el modelo"""
+        trabajadores = request.env['res.partner'].sudo().browse(
+            request.env['res.partner']._get_ids_trabajadores_museo(museo.id)
+        )
+        trabajadores.fetch(CAMPOS_TRABAJADOR)
+        return trabajadores
+    
+    def _otras_historias(self, historia, limite=5):
+        """Historias relacionadas, leídas del índice precalculado"""
+        otras = request.env['museo.historia.barrio'].sudo().browse(
+            request.env['museo.historia.relacionada'].sudo()._ids_relacionadas(historia.id, limite)
+        )
+        otras.fetch(['name', 'barrio', 'fecha_registro', 'write_date'])
+        return otras
+    
+    def _fotos_galeria(self, museo, page=1):
+        """Fotos activas de una página de la galería y el total del museo"""
+        Galeria = request.env['museo.museo.galeria'].sudo()
+        dominio = [('museo_id', '=', museo.id)]
+        total = Galeria.search_count(dominio)
+        # Más allá de la última página no se consulta: un offset enorme
+        # desbordaría el bigint de PostgreSQL
+        offset = (page - 1) * FOTOS_POR_PAGINA
+        if offset >= total:
+            return Galeria, total
+        fotos = Galeria.search(dominio, limit=FOTOS_POR_PAGINA, offset=offset)
+        return fotos, total
+    
+    def _url_catalogo(self, museo_id, url_args, faceta, valor=None):
+        """URL del catálogo cambiando (o quitando) el valor de una faceta"""
+        args = dict(url_args)
+        if faceta == 'museo_id':
+            museo_id = valor or museo_id
+        elif valor is None:
+            args.pop(faceta, None)
+        else:
+            args[faceta] = valor
+        url = f'/museos/{museo_id}/objetos'
+        return f'{url}?{urlencode(args)}' if args else url
+    
+    def _codificar_clave(self, objeto):
+        """Clave de paginación (name, id) de un objeto, apta para la URL"""
+        return base64.urlsafe_b64encode(json.dumps([objeto.name, objeto.id]).encode()).decode()
+    
+    def _decodificar_clave(self, valor):
+        """Par (name, id) de una clave de paginación, o None si no es válida"""
+        if not valor:
+            return None
+        try:
+            name, objeto_id = json.loads(base64.urlsafe_b64decode(valor.encode()))
+        except (ValueError, TypeError, binascii.Error):
+            return None
+        if not isinstance(name, str) or not isinstance(objeto_id, int):
+            return None
+        return name, objeto_id
+    
+    def _sello_historias(self):
+        """Número de historias de barrio y fecha de la última modificación"""
+        request.env.cr.execute(SQL("SELECT COUNT(*), MAX(write_date) FROM museo_historia_barrio"))
+        return request.env.cr.fetchone()
+    
+    def _sello_museos(self):
+        """Número de museos y fecha de la última modificación de cualquiera de
+        ellos. Cubre también su contenido, que mueve la fecha de publicación
+        del museo, y los museos borrados, que cambian el número"""
+        request.env.cr.execute(SQL("SELECT COUNT(*), MAX(fecha_publicacion) FROM museo_museo"))
+        return request.env.cr.fetchone()
+    
+    def _comprobar_no_modificado(self, clave, ultima_modificacion=None):
+        """Añade a la respuesta en curso un ETag débil y Last-Modified, y
+        devuelve un 304 si la copia del cliente sigue vigente.
+        
+        La clave identifica el estado de los datos de la página; se completa
+        con el idioma, el sitio web y el usuario, que también cambian el HTML.
+        Si ``ultima_modificacion`` no se indica se toma del final de la clave;
+        con False no se envía Last-Modified.
+        """
+        if ultima_modificacion is None:
+            ultima_modificacion = clave[-1]
+        if ultima_modificacion:
+            # HTTP solo transmite segundos
+            ultima_modificacion = ultima_modificacion.replace(microsecond=0)
+        partes = (*clave, request.env.lang, request.website.id, request.env.uid)
+        etag = hashlib.sha1(repr(partes).encode()).hexdigest()[:20]
+        
+        # future_response: las cabeceras se copian tanto al 304 como a la
+        # página renderizada
+        cabeceras = request.future_response.headers
+        cabeceras['ETag'] = quote_etag(etag, weak=True)
+        cabeceras['Cache-Control'] = 'no-cache'
+        if ultima_modificacion:
+            cabeceras['Last-Modified'] = http_date(ultima_modificacion)
+        
+        if not is_resource_modified(request.httprequest.environ, etag=etag,
+                                    last_modified=ultima_modificacion):
+            return Response(status=304)
+        return None
+    
     def _format_amount(self, amount, currency):
         """Formatear cantidad monetaria"""
         if currency:
             return f"{amount:,.2f} {currency.symbol}"
         return f"{amount:,.2f}"
     
-    @http.route('/historia/barrio/<int:historia_id>', type='http', auth='public', website=True)
+    @http.route('/historia/barrio/<int:historia_id>', type='http', auth='public', website=True,
+                sitemap=sitemap_historias)
     def historia_barrio_detalle(self, historia_id, **kwargs):
         historia = request.env['museo.historia.barrio'].browse(historia_id)
         
@@ -63,10 +718,22 @@ class MuseoController(http.Controller):
         if not historia.exists() or not historia.active:
             return request.redirect('/404')
         
+        # La ficha muestra datos del museo y las historias relacionadas, que
+        # pueden ser de otros museos: su lista y sus fechas entran en la clave
+        museo = historia.museo_id
+        otras_historias = self._otras_historias(historia)
+        no_modificado = self._comprobar_no_modificado(
+            ('historia', historia.id, museo.version_publica, tuple(otras_historias.ids)),
+            max([historia.write_date, museo.fecha_publicacion] + otras_historias.mapped('write_date'))
+        )
+        if no_modificado:
+            return no_modificado
+        
         valores = {
             'historia': historia,
-            'museo': historia.museo_id,
+            'museo': museo,
             'main_object': historia,
+            'otras_historias': otras_historias,
         }
         
         return request.render('museos.historia_barrio_detalle', valores)
\ No newline at end of file
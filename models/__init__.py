@@ -1,7 +1,14 @@
+from . import museo_cache
+from . import museo_imagen_mixin
+from . import museo_publicacion_mixin
 from . import museo_model
 from . import objeto_model
+from . import objeto_analitica_model
+from . import objeto_conservacion_model
 from . import historia_barrio_model
+from . import historia_relacionada_model
 from . import convenio_model
+from . import convenio_aviso_model
 from . import actividad_model
 from . import informe_model
 from . import registro_asistencia_model
@@ -9,6 +16,8 @@ from . import configuracion_model
 from . import wizard_models
 from . import res_partner
 from . import museo_galeria_model
+from . import museo_snapshot
+from . import museo_busqueda
 from . import reporte_model
 from . import acciones_reportes
 from . import wizard_reportes
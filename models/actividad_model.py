@@ -1,12 +1,46 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
-from datetime import datetime, timedelta
+from odoo.tools import SQL, html2plaintext
+from odoo.tools.sql import create_index
+from datetime import datetime, time, timedelta
+from .museo_cache import CACHE_ICS, CACHE_TRABAJADORES, crear_version_cache, invalidar_cache, version_cache
+
+# Feeds iCalendar: estados publicados, días que abarca la ventana desde hoy
+# y campos que cambian el contenido del feed
+ESTADOS_ICS = ('planificada', 'confirmada')
+VENTANA_ICS_DIAS = 180
+CAMPOS_ICS = {'name', 'fecha_inicio', 'fecha_fin', 'sala', 'descripcion', 'estado', 'museo_id'}
+
+
+def _texto_ics(valor):
+    """Escapa un texto para una propiedad iCalendar (RFC 5545, 3.3.11)"""
+    return (valor or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _plegar_ics(linea):
+    """Parte las líneas de más de 75 octetos (RFC 5545, 3.1)"""
+    partes, actual, octetos = [], '', 0
+    for caracter in linea:
+        largo = len(caracter.encode())
+        if octetos + largo > 75:
+            partes.append(actual)
+            actual, octetos = ' ', 1
+        actual += caracter
+        octetos += largo
+    partes.append(actual)
+    return '\r\n'.join(partes)
+
+
+def _fecha_ics(valor):
+    return valor.strftime('%Y%m%dT%H%M%SZ')
+
 
 class MuseoActividad(models.Model):
     _name = 'museo.actividad'
     _description = 'Actividad o Evento del Museo'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'museo.publicacion.mixin']
     _order = 'fecha_inicio desc, name asc'
     
     # ELIMINA ESTOS CAMPOS:
@@ -128,6 +162,14 @@ class MuseoActividad(models.Model):
     
     
     
+    def init(self):
+        # Consulta de los feeds iCalendar: actividades publicadas que aún no
+        # han terminado, de un museo o de toda la red
+        create_index(self.env.cr, 'museo_actividad_ics_idx', self._table,
+                     ['fecha_fin', 'museo_id'],
+                     where="estado IN ('planificada', 'confirmada')")
+        crear_version_cache(self.env.cr, CACHE_ICS)
+    
     @api.depends('fecha_inicio', 'fecha_fin')
     def _compute_duracion(self):
         """Calcula la duración en horas"""
@@ -182,10 +224,19 @@ class MuseoActividad(models.Model):
             })
             actividad.calendar_event_id = calendar_event.id
         
+        # Sus trabajadores pasan a mostrarse en la página del museo y puede
+        # entrar en los feeds iCalendar
+        if actividad.trabajadores_ids:
+            invalidar_cache(self.env, CACHE_TRABAJADORES)
+        if actividad._en_ventana_ics():
+            invalidar_cache(self.env, CACHE_ICS)
+        
         return actividad
     
     def write(self, vals):
         """Sobrescribir write para actualizar evento de calendario"""
+        cambia_ics = bool(CAMPOS_ICS.intersection(vals))
+        en_ventana = cambia_ics and self._en_ventana_ics()
         result = super(MuseoActividad, self).write(vals)
         
         # Actualizar evento de calendario si existe
@@ -208,6 +259,14 @@ class MuseoActividad(models.Model):
                 if calendar_vals:
                     actividad.calendar_event_id.write(calendar_vals)
         
+        # Cambia el equipo mostrado en la página de los museos afectados, o
+        # el contenido de los feeds iCalendar si la actividad estaba o está
+        # en su ventana
+        if 'trabajadores_ids' in vals or 'museo_id' in vals:
+            invalidar_cache(self.env, CACHE_TRABAJADORES)
+        if cambia_ics and (en_ventana or self._en_ventana_ics()):
+            invalidar_cache(self.env, CACHE_ICS)
+        
         return result
     
     def unlink(self):
@@ -217,7 +276,14 @@ class MuseoActividad(models.Model):
             if actividad.calendar_event_id:
                 actividad.calendar_event_id.unlink()
         
-        return super(MuseoActividad, self).unlink()
+        cambia_trabajadores = bool(self.trabajadores_ids)
+        cambia_ics = self._en_ventana_ics()
+        result = super(MuseoActividad, self).unlink()
+        if cambia_trabajadores:
+            invalidar_cache(self.env, CACHE_TRABAJADORES)
+        if cambia_ics:
+            invalidar_cache(self.env, CACHE_ICS)
+        return result
     
     def action_crear_evento_calendario(self):
         """Acción para crear evento de calendario manualmente"""
@@ -288,4 +354,84 @@ class MuseoActividad(models.Model):
                 'default_res_model': 'museo.actividad',
                 'default_res_id': self.id
             }
-        }
\ No newline at end of file
+        }
+    
+    # ------------------------------------------------------------
+    # Feeds iCalendar
+    # ------------------------------------------------------------
+    
+    @api.model
+    def _ventana_ics(self, dia):
+        """Intervalo [desde, hasta) de las actividades publicadas en el feed"""
+        desde = datetime.combine(dia, time.min)
+        return desde, desde + timedelta(days=VENTANA_ICS_DIAS)
+    
+    def _en_ventana_ics(self):
+        """Indica si alguna de las actividades aparece hoy en los feeds"""
+        desde, hasta = self._ventana_ics(fields.Date.today())
+        return any(
+            actividad.estado in ESTADOS_ICS
+            and actividad.fecha_fin and actividad.fecha_fin >= desde
+            and actividad.fecha_inicio and actividad.fecha_inicio < hasta
+            for actividad in self
+        )
+    
+    @api.model
+    def get_ics(self, museo_id=False):
+        """Feed iCalendar de las próximas actividades de un museo o, sin
+        museo, de toda la red"""
+        return self._get_ics(museo_id, fields.Date.today(), version_cache(self.env.cr, CACHE_ICS))
+    
+    @api.model
+    @tools.ormcache('museo_id', 'dia', 'version', 'self.env.lang')
+    def _get_ics(self, museo_id, dia, version):
+        """Genera el feed con una sola consulta. El día forma parte de la
+        clave para que la ventana avance aunque no cambie ninguna actividad,
+        y el idioma porque el feed incluye textos traducidos"""
+        self.flush_model(list(CAMPOS_ICS))
+        self.env['museo.museo'].flush_model(['name', 'active'])
+        desde, hasta = self._ventana_ics(dia)
+        self.env.cr.execute(SQL("""
+            SELECT a.id, a.name, a.fecha_inicio, a.fecha_fin, a.sala, a.descripcion,
+                   a.estado, a.write_date, a.museo_id, m.name
+              FROM museo_actividad a
+              JOIN museo_museo m ON m.id = a.museo_id
+             WHERE a.estado IN %(estados)s
+               AND a.fecha_fin >= %(desde)s
+               AND a.fecha_inicio < %(hasta)s
+               AND m.active
+               %(filtro_museo)s
+             ORDER BY a.fecha_inicio, a.id
+        """, estados=ESTADOS_ICS, desde=desde, hasta=hasta,
+            filtro_museo=SQL("AND a.museo_id = %s", museo_id) if museo_id else SQL()))
+        filas = self.env.cr.fetchall()
+        
+        base_url = self.get_base_url()
+        dominio = base_url.split('://')[-1]
+        nombre = self.env['museo.museo'].sudo().browse(museo_id).name if museo_id else _('Red de Museos')
+        lineas = [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:-//Museos//Actividades//ES',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{_texto_ics(_("Actividades - %s", nombre))}',
+        ]
+        for (actividad_id, titulo, inicio, fin, sala, descripcion,
+             estado, write_date, fila_museo_id, museo_nombre) in filas:
+            ubicacion = ', '.join(filter(None, [sala, museo_nombre]))
+            lineas += [
+                'BEGIN:VEVENT',
+                f'UID:museo-actividad-{actividad_id}@{dominio}',
+                f'DTSTAMP:{_fecha_ics(write_date)}',
+                f'DTSTART:{_fecha_ics(inicio)}',
+                f'DTEND:{_fecha_ics(fin)}',
+                f'SUMMARY:{_texto_ics(titulo)}',
+                f'LOCATION:{_texto_ics(ubicacion)}',
+                f'DESCRIPTION:{_texto_ics(html2plaintext(descripcion or ""))}',
+                f'URL:{base_url}/museos/{fila_museo_id}#actividades',
+                f"STATUS:{'CONFIRMED' if estado == 'confirmada' else 'TENTATIVE'}",
+                'END:VEVENT',
+            ]
+        lineas.append('END:VCALENDAR')
+        return ('\r\n'.join(_plegar_ics(linea) for linea in lineas) + '\r\n').encode()
@@ -21,9 +21,11 @@ class MuseoConfigSettings(models.TransientModel):
     ], string='Frecuencia de Informes', default='mensual',
     config_parameter='museos.frecuencia_informes')
     
+    # Sin valor por defecto: 0 desactiva el aviso y los valores iniciales
+    # vienen de data/museo_config_data.xml
     dias_previos_aviso = fields.Integer(
         string='Días Previos para Aviso',
-        default=30,
+        help='Días antes del fin de un convenio para el aviso previo; 0 lo desactiva',
         config_parameter='museos.dias_previos_aviso'
     )
     
@@ -43,7 +45,7 @@ class MuseoConfigSettings(models.TransientModel):
     # Convenios
     aviso_vencimiento_convenio = fields.Integer(
         string='Aviso Vencimiento Convenios (días)',
-        default=15,
+        help='Días antes del fin de un convenio para el aviso de vencimiento; 0 lo desactiva',
         config_parameter='museos.aviso_vencimiento_convenio'
     )
     
@@ -58,4 +60,50 @@ class MuseoConfigSettings(models.TransientModel):
         string='Días Previos para Notificación',
         default=3,
         config_parameter='museos.dias_previos_notificacion'
-    )
\ No newline at end of file
+    )
+    
+    # Imágenes
+    generar_webp = fields.Boolean(
+        string='Generar Variantes WebP',
+        default=False,
+        config_parameter='museos.generar_webp'
+    )
+    
+    # Sitio estático
+    snapshot_directorio = fields.Char(
+        string='Directorio del Sitio Estático',
+        config_parameter='museos.snapshot_directorio'
+    )
+    
+    snapshot_url_origen = fields.Char(
+        string='URL de Origen para la Exportación',
+        help='Servidor al que se piden las páginas; por defecto, la URL base del sitio',
+        config_parameter='museos.snapshot_url_origen'
+    )
+    
+    def set_values(self):
+        """Valida el directorio y la URL de la exportación estática antes de
+        guardarlos"""
+        Snapshot = self.env['museo.snapshot']
+        if self.snapshot_directorio:
+            self.snapshot_directorio = Snapshot._validar_directorio(self.snapshot_directorio)
+        if self.snapshot_url_origen:
+            self.snapshot_url_origen = Snapshot._validar_origen(self.snapshot_url_origen)
+        super().set_values()
+    
+    def action_exportar_snapshot(self):
+        """Programa la exportación de las páginas públicas a HTML estático:
+        corre en el cron, fuera de esta petición"""
+        self.execute()
+        self.env.ref('museos.ir_cron_snapshot')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Exportación programada',
+                'message': 'El sitio estático se exportará en segundo plano en unos instantes; '
+                           'el resultado queda en el registro del servidor.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.fields import Command
+from odoo.tools import SQL, format_date
+from markupsafe import Markup
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Niveles de aviso y el parámetro de configuración con sus días de antelación.
+# Los valores iniciales están en data/museo_config_data.xml; un parámetro
+# ausente (la configuración lo borra al guardar 0) desactiva el nivel
+NIVELES_AVISO = {
+    'previo': 'museos.dias_previos_aviso',
+    'vencimiento': 'museos.aviso_vencimiento_convenio',
+}
+
+
+class MuseoConvenioAviso(models.Model):
+    """Registro de los avisos de vencimiento enviados.
+
+    Un convenio recibe como mucho un aviso por nivel y fecha de fin: si se
+    prorroga, la nueva fecha vuelve a avisarse.
+    """
+    _name = 'museo.convenio.aviso'
+    _description = 'Aviso de Vencimiento de Convenio'
+    _order = 'fecha_envio desc, id desc'
+
+    convenio_id = fields.Many2one(
+        'museo.convenio',
+        string='Convenio',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+
+    museo_id = fields.Many2one(
+        related='convenio_id.museo_id',
+        store=True,
+        readonly=True
+    )
+
+    nivel = fields.Selection([
+        ('previo', 'Aviso Previo'),
+        ('vencimiento', 'Aviso de Vencimiento'),
+    ], string='Nivel', required=True, readonly=True)
+
+    fecha_fin = fields.Date(
+        string='Fecha de Finalización Avisada',
+        required=True,
+        readonly=True
+    )
+
+    fecha_envio = fields.Datetime(
+        string='Fecha de Envío',
+        default=fields.Datetime.now,
+        readonly=True
+    )
+
+    destinatario_id = fields.Many2one(
+        'res.partner',
+        string='Destinatario',
+        readonly=True
+    )
+
+    _sql_constraints = [
+        ('convenio_nivel_fecha_unique', 'UNIQUE(convenio_id, nivel, fecha_fin)',
+         'El convenio ya fue avisado en este nivel para esa fecha de fin.'),
+    ]
+
+    @api.model
+    def _ventanas_aviso(self):
+        """{nivel: días de antelación} según la configuración; los niveles
+        sin parámetro o con 0 días están desactivados"""
+        parametros = self.env['ir.config_parameter'].sudo()
+        ventanas = {}
+        for nivel, parametro in NIVELES_AVISO.items():
+            try:
+                dias = int(parametros.get_param(parametro) or 0)
+            except ValueError:
+                dias = 0
+            if dias > 0:
+                ventanas[nivel] = dias
+        return ventanas
+
+    @api.model
+    def _pendientes(self, hoy):
+        """(convenio_id, nivel) de los convenios vigentes que entran en su
+        ventana de aviso y aún no fueron avisados en ese nivel, con una sola
+        consulta sobre el índice de vencimientos. Dentro de las dos ventanas
+        se avisa el nivel más cercano al vencimiento"""
+        ventanas = self._ventanas_aviso()
+        if not ventanas:
+            return []
+        self.env['museo.convenio'].flush_model(['estado', 'active', 'fecha_fin'])
+        self.flush_model()
+        self.env.cr.execute(SQL("""
+            SELECT c.id, CASE WHEN c.fecha_fin <= %(limite_vencimiento)s THEN 'vencimiento' ELSE 'previo' END AS nivel
+              FROM museo_convenio c
+             WHERE c.estado = 'vigente' AND c.active AND c.fecha_fin IS NOT NULL
+               AND c.fecha_fin BETWEEN %(hoy)s AND %(limite)s
+               AND NOT EXISTS (
+                    SELECT 1 FROM museo_convenio_aviso a
+                     WHERE a.convenio_id = c.id AND a.fecha_fin = c.fecha_fin
+                       AND (a.nivel = 'vencimiento'
+                            OR a.nivel = CASE WHEN c.fecha_fin <= %(limite_vencimiento)s
+                                              THEN 'vencimiento' ELSE 'previo' END))
+             ORDER BY c.museo_id, c.fecha_fin, c.id
+        """,
+            hoy=hoy,
+            limite=hoy + timedelta(days=max(ventanas.values())),
+            limite_vencimiento=hoy + timedelta(days=ventanas.get('vencimiento', -1)),
+        ))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _cuerpo_resumen(self, convenios, hoy):
+        filas = Markup().join(
+            Markup("<li>%s: %s (%s, %s)</li>") % (
+                convenio.museo_id.name,
+                convenio.name,
+                format_date(self.env, convenio.fecha_fin),
+                _('%s días', (convenio.fecha_fin - hoy).days),
+            )
+            for convenio in convenios
+        )
+        return Markup("<p>%s</p><ul>%s</ul>") % (_('Convenios próximos a vencer:'), filas)
+
+    @api.model
+    def _enviar_avisos(self):
+        """Envía un resumen por responsable con sus convenios próximos a
+        vencer; los convenios sin responsable con correo se resumen en una
+        nota por museo. Cada aviso queda registrado para no repetirse"""
+        hoy = fields.Date.today()
+        pendientes = self._pendientes(hoy)
+        if not pendientes:
+            return 0
+        niveles = dict(pendientes)
+        convenios = self.env['museo.convenio'].browse([convenio_id for convenio_id, _nivel in pendientes])
+
+        con_responsable = convenios.filtered(lambda convenio: convenio.responsable_museo.email)
+        correos = []
+        for responsable, suyos in con_responsable.grouped('responsable_museo').items():
+            correos.append({
+                'subject': _('Convenios próximos a vencer'),
+                'body_html': self._cuerpo_resumen(suyos, hoy),
+                'recipient_ids': [Command.link(responsable.id)],
+                'auto_delete': True,
+            })
+        self.env['mail.mail'].sudo().create(correos)
+
+        for museo, suyos in (convenios - con_responsable).filtered('museo_id').grouped('museo_id').items():
+            museo.message_post(body=self._cuerpo_resumen(suyos, hoy), subtype_xmlid='mail.mt_note')
+
+        self.create([{
+            'convenio_id': convenio.id,
+            'nivel': niveles[convenio.id],
+            'fecha_fin': convenio.fecha_fin,
+            'destinatario_id': convenio.responsable_museo.id if convenio in con_responsable else False,
+        } for convenio in convenios])
+        _logger.info(f'Avisos de vencimiento: {len(convenios)} convenios, {len(correos)} resúmenes por correo')
+        return len(convenios)
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
-from datetime import date
+from odoo.tools import format_date
+from odoo.tools.sql import create_index
+from markupsafe import Markup
+import logging
+
+_logger = logging.getLogger(__name__)
 
 class MuseoConvenio(models.Model):
     _name = 'museo.convenio'
     _description = 'Convenio de Trabajo'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'museo.publicacion.mixin']
     _order = 'fecha_inicio desc, name asc'
     
     name = fields.Char(
@@ -96,6 +101,13 @@ class MuseoConvenio(models.Model):
 
     
 
+    aviso_ids = fields.One2many(
+        'museo.convenio.aviso',
+        'convenio_id',
+        string='Avisos de Vencimiento',
+        readonly=True
+    )
+
     """ ---------------- """
     
     dias_para_vencer = fields.Integer(
@@ -114,6 +126,11 @@ class MuseoConvenio(models.Model):
                 convenio.dias_para_vencer = 0
     """ ---------------- """
     
+    def init(self):
+        # Convenios vigentes por fecha de fin: sirve al cron de vencimientos
+        create_index(self.env.cr, 'museo_convenio_vencimiento_idx', self._table,
+                     ['fecha_fin'], where="estado = 'vigente' AND active AND fecha_fin IS NOT NULL")
+    
     @api.constrains('fecha_inicio', 'fecha_fin')
     def _check_fechas(self):
         for convenio in self:
@@ -124,14 +141,33 @@ class MuseoConvenio(models.Model):
     
     @api.model
     def _cron_verificar_vencimientos(self):
-        hoy = date.today()
-        convenios = self.search([
+        """Marca como vencidos, con una sola escritura, los convenios vigentes
+        cuya fecha de fin ya pasó, y deja una nota por museo con la lista"""
+        vencidos = self.search([
             ('estado', '=', 'vigente'),
-            ('fecha_fin', '!=', False),
+            ('fecha_fin', '<', fields.Date.today()),
             ('active', '=', True)
-        ])
+        ], order='museo_id, fecha_fin, id')
+        if not vencidos:
+            return
         
-        for convenio in convenios:
-            if convenio.fecha_fin < hoy:
-                convenio.estado = 'vencido'
-                _logger.info(f'Convenio {convenio.name} marcado como vencido')
\ No newline at end of file
+        # Sin seguimiento por registro: la nota del museo resume el cambio
+        vencidos.with_context(tracking_disable=True).write({'estado': 'vencido'})
+        
+        for museo, convenios in vencidos.filtered('museo_id').grouped('museo_id').items():
+            museo.message_post(
+                body=Markup("<p>%s</p><ul>%s</ul>") % (
+                    _('Convenios marcados como vencidos:'),
+                    Markup().join(
+                        Markup("<li>%s (%s)</li>") % (convenio.name, format_date(self.env, convenio.fecha_fin))
+                        for convenio in convenios
+                    ),
+                ),
+                subtype_xmlid='mail.mt_note',
+            )
+        _logger.info(f'{len(vencidos)} convenios marcados como vencidos')
+    
+    @api.model
+    def _cron_avisar_vencimientos(self):
+        """Resúmenes de los convenios que entran en su ventana de aviso"""
+        self.env['museo.convenio.aviso']._enviar_avisos()
@@ -1,15 +1,70 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
+from odoo.tools import html2plaintext, SQL
+from odoo.tools.misc import file_open
+from odoo.tools.sql import create_index
+from .historia_relacionada_model import CAMPOS_RELACIONADAS
+import csv
+import functools
+import logging
+import re
+import unicodedata
+
+_logger = logging.getLogger(__name__)
+
+# Longitud de los extractos en texto plano mostrados en las tarjetas
+LONGITUD_EXTRACTO = 180
+LONGITUD_EXTRACTO_TESTIMONIO = 120
+# Palabras leídas por minuto para estimar el tiempo de lectura
+PALABRAS_POR_MINUTO = 200
+
+# Nomenclátor de barrios y ciudades incluido con el módulo
+RUTA_NOMENCLATOR = 'museos/data/nomenclator_barrios.csv'
+# Celdas por tesela del mapa al agrupar marcadores, y grupos como máximo
+CELDAS_MAPA = 8
+MAXIMO_GRUPOS_MAPA = 500
+
+
+def _clave_lugar(texto):
+    """Nombre de lugar en minúsculas, sin tildes y con los espacios
+    colapsados, para comparar con el nomenclátor"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return re.sub(r'\s+', ' ', texto).strip().lower()
+
+
+@functools.lru_cache(maxsize=1)
+def _nomenclator():
+    """{(ciudad, barrio): (latitud, longitud)} leído una vez por proceso.
+    Las filas sin barrio son el centro de la ciudad; un barrio que solo
+    aparece en una ciudad también se encuentra sin ella, con ('', barrio)"""
+    lugares, ciudades_barrio = {}, {}
+    with file_open(RUTA_NOMENCLATOR) as archivo:
+        for fila in csv.DictReader(archivo):
+            ciudad, barrio = _clave_lugar(fila['ciudad']), _clave_lugar(fila['barrio'])
+            try:
+                lugares[ciudad, barrio] = (float(fila['latitud']), float(fila['longitud']))
+            except ValueError:
+                _logger.warning(f"Nomenclátor: coordenadas no válidas para {fila['barrio']}, {fila['ciudad']}")
+                continue
+            if barrio:
+                ciudades_barrio.setdefault(barrio, []).append(ciudad)
+    for barrio, ciudades in ciudades_barrio.items():
+        if len(ciudades) == 1:
+            lugares['', barrio] = lugares[ciudades[0], barrio]
+    return lugares
+
 
 class MuseoHistoriaBarrio(models.Model):
     _name = 'museo.historia.barrio'
     _description = 'Historia de Barrio'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'museo.publicacion.mixin']
     _order = 'fecha_registro desc, name asc'
     
     name = fields.Char(
         string='Título de la Historia',
-        required=True
+        required=True,
+        index='trigram'
     )
     
     museo_id = fields.Many2one(
@@ -33,7 +88,8 @@ class MuseoHistoriaBarrio(models.Model):
     
     barrio = fields.Char(
         string='Barrio/Localidad',
-        required=True
+        required=True,
+        index='trigram'
     )
     
     ciudad = fields.Char(
@@ -74,4 +130,173 @@ class MuseoHistoriaBarrio(models.Model):
     active = fields.Boolean(
         string='Activo',
         default=True
-    )
\ No newline at end of file
+    )
+    
+    # Texto plano precalculado: los listados no cargan el HTML completo
+    extracto = fields.Char(
+        string='Extracto',
+        compute='_compute_extractos',
+        store=True
+    )
+    
+    extracto_testimonio = fields.Char(
+        string='Extracto del Testimonio',
+        compute='_compute_extractos',
+        store=True
+    )
+    
+    palabras = fields.Integer(
+        string='Palabras',
+        compute='_compute_extractos',
+        store=True
+    )
+    
+    minutos_lectura = fields.Integer(
+        string='Minutos de Lectura',
+        compute='_compute_extractos',
+        store=True
+    )
+    
+    # Ubicación geocodificada con el nomenclátor a partir del barrio y la
+    # ciudad; se puede corregir a mano
+    latitud = fields.Float(
+        string='Latitud',
+        compute='_compute_coordenadas',
+        store=True,
+        readonly=False
+    )
+    
+    longitud = fields.Float(
+        string='Longitud',
+        compute='_compute_coordenadas',
+        store=True,
+        readonly=False
+    )
+    
+    precision_ubicacion = fields.Selection([
+        ('barrio', 'Barrio'),
+        ('ciudad', 'Ciudad'),
+        ('manual', 'Manual'),
+    ], string='Precisión de la Ubicación', compute='_compute_coordenadas', store=True, readonly=False)
+    
+    relacionada_ids = fields.One2many(
+        'museo.historia.relacionada',
+        'historia_id',
+        string='Historias Relacionadas',
+        readonly=True
+    )
+    
+    def init(self):
+        # Índice espacial sin PostGIS: GiST sobre el tipo point nativo, que
+        # sirve las consultas por recuadro del mapa. Los Float sin valor se
+        # guardan como 0.0: lo que marca una historia ubicada es la precisión
+        create_index(self.env.cr, 'museo_historia_barrio_ubicacion_idx', self._table,
+                     ['point(longitud, latitud)'], method='gist',
+                     where='active AND precision_ubicacion IS NOT NULL')
+        # Un índice parcial por rama de la búsqueda de historias relacionadas
+        for nombre, expresion in (('museo', 'museo_id'), ('barrio', 'lower(barrio)'), ('ciudad', 'lower(ciudad)')):
+            create_index(self.env.cr, f'museo_historia_barrio_{nombre}_activa_idx',
+                         self._table, [expresion], where='active')
+        # Recorrido por clave del sitemap: cada lote se lee solo del índice
+        create_index(self.env.cr, 'museo_historia_barrio_sitemap_idx', self._table,
+                     ['id', 'write_date', 'museo_id'], where='active')
+    
+    @api.depends('barrio', 'ciudad')
+    def _compute_coordenadas(self):
+        nomenclator = _nomenclator()
+        for historia in self:
+            ciudad, barrio = _clave_lugar(historia.ciudad), _clave_lugar(historia.barrio)
+            if (ciudad, barrio) in nomenclator:
+                historia.latitud, historia.longitud = nomenclator[ciudad, barrio]
+                historia.precision_ubicacion = 'barrio'
+            elif ciudad and (ciudad, '') in nomenclator:
+                historia.latitud, historia.longitud = nomenclator[ciudad, '']
+                historia.precision_ubicacion = 'ciudad'
+            else:
+                historia.latitud = historia.longitud = False
+                historia.precision_ubicacion = False
+    
+    @api.depends('contenido_historico', 'testimonios')
+    def _compute_extractos(self):
+        for historia in self:
+            texto = self._texto_plano(
+                html2plaintext(historia.contenido_historico or '', include_references=False)
+            )
+            historia.extracto = self._recortar(texto, LONGITUD_EXTRACTO)
+            historia.extracto_testimonio = self._recortar(
+                self._texto_plano(historia.testimonios), LONGITUD_EXTRACTO_TESTIMONIO
+            )
+            historia.palabras = len(texto.split())
+            historia.minutos_lectura = -(-historia.palabras // PALABRAS_POR_MINUTO)
+    
+    @api.model
+    def _texto_plano(self, texto):
+        """Colapsa espacios y saltos de línea en una sola línea"""
+        return re.sub(r'\s+', ' ', texto or '').strip()
+    
+    @api.model
+    def _recortar(self, texto, longitud):
+        """Corta el texto en el último límite de palabra antes de la longitud"""
+        if len(texto) <= longitud:
+            return texto
+        return texto[:longitud].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Marca como manual la ubicación indicada al crear y agenda el
+        cálculo de las historias relacionadas"""
+        for vals in vals_list:
+            if ({'latitud', 'longitud'} & set(vals)) and 'precision_ubicacion' not in vals:
+                vals['precision_ubicacion'] = 'manual'
+        historias = super(MuseoHistoriaBarrio, self).create(vals_list)
+        self.env['museo.historia.relacionada']._marcar_pendientes(historias.ids)
+        return historias
+    
+    def write(self, vals):
+        """Marca como manual la ubicación corregida a mano y agenda el
+        recálculo de las relacionadas si cambia el museo, la localidad, el
+        título o la publicación"""
+        if ({'latitud', 'longitud'} & set(vals)) and not ({'barrio', 'ciudad', 'precision_ubicacion'} & set(vals)):
+            vals = dict(vals, precision_ubicacion='manual')
+        result = super(MuseoHistoriaBarrio, self).write(vals)
+        if CAMPOS_RELACIONADAS.intersection(vals):
+            self.env['museo.historia.relacionada']._marcar_pendientes(self.ids)
+        return result
+    
+    def unlink(self):
+        """Agenda el recálculo de las historias que tenían como relacionada
+        alguna de las borradas"""
+        self.env['museo.historia.relacionada']._marcar_pendientes(self.ids)
+        return super(MuseoHistoriaBarrio, self).unlink()
+    
+    @api.model
+    def _agrupar_mapa(self, oeste, sur, este, norte, zoom):
+        """Marcadores de las historias activas dentro del recuadro, agrupados
+        en una rejilla que se afina con el zoom. Cada grupo lleva su centro y
+        su número de historias; los de una sola historia, también su id y
+        título. Si salen más de MAXIMO_GRUPOS_MAPA grupos, la rejilla se
+        duplica hasta que quepan: nunca se descartan historias"""
+        celda = 360.0 / (2 ** zoom) / CELDAS_MAPA
+        while True:
+            self.env.cr.execute(SQL("""
+                SELECT COUNT(*), AVG(h.latitud), AVG(h.longitud), MIN(h.id),
+                       CASE WHEN COUNT(*) = 1 THEN MIN(h.name) END
+                  FROM museo_historia_barrio h
+                  JOIN museo_museo m ON m.id = h.museo_id
+                 WHERE h.active AND h.precision_ubicacion IS NOT NULL AND m.active
+                   AND point(h.longitud, h.latitud) <@ box(point(%(oeste)s, %(sur)s), point(%(este)s, %(norte)s))
+                 GROUP BY floor(h.longitud / %(celda)s), floor(h.latitud / %(celda)s)
+                 LIMIT %(limite)s
+            """, oeste=oeste, sur=sur, este=este, norte=norte, celda=celda, limite=MAXIMO_GRUPOS_MAPA + 1))
+            filas = self.env.cr.fetchall()
+            # Con celdas del tamaño del recuadro salen como mucho cuatro grupos
+            if len(filas) <= MAXIMO_GRUPOS_MAPA or celda >= max(este - oeste, norte - sur):
+                break
+            celda *= 2
+        grupos = []
+        for total, latitud, longitud, historia_id, name in filas:
+            grupo = {'latitud': latitud, 'longitud': longitud, 'total': total}
+            if total == 1:
+                grupo.update(id=historia_id, name=name, url=f'/historia/barrio/{historia_id}')
+            grupos.append(grupo)
+        return grupos
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Clave de las historias pendientes de refresco en cr.precommit.data
+PENDIENTES_RELACIONADAS = 'museo.historia.relacionada.pendientes'
+
+# Campos de museo.historia.barrio que alteran las relaciones
+CAMPOS_RELACIONADAS = {'museo_id', 'barrio', 'ciudad', 'name', 'active', 'fecha_registro'}
+
+# Historias relacionadas guardadas por historia
+LIMITE_RELACIONADAS = 5
+
+# Historias recalculadas por consulta
+LOTE_RELACIONADAS = 500
+
+
+class MuseoHistoriaRelacionada(models.Model):
+    """Índice precalculado de historias relacionadas.
+
+    Cada historia guarda sus LIMITE_RELACIONADAS vecinas mejor puntuadas
+    entre las que comparten museo, barrio o ciudad (de museos activos),
+    desempatando por la similitud de los títulos (trigramas, si pg_trgm
+    está disponible). Las filas se recalculan por lotes al confirmar la
+    transacción en la que cambiaron las historias.
+    """
+    _name = 'museo.historia.relacionada'
+    _description = 'Historia de Barrio Relacionada'
+    _order = 'historia_id, orden'
+    _log_access = False
+
+    historia_id = fields.Many2one(
+        'museo.historia.barrio',
+        string='Historia',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+
+    relacionada_id = fields.Many2one(
+        'museo.historia.barrio',
+        string='Historia Relacionada',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        readonly=True
+    )
+
+    puntuacion = fields.Float(string='Puntuación', digits=(6, 3), readonly=True)
+    orden = fields.Integer(string='Orden', readonly=True)
+
+    def init(self):
+        # La ficha lee sus relacionadas con un único recorrido de este índice
+        create_index(self.env.cr, 'museo_historia_relacionada_orden_idx',
+                     self._table, ['historia_id', 'orden'])
+        self.env.cr.execute("SELECT 1 FROM museo_historia_relacionada LIMIT 1")
+        if not self.env.cr.fetchone():
+            self.env.cr.execute("SELECT id FROM museo_historia_barrio WHERE active")
+            self._refrescar([fila[0] for fila in self.env.cr.fetchall()])
+
+    @api.model
+    def _marcar_pendientes(self, historia_ids):
+        """Agenda el refresco de las historias dadas y de las que hoy las
+        tienen como relacionadas, al confirmar la transacción"""
+        historia_ids = {historia_id for historia_id in historia_ids if historia_id}
+        if not historia_ids:
+            return
+        self.env.cr.execute(SQL(
+            "SELECT historia_id FROM museo_historia_relacionada WHERE relacionada_id = ANY(%s)",
+            list(historia_ids),
+        ))
+        historia_ids.update(fila[0] for fila in self.env.cr.fetchall())
+
+        precommit = self.env.cr.precommit
+        pendientes = precommit.data.get(PENDIENTES_RELACIONADAS)
+        if pendientes is None:
+            pendientes = precommit.data[PENDIENTES_RELACIONADAS] = set()
+            relacionadas = self.sudo()
+            precommit.add(lambda: relacionadas._refrescar_con_vecinas(
+                precommit.data.pop(PENDIENTES_RELACIONADAS, ())
+            ))
+        pendientes.update(historia_ids)
+
+    @api.model
+    def _refrescar_con_vecinas(self, historia_ids):
+        """Refresca las historias dadas (que ya incluyen las que las tenían
+        como relacionadas) y después las que entraron en sus listas nuevas:
+        la puntuación es simétrica, así que son las que más probablemente
+        las incluyan. El coste queda acotado por LIMITE_RELACIONADAS por
+        historia cambiada, no por el tamaño de su barrio o ciudad"""
+        historia_ids = set(historia_ids)
+        if not historia_ids:
+            return
+        self._refrescar(historia_ids)
+        self.env.cr.execute(SQL(
+            "SELECT DISTINCT relacionada_id FROM museo_historia_relacionada WHERE historia_id = ANY(%s)",
+            list(historia_ids),
+        ))
+        self._refrescar({fila[0] for fila in self.env.cr.fetchall()} - historia_ids)
+    
+    @api.model
+    def _refrescar(self, historia_ids):
+        """Recalcula por lotes las relacionadas de las historias dadas"""
+        historia_ids = sorted(historia_ids)
+        if not historia_ids:
+            return
+        self.env['museo.historia.barrio'].flush_model(list(CAMPOS_RELACIONADAS))
+        similitud = SQL("similarity(c.name, h.name)") if self.env.registry.has_trigram else SQL("0")
+        for inicio in range(0, len(historia_ids), LOTE_RELACIONADAS):
+            lote = historia_ids[inicio:inicio + LOTE_RELACIONADAS]
+            self.env.cr.execute(SQL(
+                "DELETE FROM museo_historia_relacionada WHERE historia_id = ANY(%s)", lote
+            ))
+            # Una rama por criterio para que cada una use su índice parcial;
+            # la misma candidata puede salir de varias ramas
+            self.env.cr.execute(SQL("""
+                WITH origen AS (
+                    SELECT id, museo_id, lower(barrio) AS barrio, lower(ciudad) AS ciudad
+                      FROM museo_historia_barrio
+                     WHERE id = ANY(%(lote)s) AND active
+                ), pares AS (
+                    SELECT o.id AS historia_id, c.id AS relacionada_id
+                      FROM origen o
+                      JOIN museo_historia_barrio c ON c.museo_id = o.museo_id AND c.active
+                    UNION ALL
+                    SELECT o.id, c.id
+                      FROM origen o
+                      JOIN museo_historia_barrio c ON lower(c.barrio) = o.barrio AND c.active
+                    UNION ALL
+                    SELECT o.id, c.id
+                      FROM origen o
+                      JOIN museo_historia_barrio c ON lower(c.ciudad) = o.ciudad AND c.active
+                )
+                INSERT INTO museo_historia_relacionada (historia_id, relacionada_id, puntuacion, orden)
+                SELECT historia_id, relacionada_id, puntuacion, orden
+                  FROM (
+                    SELECT historia_id, relacionada_id, puntuacion,
+                           row_number() OVER (PARTITION BY historia_id
+                                              ORDER BY puntuacion DESC, fecha_registro DESC, relacionada_id DESC) AS orden
+                      FROM (
+                        SELECT h.id AS historia_id,
+                               c.id AS relacionada_id,
+                               c.fecha_registro,
+                               CASE WHEN lower(c.barrio) = lower(h.barrio) THEN 4 ELSE 0 END
+                               + CASE WHEN c.museo_id = h.museo_id THEN 2 ELSE 0 END
+                               + CASE WHEN lower(c.ciudad) = lower(h.ciudad) THEN 1 ELSE 0 END
+                               + 3 * %(similitud)s AS puntuacion
+                          FROM (SELECT DISTINCT historia_id, relacionada_id
+                                  FROM pares WHERE historia_id != relacionada_id) p
+                          JOIN museo_historia_barrio h ON h.id = p.historia_id
+                          JOIN museo_historia_barrio c ON c.id = p.relacionada_id
+                          JOIN museo_museo m ON m.id = c.museo_id AND m.active
+                      ) candidatas
+                  ) ordenadas
+                 WHERE orden <= %(limite)s
+            """, similitud=similitud, lote=lote, limite=LIMITE_RELACIONADAS))
+        self.invalidate_model()
+        _logger.debug(f"Historias relacionadas refrescadas para {len(historia_ids)} historias")
+
+    @api.model
+    def _ids_relacionadas(self, historia_id, limite=LIMITE_RELACIONADAS):
+        """Ids de las relacionadas de una historia, en orden"""
+        return self.search_fetch(
+            [('historia_id', '=', historia_id)], ['relacionada_id'], order='orden', limit=limite
+        ).relacionada_id.ids
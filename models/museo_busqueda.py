@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+from odoo.tools import SQL
+from odoo.tools.sql import escape_psql
+from collections import OrderedDict
+import re
+import threading
+import time
+
+# Resultados por grupo (museos, objetos, historias)
+LIMITE_BUSQUEDA_GRUPO = 5
+
+# Longitud mínima y máxima del texto buscado
+LONGITUD_MINIMA_BUSQUEDA = 2
+LONGITUD_MAXIMA_BUSQUEDA = 64
+
+# Segundos que se reutiliza el resultado de una búsqueda
+TTL_BUSQUEDA = 60
+
+# Búsquedas guardadas como máximo por proceso. Los textos los elige el
+# visitante: van en una caché propia y acotada para no desalojar las
+# entradas del ORM de la caché compartida
+MAXIMO_CACHE_BUSQUEDA = 512
+
+# (base de datos, texto) -> (instante de caducidad, filas), del más antiguo
+# al más reciente
+_cache_busquedas = OrderedDict()
+_cache_busquedas_lock = threading.Lock()
+
+
+def _leer_cache_busqueda(clave):
+    with _cache_busquedas_lock:
+        entrada = _cache_busquedas.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] <= time.monotonic():
+            del _cache_busquedas[clave]
+            return None
+        _cache_busquedas.move_to_end(clave)
+        return entrada[1]
+
+
+def _guardar_cache_busqueda(clave, filas):
+    with _cache_busquedas_lock:
+        _cache_busquedas[clave] = (time.monotonic() + TTL_BUSQUEDA, filas)
+        _cache_busquedas.move_to_end(clave)
+        while len(_cache_busquedas) > MAXIMO_CACHE_BUSQUEDA:
+            _cache_busquedas.popitem(last=False)
+
+
+class MuseoBusqueda(models.AbstractModel):
+    """Búsqueda pública sobre museos, objetos e historias de barrio.
+
+    Una sola consulta devuelve los mejores resultados de cada grupo,
+    ordenados por coincidencia exacta, de prefijo o parcial. Las columnas
+    buscadas tienen índices trigram, que sirven los ILIKE '%texto%'.
+    """
+    _name = 'museo.busqueda'
+    _description = 'Búsqueda Pública de Museos'
+
+    @api.model
+    def _normalizar_texto(self, texto):
+        """Texto buscado en minúsculas y con los espacios colapsados, para que
+        las variantes de una misma búsqueda compartan la entrada de caché.
+        Devuelve '' si es demasiado corto"""
+        texto = re.sub(r'\s+', ' ', (texto or '')).strip().lower()[:LONGITUD_MAXIMA_BUSQUEDA]
+        return texto if len(texto) >= LONGITUD_MINIMA_BUSQUEDA else ''
+
+    @api.model
+    def buscar(self, texto):
+        """Resultados agrupados por tipo: {'museo': [...], 'objeto': [...],
+        'historia': [...]}, cada uno una lista de (id, título, detalle,
+        museo_id)"""
+        texto = self._normalizar_texto(texto)
+        if not texto:
+            return {'museo': [], 'objeto': [], 'historia': []}
+        clave = (self.env.cr.dbname, texto)
+        filas = _leer_cache_busqueda(clave)
+        if filas is None:
+            filas = self._buscar(texto)
+            _guardar_cache_busqueda(clave, filas)
+        grupos = {'museo': [], 'objeto': [], 'historia': []}
+        for tipo, registro_id, titulo, detalle, museo_id in filas:
+            grupos[tipo].append((registro_id, titulo, detalle, museo_id))
+        return grupos
+
+    @api.model
+    def _buscar(self, texto):
+        """Filas (tipo, id, título, detalle, museo_id) de los tres grupos"""
+        patron = f'%{escape_psql(texto)}%'
+        prefijo = f'{escape_psql(texto)}%'
+
+        def _rango(*columnas):
+            # 0: coincidencia exacta, 1: prefijo, 2: parcial
+            return SQL(
+                "CASE WHEN %s THEN 0 WHEN %s THEN 1 ELSE 2 END",
+                SQL(" OR ").join(SQL("lower(%s) = %s", columna, texto) for columna in columnas),
+                SQL(" OR ").join(SQL("%s ILIKE %s", columna, prefijo) for columna in columnas),
+            )
+
+        def _coincide(*columnas):
+            return SQL("(%s)", SQL(" OR ").join(SQL("%s ILIKE %s", columna, patron) for columna in columnas))
+
+        self.env.cr.execute(SQL("""
+            (SELECT 'museo', m.id, m.name, NULL, m.id
+               FROM museo_museo m
+              WHERE m.active AND %(museo_coincide)s
+              ORDER BY %(museo_rango)s, m.name, m.id
+              LIMIT %(limite)s)
+            UNION ALL
+            (SELECT 'objeto', o.id, o.name, o.codigo_inventario, o.museo_id
+               FROM museo_objeto o
+               JOIN museo_museo m ON m.id = o.museo_id
+              WHERE o.active AND m.active AND %(objeto_coincide)s
+              ORDER BY %(objeto_rango)s, o.name, o.id
+              LIMIT %(limite)s)
+            UNION ALL
+            (SELECT 'historia', h.id, h.name, h.barrio, h.museo_id
+               FROM museo_historia_barrio h
+               JOIN museo_museo m ON m.id = h.museo_id
+              WHERE h.active AND m.active AND %(historia_coincide)s
+              ORDER BY %(historia_rango)s, h.fecha_registro DESC, h.id
+              LIMIT %(limite)s)
+        """,
+            museo_coincide=_coincide(SQL("m.name")),
+            museo_rango=_rango(SQL("m.name")),
+            objeto_coincide=_coincide(SQL("o.name"), SQL("o.codigo_inventario")),
+            objeto_rango=_rango(SQL("o.name"), SQL("o.codigo_inventario")),
+            historia_coincide=_coincide(SQL("h.name"), SQL("h.barrio")),
+            historia_rango=_rango(SQL("h.name"), SQL("h.barrio")),
+            limite=LIMITE_BUSQUEDA_GRUPO,
+        ))
+        return tuple(self.env.cr.fetchall())
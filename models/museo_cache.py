@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Versiones de las cachés del módulo.
+
+Cada caché (facetas del catálogo, equipo de los museos, feeds iCalendar)
+lleva su versión en la clave de ``ormcache``. La versión es una secuencia
+de PostgreSQL: se lee con una consulta trivial, se comparte entre todos los
+workers y se incrementa sin bloqueos. Invalidar una caché solo cambia su
+versión; las entradas viejas dejan de usarse y salen del LRU por sí solas,
+sin vaciar el resto de la caché del ORM.
+"""
+from odoo.tools import SQL
+
+CACHE_FACETAS = 'museo_cache_facetas_seq'
+CACHE_TRABAJADORES = 'museo_cache_trabajadores_seq'
+CACHE_ICS = 'museo_cache_ics_seq'
+
+# Clave de las cachés pendientes de invalidar en cr.postcommit.data
+PENDIENTES_CACHE = 'museo.cache.pendientes'
+
+
+def crear_version_cache(cr, secuencia):
+    cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(secuencia)))
+
+
+def version_cache(cr, secuencia):
+    """Versión actual de una caché"""
+    cr.execute(SQL("SELECT last_value FROM %s", SQL.identifier(secuencia)))
+    return cr.fetchone()[0]
+
+
+def invalidar_cache(env, *secuencias):
+    """Incrementa la versión de las cachés una vez confirmada la
+    transacción, una sola vez por caché. Antes de confirmar, otro worker
+    podría guardar con la versión nueva un resultado calculado sin los
+    cambios"""
+    postcommit = env.cr.postcommit
+    pendientes = postcommit.data.get(PENDIENTES_CACHE)
+    if pendientes is None:
+        pendientes = postcommit.data[PENDIENTES_CACHE] = set()
+        registry = env.registry
+
+        def _incrementar():
+            with registry.cursor() as cr:
+                for secuencia in sorted(postcommit.data.pop(PENDIENTES_CACHE, ())):
+                    cr.execute(SQL("SELECT nextval(%s)", secuencia))
+
+        postcommit.add(_incrementar)
+    pendientes.update(secuencias)
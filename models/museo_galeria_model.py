@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from collections import Counter
+from .museo_imagen_mixin import TAMANO_MINIATURA, TAMANO_TARJETA, TAMANO_PORTADA
 
 class MuseoMuseoGaleria(models.Model):
     _name = 'museo.museo.galeria'
     _description = 'Galería de Fotos del Museo'
-    _inherit = ['mail.thread', 'mail.activity.mixin', 'image.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'image.mixin', 'museo.imagen.mixin', 'museo.imagen.huella.mixin', 'museo.publicacion.mixin']
     _order = 'sequence asc, id desc'
     
     name = fields.Char(
@@ -28,6 +30,46 @@ class MuseoMuseoGaleria(models.Model):
         help='Sube una imagen para la galería'
     )
     
+    # Variantes precalculadas; el museo las sirve por referencia cuando esta
+    # foto es su imagen principal
+    imagen_miniatura = fields.Image(
+        string='Miniatura',
+        related='imagen',
+        max_width=TAMANO_MINIATURA,
+        max_height=TAMANO_MINIATURA,
+        store=True
+    )
+    
+    imagen_tarjeta = fields.Image(
+        string='Imagen de Tarjeta',
+        related='imagen',
+        max_width=TAMANO_TARJETA,
+        max_height=TAMANO_TARJETA,
+        store=True
+    )
+    
+    imagen_portada = fields.Image(
+        string='Imagen de Portada',
+        related='imagen',
+        max_width=TAMANO_PORTADA,
+        max_height=TAMANO_PORTADA,
+        store=True
+    )
+    
+    imagen_tarjeta_webp = fields.Binary(
+        string='Imagen de Tarjeta (WebP)',
+        compute='_compute_imagen_webp',
+        store=True,
+        attachment=True
+    )
+    
+    imagen_portada_webp = fields.Binary(
+        string='Imagen de Portada (WebP)',
+        compute='_compute_imagen_webp',
+        store=True,
+        attachment=True
+    )
+    
     descripcion = fields.Text(
         string='Descripción Detallada',
         help='Descripción completa de la imagen'
@@ -71,47 +113,102 @@ class MuseoMuseoGaleria(models.Model):
         default=True
     )
     
-    @api.constrains('es_imagen_principal')
-    def _check_imagen_principal(self):
-        """Valida que solo haya una imagen principal por museo"""
+    def _check_imagen_principal(self, museo_ids):
+        """Valida que solo haya una imagen principal por museo. Recibe los
+        museos (con repeticiones) que tendrán una principal tras la operación
+        y lo comprueba para todo el lote en una sola consulta"""
+        museo_ids = [museo_id for museo_id in museo_ids if museo_id]
+        if not museo_ids:
+            return
+        repetidos = {museo_id for museo_id, cantidad in Counter(museo_ids).items() if cantidad > 1}
+        existentes = self.search([
+            ('museo_id', 'in', list(set(museo_ids))),
+            ('es_imagen_principal', '=', True),
+            ('id', 'not in', self.ids),
+        ]).museo_id
+        conflictos = self.env['museo.museo'].browse(repetidos) | existentes
+        if conflictos:
+            raise ValidationError(
+                _('Solo puede haber una imagen principal por museo. '
+                  'Existen otras imágenes marcadas como principales en: %s',
+                  ', '.join(conflictos.mapped('name')))
+            )
+    
+    def init(self):
+        """Garantiza en base de datos una sola imagen principal activa por
+        museo (también ante subidas concurrentes) y enlaza las existentes"""
+        self.env.cr.execute("""
+            UPDATE museo_museo_galeria
+               SET es_imagen_principal = FALSE
+             WHERE id IN (
+                SELECT id
+                  FROM (SELECT id, row_number() OVER (PARTITION BY museo_id ORDER BY sequence, id) AS orden
+                          FROM museo_museo_galeria
+                         WHERE es_imagen_principal AND active) principales
+                 WHERE orden > 1
+             )
+        """)
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS museo_museo_galeria_principal_unica
+                ON museo_museo_galeria (museo_id)
+             WHERE es_imagen_principal AND active
+        """)
+        self.env.cr.execute("""
+            UPDATE museo_museo m
+               SET galeria_principal_id = g.id
+              FROM museo_museo_galeria g
+             WHERE g.museo_id = m.id
+               AND g.es_imagen_principal
+               AND g.active
+               AND m.galeria_principal_id IS NULL
+        """)
+    
+    @api.depends('imagen_tarjeta', 'imagen_portada')
+    def _compute_imagen_webp(self):
+        """Genera las variantes WebP si están habilitadas en la configuración"""
         for foto in self:
-            if foto.es_imagen_principal:
-                # Buscar otras imágenes principales para el mismo museo
-                otras_principales = self.search([
-                    ('museo_id', '=', foto.museo_id.id),
-                    ('es_imagen_principal', '=', True),
-                    ('id', '!=', foto.id),
-                    ('active', '=', True),
-                ])
-                
-                if otras_principales:
-                    raise ValidationError(
-                        _('Solo puede haber una imagen principal por museo. '
-                          'Existen otras imágenes marcadas como principales.')
-                    )
-    
-    @api.model
-    def create(self, vals):
-        """Al crear una imagen marcada como principal, actualizar el museo"""
-        foto = super(MuseoMuseoGaleria, self).create(vals)
-        
-        if foto.es_imagen_principal and foto.imagen:
-            foto.museo_id.write({
-                'imagen_principal': foto.imagen
-            })
-        
-        return foto
+            foto.imagen_tarjeta_webp = self._imagen_a_webp(foto.imagen_tarjeta)
+            foto.imagen_portada_webp = self._imagen_a_webp(foto.imagen_portada)
+    
+    def _actualizar_principal_museo(self):
+        """Apunta cada museo a su foto principal. Solo se actualiza la
+        referencia: el binario nunca se copia al museo"""
+        for foto in self:
+            museo = foto.museo_id
+            if foto.es_imagen_principal and foto.active:
+                if museo.galeria_principal_id != foto:
+                    museo.galeria_principal_id = foto
+            elif museo.galeria_principal_id == foto:
+                museo.galeria_principal_id = False
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Al crear una imagen marcada como principal, enlazarla al museo"""
+        self._check_imagen_principal([
+            vals.get('museo_id', self.env.context.get('default_museo_id')) for vals in vals_list
+            if vals.get('es_imagen_principal') and vals.get('active', True)
+        ])
+        fotos = super(MuseoMuseoGaleria, self).create(vals_list)
+        fotos.filtered('es_imagen_principal')._actualizar_principal_museo()
+        return fotos
     
     def write(self, vals):
-        """Al actualizar una imagen marcada como principal, actualizar el museo"""
+        """Al marcar, desmarcar o archivar una imagen, actualizar la referencia
+        del museo. Cambiar el binario no requiere tocar el museo"""
+        if vals.get('es_imagen_principal') or vals.get('active') or vals.get('museo_id'):
+            self._check_imagen_principal([
+                vals.get('museo_id', foto.museo_id.id) for foto in self
+                if vals.get('es_imagen_principal', foto.es_imagen_principal)
+                and vals.get('active', foto.active)
+            ])
+        museos_previos = self.museo_id if 'museo_id' in vals else self.env['museo.museo']
         result = super(MuseoMuseoGaleria, self).write(vals)
-        
-        for foto in self:
-            if foto.es_imagen_principal and 'imagen' in vals:
-                foto.museo_id.write({
-                    'imagen_principal': foto.imagen
-                })
-        
+        if {'es_imagen_principal', 'active', 'museo_id'}.intersection(vals):
+            self._actualizar_principal_museo()
+        # Una foto trasladada deja de ser la principal de su museo anterior
+        museos_previos.filtered(
+            lambda m: m.galeria_principal_id in self and m.galeria_principal_id.museo_id != m
+        ).galeria_principal_id = False
         return result
     
     def action_set_as_principal(self):
@@ -128,17 +225,14 @@ class MuseoMuseoGaleria(models.Model):
         
         if otras_principales:
             otras_principales.write({'es_imagen_principal': False})
+            # El índice único no admite dos principales ni siquiera un instante
+            otras_principales.flush_recordset(['es_imagen_principal'])
         
-        # Marcar esta como principal y actualizar el museo
+        # Marcar esta como principal; write() actualiza la referencia del museo
         self.write({
             'es_imagen_principal': True,
         })
         
-        if self.imagen:
-            self.museo_id.write({
-                'imagen_principal': self.imagen
-            })
-        
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
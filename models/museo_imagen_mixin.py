@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools.image import base64_to_image, image_process
+from odoo.models import PREFETCH_MAX
+from PIL import Image
+from itertools import islice
+import base64
+import io
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Tamaños de las variantes precalculadas (ancho, alto máximos)
+TAMANO_MINIATURA = 256
+TAMANO_TARJETA = 512
+TAMANO_PORTADA = 1920
+
+# Huella perceptual (dHash de 64 bits) repartida en bandas de 16 bits.
+# Dos huellas a distancia de Hamming <= 7 coinciden, con a lo sumo un bit
+# de diferencia, en al menos una banda (principio del palomar).
+BANDAS_HUELLA = 4
+BITS_BANDA = 16
+
+# Imágenes leídas a la vez en las cargas masivas y hilos que las reducen
+# (PIL libera el GIL al decodificar y redimensionar): acota la memoria de
+# la petición sin salir del proceso del servidor
+LOTE_CARGA = 20
+HILOS_CARGA = 4
+
+# Modelos servidos por la ruta pública /museos/imagen/<ruta>/...
+MODELOS_IMAGEN_PUBLICA = {
+    'museo': 'museo.museo',
+    'objeto': 'museo.objeto',
+    'galeria': 'museo.museo.galeria',
+    'trabajador': 'res.partner',
+}
+
+# Clave en cr.cache de los checksums de imágenes ya consultados
+CACHE_CHECKSUMS = 'museos.checksums_imagen'
+
+
+class MuseoImagenMixin(models.AbstractModel):
+    _name = 'museo.imagen.mixin'
+    _description = 'Utilidades de Imágenes del Museo'
+    
+    # Variantes publicables: nombre en la URL -> (campo, ancho para srcset)
+    _variantes_imagen = {
+        'miniatura': ('imagen_miniatura', TAMANO_MINIATURA),
+        'tarjeta': ('imagen_tarjeta', TAMANO_TARJETA),
+        'portada': ('imagen_portada', TAMANO_PORTADA),
+        'tarjeta_webp': ('imagen_tarjeta_webp', TAMANO_TARJETA),
+        'portada_webp': ('imagen_portada_webp', TAMANO_PORTADA),
+    }
+    
+    def _imagen_publica(self):
+        """Indica si las imágenes del registro se pueden servir al público"""
+        self.ensure_one()
+        return self.active
+    
+    def _checksums_imagen(self):
+        """Checksums de los adjuntos de las variantes del registro. Se leen en
+        una sola consulta para todo el lote de prefetch y se guardan en la
+        caché del cursor, de modo que un listado no consulta por imagen"""
+        self.ensure_one()
+        cache = self.env.cr.cache.setdefault(CACHE_CHECKSUMS, {})
+        if (self._name, self.id) not in cache:
+            ids = {self.id} | set(islice(
+                (id_ for id_ in self._prefetch_ids if isinstance(id_, int) and (self._name, id_) not in cache),
+                PREFETCH_MAX
+            ))
+            for id_ in ids:
+                cache[(self._name, id_)] = {}
+            adjuntos = self.env['ir.attachment'].sudo().search_read([
+                ('res_model', '=', self._name),
+                ('res_id', 'in', list(ids)),
+                ('res_field', 'in', list({campo for campo, _ancho in self._variantes_imagen.values()})),
+            ], ['res_id', 'res_field', 'checksum'])
+            for adjunto in adjuntos:
+                cache[(self._name, adjunto['res_id'])][adjunto['res_field']] = adjunto['checksum']
+        return cache[(self._name, self.id)]
+    
+    def _url_imagen(self, variante):
+        """URL pública de una variante, versionada con el checksum de su
+        contenido: no cambia mientras la imagen no cambie, por lo que se
+        sirve como inmutable. Devuelve False si la variante no existe"""
+        self.ensure_one()
+        if variante not in self._variantes_imagen:
+            return False
+        checksum = self._checksums_imagen().get(self._variantes_imagen[variante][0])
+        if not checksum:
+            return False
+        ruta = next(ruta for ruta, modelo in MODELOS_IMAGEN_PUBLICA.items() if modelo == self._name)
+        return f'/museos/imagen/{ruta}/{self.id}/{variante}/{checksum[:16]}'
+    
+    def _srcset_imagen(self, variantes=('miniatura', 'tarjeta', 'portada')):
+        """Atributo srcset con las variantes disponibles y su ancho"""
+        self.ensure_one()
+        return ', '.join(
+            f'{url} {self._variantes_imagen[variante][1]}w'
+            for variante in variantes
+            for url in [self._url_imagen(variante)] if url
+        )
+
+    @api.model
+    def _webp_habilitado(self):
+        """Indica si la configuración pide generar variantes WebP"""
+        return self.env['ir.config_parameter'].sudo().get_param('museos.generar_webp') in ('True', '1')
+
+    @api.model
+    def _imagen_a_webp(self, imagen, calidad=80):
+        """Convierte una imagen en base64 a WebP (base64). Devuelve False si
+        la opción está desactivada o la imagen no se puede procesar"""
+        if not imagen or not self._webp_habilitado():
+            return False
+        try:
+            img = base64_to_image(imagen)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA')
+            salida = io.BytesIO()
+            img.save(salida, format='WEBP', quality=calidad, method=4)
+            return base64.b64encode(salida.getvalue())
+        except (OSError, ValueError, UserError) as e:
+            _logger.warning(f"No se pudo generar la variante WebP: {e}")
+            return False
+
+
+def calcular_dhash(imagen):
+    """Calcula el dHash (64 bits) de una imagen en base64: compara el brillo
+    de píxeles vecinos sobre una reducción a 9x8 en escala de grises"""
+    img = base64_to_image(imagen).convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixeles = list(img.getdata())
+    valor = 0
+    for fila in range(8):
+        for columna in range(8):
+            izquierda = pixeles[fila * 9 + columna]
+            derecha = pixeles[fila * 9 + columna + 1]
+            valor = (valor << 1) | int(izquierda > derecha)
+    return valor
+
+
+def valores_huella(valor):
+    """Valores de los campos de huella para un dHash (o None si no hay)"""
+    mascara = (1 << BITS_BANDA) - 1
+    valores = {'imagen_phash': f'{valor:016x}' if valor is not None else False}
+    for banda in range(BANDAS_HUELLA):
+        desplazamiento = BITS_BANDA * (BANDAS_HUELLA - 1 - banda)
+        valores[f'imagen_phash_b{banda}'] = (valor >> desplazamiento) & mascara if valor is not None else 0
+    return valores
+
+
+def preparar_imagen_carga(contenido):
+    """Prepara una imagen subida (bytes): la reduce al tamaño de portada y
+    calcula su huella. Devuelve la tupla
+    (imagen en base64, valores de huella, error)"""
+    try:
+        reducida = image_process(contenido, size=(TAMANO_PORTADA, TAMANO_PORTADA))
+        imagen = base64.b64encode(reducida)
+        return imagen, valores_huella(calcular_dhash(imagen)), False
+    except (OSError, ValueError, UserError) as e:
+        return False, {}, str(e)
+
+
+class MuseoImagenHuellaMixin(models.AbstractModel):
+    """Huella perceptual de la imagen de un registro, indexada por bandas
+    para buscar casi duplicados sin comparar todos los pares"""
+    _name = 'museo.imagen.huella.mixin'
+    _description = 'Huella Perceptual de Imágenes'
+
+    # Campo de imagen del que se calcula la huella
+    _campo_huella = 'imagen'
+
+    imagen_phash = fields.Char(
+        string='Huella Perceptual',
+        compute='_compute_imagen_phash',
+        store=True,
+        index=True,
+        copy=False
+    )
+
+    imagen_phash_b0 = fields.Integer(compute='_compute_imagen_phash', store=True, copy=False)
+    imagen_phash_b1 = fields.Integer(compute='_compute_imagen_phash', store=True, copy=False)
+    imagen_phash_b2 = fields.Integer(compute='_compute_imagen_phash', store=True, copy=False)
+    imagen_phash_b3 = fields.Integer(compute='_compute_imagen_phash', store=True, copy=False)
+
+    @api.depends(lambda self: [self._campo_huella])
+    def _compute_imagen_phash(self):
+        for registro in self:
+            valor = None
+            imagen = registro[self._campo_huella]
+            if imagen:
+                try:
+                    valor = calcular_dhash(imagen)
+                except (OSError, ValueError, UserError) as e:
+                    _logger.warning(f"No se pudo calcular la huella de {registro}: {e}")
+            registro.update(valores_huella(valor))
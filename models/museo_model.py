@@ -1,29 +1,108 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
-from datetime import date
+from datetime import date, timedelta
+from odoo.tools import SQL
+from .museo_imagen_mixin import TAMANO_MINIATURA, TAMANO_TARJETA, TAMANO_PORTADA
+from .museo_cache import CACHE_FACETAS, CACHE_ICS, invalidar_cache
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Clave de los museos con versión pendiente de incrementar en cr.precommit.data
+PENDIENTES_VERSION = 'museo.museo.version_publica.pendientes'
+
 class MuseoMuseo(models.Model):
     _name = 'museo.museo'
     _description = 'Museo'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'museo.imagen.mixin']
     _order = 'name asc'
     
     name = fields.Char(
         string='Nombre del Museo',
         required=True,
+        index='trigram',
         tracking=True
     )
 
     # FOTO PRINCIPAL - Campo para la imagen principal
-    imagen_principal = fields.Binary(
+    imagen_principal = fields.Image(
         string='Foto Principal',
         attachment=True,
         help='Imagen principal del museo para mostrar en listados y perfiles'
     )
+    
+    # Foto de la galería usada como principal. Tiene prioridad sobre
+    # imagen_principal y se sirve por referencia, sin copiar el binario
+    galeria_principal_id = fields.Many2one(
+        'museo.museo.galeria',
+        string='Foto Principal de la Galería',
+        ondelete='set null',
+        readonly=True,
+        copy=False
+    )
+    
+    # Se incrementa con cada cambio del contenido publicado; forma parte de
+    # la clave de la caché de fragmentos de la página pública
+    version_publica = fields.Integer(
+        string='Versión Pública',
+        default=1,
+        readonly=True,
+        copy=False
+    )
+    
+    # Momento del último incremento de version_publica: Last-Modified y
+    # lastmod del sitemap de todas las páginas públicas que dependen del museo
+    fecha_publicacion = fields.Datetime(
+        string='Fecha de Publicación',
+        default=fields.Datetime.now,
+        readonly=True,
+        copy=False
+    )
+    
+    imagen_galeria_principal = fields.Image(
+        string='Foto Principal',
+        related='galeria_principal_id.imagen_miniatura'
+    )
+    
+    # Variantes precalculadas al guardar, para no servir el original en listados
+    imagen_miniatura = fields.Image(
+        string='Miniatura',
+        related='imagen_principal',
+        max_width=TAMANO_MINIATURA,
+        max_height=TAMANO_MINIATURA,
+        store=True
+    )
+    
+    imagen_tarjeta = fields.Image(
+        string='Imagen de Tarjeta',
+        related='imagen_principal',
+        max_width=TAMANO_TARJETA,
+        max_height=TAMANO_TARJETA,
+        store=True
+    )
+    
+    imagen_portada = fields.Image(
+        string='Imagen de Portada',
+        related='imagen_principal',
+        max_width=TAMANO_PORTADA,
+        max_height=TAMANO_PORTADA,
+        store=True
+    )
+    
+    imagen_tarjeta_webp = fields.Binary(
+        string='Imagen de Tarjeta (WebP)',
+        compute='_compute_imagen_webp',
+        store=True,
+        attachment=True
+    )
+    
+    imagen_portada_webp = fields.Binary(
+        string='Imagen de Portada (WebP)',
+        compute='_compute_imagen_webp',
+        store=True,
+        attachment=True
+    )
 
     # GALERÍA DE FOTOS - Campo para múltiples imágenes
     galeria_ids = fields.One2many(
@@ -141,6 +220,57 @@ class MuseoMuseo(models.Model):
         store=False
     )
     
+    # Analítica de la colección (leída de museo.objeto.analitica)
+    valor_coleccion = fields.Float(
+        string='Valor de la Colección',
+        digits=(14, 2),
+        compute='_compute_analitica_coleccion',
+        store=False
+    )
+    
+    valor_mediana_objeto = fields.Float(
+        string='Valor Mediano por Objeto',
+        digits=(12, 2),
+        compute='_compute_analitica_coleccion',
+        store=False
+    )
+    
+    objetos_en_riesgo = fields.Integer(
+        string='Objetos en Riesgo',
+        compute='_compute_analitica_coleccion',
+        store=False,
+        help='Objetos en estado malo o en restauración'
+    )
+    
+    @api.depends('imagen_tarjeta', 'imagen_portada')
+    def _compute_imagen_webp(self):
+        """Genera las variantes WebP si están habilitadas en la configuración"""
+        for museo in self:
+            museo.imagen_tarjeta_webp = self._imagen_a_webp(museo.imagen_tarjeta)
+            museo.imagen_portada_webp = self._imagen_a_webp(museo.imagen_portada)
+    
+    def _fuente_imagen_principal(self):
+        """Registro que aporta la imagen principal y sus variantes: la foto
+        principal de la galería o, si no hay, el propio museo. Ambos exponen
+        los mismos campos imagen_miniatura, imagen_tarjeta e imagen_portada"""
+        self.ensure_one()
+        return self.galeria_principal_id or self
+    
+    def _url_imagen_principal(self, variante='portada'):
+        """URL pública de la imagen principal (WebP si existe), versionada
+        con el checksum de la foto que la aporta"""
+        self.ensure_one()
+        fuente = self._fuente_imagen_principal()
+        return fuente._url_imagen(f'{variante}_webp') or fuente._url_imagen(variante) or ''
+    
+    def _compute_analitica_coleccion(self):
+        totales = self.env['museo.objeto.analitica'].sudo()._totales_por_museo(self.ids)
+        for museo in self:
+            fila = totales.get(museo.id)
+            museo.valor_coleccion = fila.valor_total if fila else 0.0
+            museo.valor_mediana_objeto = fila.valor_mediana if fila else 0.0
+            museo.objetos_en_riesgo = (fila.cantidad_malo + fila.cantidad_restauracion) if fila else 0
+    
     @api.depends('informe_ids')
     def _compute_informes_publicados(self):
         for museo in self:
@@ -150,13 +280,17 @@ class MuseoMuseo(models.Model):
     
     @api.depends('convenio_ids')
     def _compute_convenios_por_vencer(self):
-        hoy = fields.Date.today()
+        """Una sola consulta agrupada para todos los museos mostrados, con la
+        ventana de aviso más amplia de la configuración"""
+        ventanas = self.env['museo.convenio.aviso']._ventanas_aviso()
+        limite = fields.Date.today() + timedelta(days=max(ventanas.values(), default=30))
+        conteos = dict(self.env['museo.convenio']._read_group(
+            [('museo_id', 'in', self._origin.ids), ('estado', '=', 'vigente'),
+             ('fecha_fin', '!=', False), ('fecha_fin', '<=', limite)],
+            ['museo_id'], ['__count'],
+        ))
         for museo in self:
-            museo.convenios_por_vencer_count = len(museo.convenio_ids.filtered(
-                lambda r: r.estado == 'vigente' 
-                and r.fecha_fin 
-                and (r.fecha_fin - hoy).days <= 30
-            ))
+            museo.convenios_por_vencer_count = conteos.get(museo._origin, 0)
     
     @api.depends('actividad_ids')
     def _compute_actividades_proximas(self):
@@ -213,6 +347,18 @@ class MuseoMuseo(models.Model):
             'context': {'default_museo_id': self.id}
         }
     
+    def action_view_analitica(self):
+        """Acción para ver la analítica de la colección del museo"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Analítica de Colección - {self.name}',
+            'res_model': 'museo.objeto.analitica',
+            'view_mode': 'list,pivot,graph',
+            'domain': [('museo_id', '=', self.id), ('es_total', '=', False)],
+            'context': {'default_museo_id': self.id}
+        }
+    
     def action_view_galeria(self):
         """Acción para ver la galería de fotos del museo"""
         self.ensure_one()
@@ -235,6 +381,65 @@ class MuseoMuseo(models.Model):
             museo.total_actividades = len(museo.actividad_ids)
             museo.total_convenios = len(museo.convenio_ids)
     
+    def action_cargar_galeria(self):
+        """Acción para cargar varias fotos (o un ZIP) en la galería"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': f'Cargar Fotos - {self.name}',
+            'res_model': 'museo.wizard.carga.galeria',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {
+                'default_museo_id': self.id,
+            }
+        }
+    
+    def write(self, vals):
+        """Archivar o reactivar un museo altera las facetas del catálogo y
+        los feeds iCalendar, que también muestran su nombre; cualquier cambio
+        invalida su página pública"""
+        result = super(MuseoMuseo, self).write(vals)
+        if 'active' in vals:
+            invalidar_cache(self.env, CACHE_FACETAS, CACHE_ICS)
+            # Las historias de un museo archivado dejan de ser relacionadas
+            historias = self.env['museo.historia.barrio'].sudo().search([('museo_id', 'in', self.ids)])
+            self.env['museo.historia.relacionada']._marcar_pendientes(historias.ids)
+        elif 'name' in vals:
+            invalidar_cache(self.env, CACHE_ICS)
+        self._marcar_version_publica(self.ids)
+        return result
+    
+    @api.model
+    def _marcar_version_publica(self, museo_ids):
+        """Agenda el incremento de la versión pública de los museos dados al
+        confirmar la transacción, una sola vez por museo"""
+        museo_ids = {museo_id for museo_id in museo_ids if museo_id}
+        if not museo_ids:
+            return
+        precommit = self.env.cr.precommit
+        pendientes = precommit.data.get(PENDIENTES_VERSION)
+        if pendientes is None:
+            pendientes = precommit.data[PENDIENTES_VERSION] = set()
+            museos = self.sudo()
+            precommit.add(lambda: museos._incrementar_version_publica(precommit.data.pop(PENDIENTES_VERSION, ())))
+        pendientes.update(museo_ids)
+    
+    @api.model
+    def _incrementar_version_publica(self, museo_ids):
+        # SQL directo: no debe pasar por write() ni por el seguimiento del
+        # chatter, y deja write_date para los cambios del propio museo
+        museo_ids = list(museo_ids)
+        if not museo_ids:
+            return
+        self.env.cr.execute(SQL("""
+            UPDATE museo_museo
+               SET version_publica = version_publica + 1,
+                   fecha_publicacion = (now() AT TIME ZONE 'UTC')
+             WHERE id = ANY(%s)
+        """, museo_ids))
+        self.browse(museo_ids).invalidate_recordset(['version_publica', 'fecha_publicacion'])
+    
     @api.constrains('fecha_creacion')
     def _check_fecha_creacion(self):
         for museo in self:
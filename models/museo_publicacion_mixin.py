@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class MuseoPublicacionMixin(models.AbstractModel):
+    """Registros mostrados en la página pública de un museo.
+
+    Crear, modificar o borrar uno de ellos incrementa la versión pública
+    del museo, que forma parte de la clave de la caché de fragmentos de la
+    página. El incremento se hace una sola vez por museo y transacción.
+    """
+    _name = 'museo.publicacion.mixin'
+    _description = 'Contenido Publicado en la Página del Museo'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        registros = super().create(vals_list)
+        self.env['museo.museo']._marcar_version_publica(registros.museo_id.ids)
+        return registros
+
+    def write(self, vals):
+        museos_previos = self.museo_id.ids if 'museo_id' in vals else []
+        result = super().write(vals)
+        self.env['museo.museo']._marcar_version_publica(museos_previos + self.museo_id.ids)
+        return result
+
+    def unlink(self):
+        self.env['museo.museo']._marcar_version_publica(self.museo_id.ids)
+        return super().unlink()
+
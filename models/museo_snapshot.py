@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api, _
+from odoo.exceptions import UserError
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+import requests
+
+_logger = logging.getLogger(__name__)
+
+# Descargas simultáneas como máximo: el trabajo es esperar al servidor de
+# origen, basta con hilos sin acceso a la base de datos
+HILOS_SNAPSHOT = 4
+
+# Segundos de espera por petición al servidor de origen
+TIMEOUT_SNAPSHOT = 60
+
+# Estado de la última exportación (ruta -> ETag), dentro del directorio
+MANIFIESTO_SNAPSHOT = '.snapshot.json'
+
+# URLs de recursos que se copian al sitio estático (CSS, JS, fuentes, imágenes)
+RE_RECURSO = re.compile(r'''(?<=["'(\s,])/(?:web|website|museos)/(?:assets|image|content|static|imagen)/[^"'()\s,<>]+''')
+
+
+def _ruta_local(url):
+    """Ruta del archivo estático para una URL del sitio. Las consultas
+    (?unique=...) no existen en disco: se codifican en el nombre"""
+    ruta, _sep, consulta = url.partition('?')
+    ruta = ruta.split('#')[0]
+    if consulta:
+        base, extension = os.path.splitext(ruta)
+        ruta = f"{base}__{hashlib.sha1(consulta.encode()).hexdigest()[:10]}{extension}"
+    return ruta
+
+
+def _reescribir(texto, origen):
+    """Hace relativas al sitio las URLs absolutas del servidor de origen y
+    apunta las de recursos a su copia estática. Devuelve el texto y las URLs
+    de recursos encontradas"""
+    texto = texto.replace(origen, '')
+    recursos = {url.replace('&amp;', '&') for url in RE_RECURSO.findall(texto)}
+    texto = RE_RECURSO.sub(lambda m: _ruta_local(m.group(0).replace('&amp;', '&')), texto)
+    return texto, recursos
+
+
+def _dentro(directorio, ruta):
+    """Ruta absoluta de un archivo del sitio estático, o None si se sale del
+    directorio (p. ej. con '..' en la URL)"""
+    raiz = os.path.realpath(directorio)
+    destino = os.path.realpath(os.path.join(raiz, ruta.lstrip('/')))
+    return destino if destino.startswith(raiz + os.sep) else None
+
+
+def _escribir(directorio, ruta, contenido):
+    destino = _dentro(directorio, ruta)
+    if not destino:
+        raise OSError(f"Ruta fuera del directorio del sitio estático: {ruta}")
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f'{destino}.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, destino)
+
+
+def exportar_pagina(origen, directorio, ruta, etag):
+    """Renderiza una página pidiéndola al servidor de origen, fuera del
+    proceso del servidor. Con el ETag de la exportación anterior el servidor
+    responde 304 si no cambió nada. Devuelve (ruta, etag, recursos, error)"""
+    try:
+        respuesta = requests.get(
+            origen + ruta,
+            headers={'If-None-Match': etag} if etag else {},
+            timeout=TIMEOUT_SNAPSHOT,
+            allow_redirects=False,
+        )
+        if respuesta.status_code == 304:
+            return ruta, etag, None, False
+        respuesta.raise_for_status()
+        html, recursos = _reescribir(respuesta.text, origen)
+        _escribir(directorio, f'{ruta}/index.html', html.encode())
+        return ruta, respuesta.headers.get('ETag'), sorted(recursos), False
+    except (requests.RequestException, OSError) as e:
+        return ruta, etag, None, str(e)
+
+
+def exportar_recurso(origen, directorio, url):
+    """Copia un recurso al sitio estático. Los recursos versionados (bundles
+    y fotos con checksum en la URL) no se vuelven a descargar si ya existen.
+    Devuelve (url, recursos que referencia si es CSS, error)"""
+    ruta = _ruta_local(url)
+    destino = _dentro(directorio, ruta)
+    if destino and os.path.exists(destino) and not url.startswith('/museos/static/'):
+        return url, [], False
+    try:
+        respuesta = requests.get(origen + url, timeout=TIMEOUT_SNAPSHOT)
+        respuesta.raise_for_status()
+        contenido, recursos = respuesta.content, set()
+        if ruta.endswith('.css'):
+            css, recursos = _reescribir(respuesta.text, origen)
+            contenido = css.encode()
+        _escribir(directorio, ruta, contenido)
+        return url, sorted(recursos), False
+    except (requests.RequestException, OSError) as e:
+        return url, [], str(e)
+
+
+class MuseoSnapshot(models.AbstractModel):
+    """Exportación de las páginas públicas de los museos a HTML estático,
+    para servirlas desde un CDN o un servidor web sin pasar por Odoo.
+
+    La exportación corre en el cron, nunca dentro de una petición: las
+    páginas se piden al propio servidor en paralelo desde hilos que no tocan
+    la base de datos. Es incremental: cada página guarda su ETag en el
+    manifiesto del directorio y solo se reescribe si el servidor responde
+    con contenido nuevo.
+    """
+    _name = 'museo.snapshot'
+    _description = 'Exportación Estática de las Páginas Públicas'
+
+    @api.model
+    def _rutas_snapshot(self):
+        """Rutas de todas las páginas a exportar, las mismas del sitemap"""
+        # Importación diferida: los controladores se cargan después de los modelos
+        from ..controllers.museo_controllers import sitemap_historias, sitemap_museos, sitemap_objetos
+        rutas = ['/museos']
+        for generador in (sitemap_museos, sitemap_objetos, sitemap_historias):
+            rutas += [pagina['loc'] for pagina in generador(self.env, None, None)]
+        return rutas
+
+    @api.model
+    def _en_paralelo(self, funcion, tareas):
+        hilos = min(HILOS_SNAPSHOT, len(tareas))
+        if hilos <= 1:
+            return [funcion(*tarea) for tarea in tareas]
+        with ThreadPoolExecutor(max_workers=hilos) as grupo:
+            return list(grupo.map(funcion, *zip(*tareas)))
+    
+    @api.model
+    def _validar_directorio(self, directorio):
+        """Directorio absoluto y normalizado de la exportación. Solo se
+        admite uno nuevo, uno vacío o uno con el manifiesto de una
+        exportación anterior: nunca se escribe en un directorio ajeno"""
+        if not directorio or not os.path.isabs(directorio):
+            raise UserError(_('El directorio del sitio estático debe ser una ruta absoluta'))
+        directorio = os.path.realpath(directorio)
+        if os.path.exists(directorio):
+            if not os.path.isdir(directorio):
+                raise UserError(_('%s no es un directorio', directorio))
+            if os.listdir(directorio) and not os.path.exists(os.path.join(directorio, MANIFIESTO_SNAPSHOT)):
+                raise UserError(_(
+                    'El directorio %s no está vacío ni contiene una exportación anterior', directorio
+                ))
+        return directorio
+    
+    @api.model
+    def _validar_origen(self, origen):
+        """URL http(s) del propio sitio o de un servidor local, sin
+        credenciales ni ruta: no se piden páginas a servidores ajenos"""
+        base = urlsplit(self.get_base_url())
+        url = urlsplit(origen or base.geturl())
+        if url.scheme not in ('http', 'https') or not url.hostname or url.username or url.password \
+                or url.path.strip('/') or url.query or url.fragment:
+            raise UserError(_('La URL de origen debe ser de la forma http(s)://servidor[:puerto]'))
+        try:
+            local = ipaddress.ip_address(url.hostname).is_loopback
+        except ValueError:
+            local = url.hostname == 'localhost'
+        if not local and url.hostname != base.hostname:
+            raise UserError(_('La URL de origen debe ser la del propio sitio o un servidor local'))
+        return f'{url.scheme}://{url.netloc}'
+    
+    @api.model
+    def _cron_exportar(self):
+        """Exportación programada o pedida desde la configuración"""
+        if not self.env['ir.config_parameter'].sudo().get_param('museos.snapshot_directorio'):
+            return
+        self.exportar(incremental=True)
+
+    @api.model
+    def exportar(self, incremental=True):
+        """Exporta el sitio al directorio configurado y devuelve un resumen"""
+        parametros = self.env['ir.config_parameter'].sudo()
+        directorio = parametros.get_param('museos.snapshot_directorio')
+        if not directorio:
+            raise UserError(_('Configure el directorio del sitio estático antes de exportar'))
+        directorio = self._validar_directorio(directorio)
+        origen = self._validar_origen(parametros.get_param('museos.snapshot_url_origen'))
+        os.makedirs(directorio, exist_ok=True)
+
+        ruta_manifiesto = os.path.join(directorio, MANIFIESTO_SNAPSHOT)
+        manifiesto = {}
+        if incremental and os.path.exists(ruta_manifiesto):
+            with open(ruta_manifiesto) as archivo:
+                manifiesto = json.load(archivo)
+
+        rutas = self._rutas_snapshot()
+        resumen = {'actualizadas': 0, 'sin_cambios': 0, 'eliminadas': 0, 'recursos': 0, 'errores': 0}
+        nuevo_manifiesto = {}
+        recursos = set()
+        for ruta, etag, encontrados, error in self._en_paralelo(
+                exportar_pagina, [(origen, directorio, ruta, manifiesto.get(ruta)) for ruta in rutas]):
+            if error:
+                _logger.warning(f"Exportación estática: error en {ruta}: {error}")
+                resumen['errores'] += 1
+                continue
+            nuevo_manifiesto[ruta] = etag
+            if encontrados is None:
+                resumen['sin_cambios'] += 1
+            else:
+                resumen['actualizadas'] += 1
+                recursos.update(encontrados)
+
+        # Los CSS pueden referenciar fuentes e imágenes: una segunda ronda
+        pendientes, copiados = recursos, set()
+        while pendientes:
+            copiados |= pendientes
+            siguientes = set()
+            for url, referenciados, error in self._en_paralelo(
+                    exportar_recurso, [(origen, directorio, url) for url in sorted(pendientes)]):
+                if error:
+                    _logger.warning(f"Exportación estática: error en el recurso {url}: {error}")
+                    resumen['errores'] += 1
+                    continue
+                resumen['recursos'] += 1
+                siguientes.update(referenciados)
+            pendientes = siguientes - copiados
+
+        # Páginas de registros archivados o borrados desde la última exportación
+        for ruta in set(manifiesto) - set(rutas):
+            archivo = _dentro(directorio, f'{ruta}/index.html')
+            if archivo and os.path.exists(archivo):
+                os.remove(archivo)
+                resumen['eliminadas'] += 1
+
+        with open(ruta_manifiesto, 'w') as archivo:
+            json.dump(nuevo_manifiesto, archivo, indent=1, sort_keys=True)
+        _logger.info(f"Exportación estática en {directorio}: {resumen}")
+        return resumen
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Clave de los museos pendientes de refresco en cr.precommit.data
+PENDIENTES_ANALITICA = 'museo.objeto.analitica.pendientes'
+
+# Campos de museo.objeto que alteran la analítica
+CAMPOS_ANALITICA = {'museo_id', 'categoria', 'estado_conservacion', 'valor_estimado', 'active'}
+
+
+class MuseoObjetoAnalitica(models.Model):
+    """Analítica materializada de la colección por museo y categoría.
+
+    Las filas se recalculan por museo al confirmar la transacción en la que
+    se modificaron sus objetos; la fila con ``es_total`` resume el museo
+    completo (los percentiles no se pueden sumar entre categorías).
+    """
+    _name = 'museo.objeto.analitica'
+    _description = 'Analítica de Colección por Museo'
+    _order = 'museo_id, es_total desc, categoria'
+
+    museo_id = fields.Many2one(
+        'museo.museo',
+        string='Museo',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        readonly=True
+    )
+
+    categoria = fields.Selection(
+        selection=lambda self: self.env['museo.objeto']._fields['categoria'].selection,
+        string='Categoría',
+        readonly=True
+    )
+
+    es_total = fields.Boolean(
+        string='Total del Museo',
+        readonly=True
+    )
+
+    cantidad = fields.Integer(string='Objetos', readonly=True)
+    valor_total = fields.Float(string='Valor Total', digits=(14, 2), readonly=True)
+    valor_promedio = fields.Float(string='Valor Promedio', digits=(12, 2), readonly=True, aggregator='avg')
+    valor_p25 = fields.Float(string='Valor P25', digits=(12, 2), readonly=True, aggregator=None)
+    valor_mediana = fields.Float(string='Valor Mediana', digits=(12, 2), readonly=True, aggregator=None)
+    valor_p90 = fields.Float(string='Valor P90', digits=(12, 2), readonly=True, aggregator=None)
+
+    cantidad_excelente = fields.Integer(string='Excelente', readonly=True)
+    cantidad_bueno = fields.Integer(string='Bueno', readonly=True)
+    cantidad_regular = fields.Integer(string='Regular', readonly=True)
+    cantidad_malo = fields.Integer(string='Malo', readonly=True)
+    cantidad_restauracion = fields.Integer(string='En Restauración', readonly=True)
+
+    def init(self):
+        """Carga inicial (o reconstrucción al actualizar el módulo)"""
+        self.env.cr.execute("SELECT id FROM museo_museo")
+        self._refrescar([fila[0] for fila in self.env.cr.fetchall()])
+
+    @api.model
+    def _marcar_pendientes(self, museo_ids):
+        """Agenda el refresco de los museos dados al confirmar la transacción,
+        de modo que una importación masiva refresca cada museo una sola vez"""
+        museo_ids = {museo_id for museo_id in museo_ids if museo_id}
+        if not museo_ids:
+            return
+        precommit = self.env.cr.precommit
+        pendientes = precommit.data.get(PENDIENTES_ANALITICA)
+        if pendientes is None:
+            pendientes = precommit.data[PENDIENTES_ANALITICA] = set()
+            analitica = self.sudo()
+            precommit.add(lambda: analitica._refrescar(precommit.data.pop(PENDIENTES_ANALITICA, ())))
+        pendientes.update(museo_ids)
+
+    @api.model
+    def _refrescar(self, museo_ids):
+        """Recalcula las filas de los museos dados en una sola consulta"""
+        museo_ids = list(museo_ids)
+        if not museo_ids:
+            return
+        self.env['museo.objeto'].flush_model(list(CAMPOS_ANALITICA))
+
+        estados = [valor for valor, _etiqueta in self.env['museo.objeto']._fields['estado_conservacion'].selection]
+        self.env.cr.execute(SQL(
+            "DELETE FROM museo_objeto_analitica WHERE museo_id = ANY(%s)", museo_ids
+        ))
+        self.env.cr.execute(SQL("""
+            INSERT INTO museo_objeto_analitica (
+                museo_id, categoria, es_total, cantidad, valor_total, valor_promedio,
+                valor_p25, valor_mediana, valor_p90, %(columnas_estado)s,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT o.museo_id,
+                   o.categoria,
+                   GROUPING(o.categoria) = 1,
+                   COUNT(*),
+                   COALESCE(SUM(o.valor_estimado), 0),
+                   COALESCE(AVG(o.valor_estimado) FILTER (WHERE o.valor_estimado > 0), 0),
+                   COALESCE(percentile_cont(0.25) WITHIN GROUP (ORDER BY o.valor_estimado)
+                            FILTER (WHERE o.valor_estimado > 0), 0),
+                   COALESCE(percentile_cont(0.5) WITHIN GROUP (ORDER BY o.valor_estimado)
+                            FILTER (WHERE o.valor_estimado > 0), 0),
+                   COALESCE(percentile_cont(0.9) WITHIN GROUP (ORDER BY o.valor_estimado)
+                            FILTER (WHERE o.valor_estimado > 0), 0),
+                   %(conteos_estado)s,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM museo_objeto o
+             WHERE o.active AND o.museo_id = ANY(%(museo_ids)s)
+             GROUP BY GROUPING SETS ((o.museo_id, o.categoria), (o.museo_id))
+        """,
+            columnas_estado=SQL(", ").join(SQL.identifier(f'cantidad_{estado}') for estado in estados),
+            conteos_estado=SQL(", ").join(
+                SQL("COUNT(*) FILTER (WHERE o.estado_conservacion = %s)", estado) for estado in estados
+            ),
+            uid=self.env.uid,
+            museo_ids=museo_ids,
+        ))
+        self.invalidate_model()
+        _logger.debug(f"Analítica de colección refrescada para {len(museo_ids)} museos")
+
+    @api.model
+    def _totales_por_museo(self, museo_ids):
+        """Filas de total indexadas por museo"""
+        filas = self.search([('museo_id', 'in', list(museo_ids)), ('es_total', '=', True)])
+        return {fila.museo_id.id: fila for fila in filas}
+
+    @api.model
+    def action_refrescar_todo(self):
+        self._refrescar(self.env['museo.museo'].with_context(active_test=False).search([]).ids)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Analítica Actualizada',
+                'message': 'La analítica de colecciones ha sido recalculada.',
+                'type': 'success',
+                'sticky': False,
+            }
+        }
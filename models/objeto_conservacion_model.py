@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+# Orden de gravedad para detectar degradaciones (la restauración va aparte)
+ORDEN_CONSERVACION = ['excelente', 'bueno', 'regular', 'malo']
+
+
+class MuseoObjetoConservacion(models.Model):
+    """Transiciones del estado de conservación de los objetos.
+
+    Tabla compacta (sin campos de auditoría) pensada para consultas de
+    tendencia; el objeto y la fecha son todo lo que se necesita.
+    """
+    _name = 'museo.objeto.conservacion'
+    _description = 'Historial de Conservación de Objetos'
+    _order = 'fecha desc, id desc'
+    _log_access = False
+
+    objeto_id = fields.Many2one(
+        'museo.objeto',
+        string='Objeto',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+
+    museo_id = fields.Many2one(
+        'museo.museo',
+        string='Museo',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+
+    estado_anterior = fields.Selection(
+        selection=lambda self: self.env['museo.objeto']._fields['estado_conservacion'].selection,
+        string='Estado Anterior',
+        readonly=True
+    )
+
+    estado_nuevo = fields.Selection(
+        selection=lambda self: self.env['museo.objeto']._fields['estado_conservacion'].selection,
+        string='Estado Nuevo',
+        readonly=True
+    )
+
+    fecha = fields.Datetime(
+        string='Fecha',
+        required=True,
+        default=fields.Datetime.now,
+        readonly=True
+    )
+
+    es_degradacion = fields.Boolean(
+        string='Degradación',
+        readonly=True
+    )
+
+    def init(self):
+        create_index(self.env.cr, 'museo_objeto_conservacion_objeto_fecha_idx',
+                     self._table, ['objeto_id', 'fecha'])
+        create_index(self.env.cr, 'museo_objeto_conservacion_museo_fecha_idx',
+                     self._table, ['museo_id', 'fecha', 'estado_nuevo'])
+
+    @api.model
+    def _es_degradacion(self, anterior, nuevo):
+        if anterior not in ORDEN_CONSERVACION or nuevo not in ORDEN_CONSERVACION:
+            return False
+        return ORDEN_CONSERVACION.index(nuevo) > ORDEN_CONSERVACION.index(anterior)
+
+    @api.model
+    def _registrar(self, transiciones):
+        """Registra en bloque una lista de (objeto, estado_anterior, estado_nuevo)"""
+        ahora = fields.Datetime.now()
+        return self.sudo().create([{
+            'objeto_id': objeto.id,
+            'museo_id': objeto.museo_id.id,
+            'estado_anterior': anterior or False,
+            'estado_nuevo': nuevo,
+            'fecha': ahora,
+            'es_degradacion': self._es_degradacion(anterior, nuevo),
+        } for objeto, anterior, nuevo in transiciones if anterior != nuevo])
+
+    @api.model
+    def get_tendencia_mensual(self, museo_id=None, meses=12):
+        """Serie mensual de objetos que entraron en restauración o se
+        degradaron, calculada en SQL. Los meses sin movimientos aparecen
+        con cero."""
+        self.flush_model()
+        filtro_museo = SQL("AND c.museo_id = %s", museo_id) if museo_id else SQL()
+        self.env.cr.execute(SQL("""
+            WITH meses AS (
+                SELECT generate_series(
+                    date_trunc('month', NOW() AT TIME ZONE 'UTC') - make_interval(months => %(meses)s - 1),
+                    date_trunc('month', NOW() AT TIME ZONE 'UTC'),
+                    INTERVAL '1 month'
+                ) AS mes
+            )
+            SELECT m.mes::date,
+                   COUNT(DISTINCT c.objeto_id) FILTER (WHERE c.estado_nuevo = 'restauracion'),
+                   COUNT(DISTINCT c.objeto_id) FILTER (WHERE c.es_degradacion)
+              FROM meses m
+              LEFT JOIN museo_objeto_conservacion c
+                ON c.fecha >= m.mes
+               AND c.fecha < m.mes + INTERVAL '1 month'
+               %(filtro_museo)s
+             GROUP BY m.mes
+             ORDER BY m.mes
+        """, meses=meses, filtro_museo=filtro_museo))
+        return [{
+            'mes': mes.strftime('%Y-%m'),
+            'entradas_restauracion': restauracion,
+            'degradaciones': degradaciones,
+        } for mes, restauracion, degradaciones in self.env.cr.fetchall()]
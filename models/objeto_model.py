@@ -1,16 +1,37 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+from datetime import date
+from .museo_imagen_mixin import TAMANO_MINIATURA, TAMANO_TARJETA, TAMANO_PORTADA
+from .objeto_analitica_model import CAMPOS_ANALITICA
+from .museo_cache import CACHE_FACETAS, crear_version_cache, invalidar_cache, version_cache
+
+# Facetas del catálogo público, en el orden en que se muestran
+FACETAS_CATALOGO = ('museo_id', 'categoria', 'estado_conservacion', 'decada')
+
+# Décadas admitidas en el filtro del catálogo: date() va del año 1 al 9999
+# y cada década se filtra hasta el primer año de la siguiente
+DECADA_MINIMA = 10
+DECADA_MAXIMA = 9980
+
+# Campos cuyo cambio altera los conteos de facetas
+CAMPOS_FACETAS = {'museo_id', 'categoria', 'estado_conservacion', 'fecha_adquisicion', 'active'}
 
 class MuseoObjeto(models.Model):
     _name = 'museo.objeto'
     _description = 'Objeto del Museo'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'museo.imagen.mixin', 'museo.imagen.huella.mixin', 'museo.publicacion.mixin']
     _order = 'name asc'
     
+    # La huella se calcula sobre la miniatura, sin decodificar el original
+    _campo_huella = 'imagen_miniatura'
+    
     name = fields.Char(
         string='Nombre del Objeto',
         required=True,
+        index='trigram',
         tracking=True
     )
     
@@ -18,13 +39,15 @@ class MuseoObjeto(models.Model):
         'museo.museo',
         string='Museo',
         required=True,
-        ondelete='cascade'
+        ondelete='cascade',
+        index=True
     )
     
     codigo_inventario = fields.Char(
         string='Código de Inventario',
         required=True,
         unique=True,
+        index='trigram',
         tracking=True
     )
     
@@ -47,6 +70,12 @@ class MuseoObjeto(models.Model):
         ('restauracion', 'En Restauración'),
     ], string='Estado de Conservación', default='bueno')
     
+    historial_conservacion_ids = fields.One2many(
+        'museo.objeto.conservacion',
+        'objeto_id',
+        string='Historial de Conservación'
+    )
+    
     ubicacion_actual = fields.Char(
         string='Ubicación Actual'
     )
@@ -56,11 +85,50 @@ class MuseoObjeto(models.Model):
         digits=(12, 2)
     )
     
-    imagen = fields.Binary(
+    imagen = fields.Image(
         string='Imagen',
         attachment=True
     )
     
+    # Variantes precalculadas al guardar, para no servir el original en listados
+    imagen_miniatura = fields.Image(
+        string='Miniatura',
+        related='imagen',
+        max_width=TAMANO_MINIATURA,
+        max_height=TAMANO_MINIATURA,
+        store=True
+    )
+    
+    imagen_tarjeta = fields.Image(
+        string='Imagen de Tarjeta',
+        related='imagen',
+        max_width=TAMANO_TARJETA,
+        max_height=TAMANO_TARJETA,
+        store=True
+    )
+    
+    imagen_portada = fields.Image(
+        string='Imagen de Portada',
+        related='imagen',
+        max_width=TAMANO_PORTADA,
+        max_height=TAMANO_PORTADA,
+        store=True
+    )
+    
+    imagen_tarjeta_webp = fields.Binary(
+        string='Imagen de Tarjeta (WebP)',
+        compute='_compute_imagen_webp',
+        store=True,
+        attachment=True
+    )
+    
+    imagen_portada_webp = fields.Binary(
+        string='Imagen de Portada (WebP)',
+        compute='_compute_imagen_webp',
+        store=True,
+        attachment=True
+    )
+    
     imagen_filename = fields.Char(
         string='Nombre de Archivo de Imagen'
     )
@@ -81,4 +149,210 @@ class MuseoObjeto(models.Model):
     active = fields.Boolean(
         string='Activo',
         default=True
-    )
\ No newline at end of file
+    )
+    
+    @api.depends('imagen_tarjeta', 'imagen_portada')
+    def _compute_imagen_webp(self):
+        """Genera las variantes WebP si están habilitadas en la configuración"""
+        for objeto in self:
+            objeto.imagen_tarjeta_webp = self._imagen_a_webp(objeto.imagen_tarjeta)
+            objeto.imagen_portada_webp = self._imagen_a_webp(objeto.imagen_portada)
+    
+    def init(self):
+        # Recorre en orden el catálogo de un museo: sirve la paginación por
+        # clave (name, id) sin ordenar ni saltar filas
+        create_index(self.env.cr, 'museo_objeto_catalogo_orden_idx',
+                     self._table, ['museo_id', 'name', 'id'], where='active')
+        crear_version_cache(self.env.cr, CACHE_FACETAS)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Invalida las facetas del catálogo, agenda el refresco de la analítica
+        y registra el estado de conservación inicial"""
+        objetos = super(MuseoObjeto, self).create(vals_list)
+        invalidar_cache(self.env, CACHE_FACETAS)
+        self.env['museo.objeto.analitica']._marcar_pendientes(objetos.museo_id.ids)
+        self.env['museo.objeto.conservacion']._registrar([
+            (objeto, False, objeto.estado_conservacion) for objeto in objetos
+        ])
+        return objetos
+    
+    def write(self, vals):
+        """Invalida las facetas del catálogo y la analítica si cambia un campo
+        del que dependen, y registra los cambios de estado de conservación"""
+        museos_previos = self.museo_id.ids if 'museo_id' in vals else []
+        estados_previos = {
+            objeto.id: objeto.estado_conservacion for objeto in self
+        } if 'estado_conservacion' in vals else {}
+        result = super(MuseoObjeto, self).write(vals)
+        if CAMPOS_FACETAS.intersection(vals):
+            invalidar_cache(self.env, CACHE_FACETAS)
+        if CAMPOS_ANALITICA.intersection(vals):
+            self.env['museo.objeto.analitica']._marcar_pendientes(museos_previos + self.museo_id.ids)
+        if estados_previos:
+            self.env['museo.objeto.conservacion']._registrar([
+                (objeto, estados_previos[objeto.id], objeto.estado_conservacion) for objeto in self
+            ])
+        return result
+    
+    def unlink(self):
+        """Invalida las facetas del catálogo y agenda el refresco de la analítica"""
+        museo_ids = self.museo_id.ids
+        result = super(MuseoObjeto, self).unlink()
+        invalidar_cache(self.env, CACHE_FACETAS)
+        self.env['museo.objeto.analitica']._marcar_pendientes(museo_ids)
+        return result
+    
+    # ------------------------------------------------------------
+    # Catálogo público: facetas
+    # ------------------------------------------------------------
+    
+    @api.model
+    def _normalizar_filtros_catalogo(self, filtros):
+        """Valida los filtros recibidos y los devuelve como tupla ordenada
+        (faceta, valor), apta como clave de caché"""
+        normalizados = {}
+        selecciones = {
+            'categoria': dict(self._fields['categoria'].selection),
+            'estado_conservacion': dict(self._fields['estado_conservacion'].selection),
+        }
+        for faceta in FACETAS_CATALOGO:
+            valor = filtros.get(faceta)
+            if valor in (None, '', False):
+                continue
+            if faceta in selecciones:
+                if valor in selecciones[faceta]:
+                    normalizados[faceta] = valor
+            else:
+                try:
+                    valor = int(valor)
+                except (TypeError, ValueError):
+                    continue
+                if faceta == 'decada':
+                    valor -= valor % 10
+                    # Fuera de rango date() falla: se descarta como cualquier filtro no válido
+                    if not DECADA_MINIMA <= valor <= DECADA_MAXIMA:
+                        continue
+                normalizados[faceta] = valor
+        return tuple(sorted(normalizados.items()))
+    
+    @api.model
+    def _dominio_catalogo(self, filtros):
+        """Dominio de búsqueda para los filtros normalizados del catálogo"""
+        dominio = [('active', '=', True), ('museo_id.active', '=', True)]
+        for faceta, valor in filtros:
+            if faceta == 'decada':
+                dominio += [
+                    ('fecha_adquisicion', '>=', date(valor, 1, 1)),
+                    ('fecha_adquisicion', '<', date(valor + 10, 1, 1)),
+                ]
+            else:
+                dominio.append((faceta, '=', valor))
+        return dominio
+    
+    @api.model
+    def _buscar_catalogo(self, filtros, limit, offset=0, despues=None, antes=None, desde_final=False):
+        """Página del catálogo ordenada por (name, id).
+        
+        ``despues`` y ``antes`` son el par (name, id) del último objeto de una
+        página anterior o del primero de una siguiente: la página se busca por
+        clave y ``offset`` solo salta las páginas que hay entre medias.
+        ``desde_final`` cuenta el offset desde el final del catálogo, para las
+        últimas páginas.
+        """
+        clave = despues or antes
+        inverso = bool(antes or desde_final)
+        query = self._search(
+            self._dominio_catalogo(filtros),
+            offset=offset,
+            limit=limit,
+            order='name desc, id desc' if inverso else 'name, id',
+        )
+        if clave:
+            query.add_where(SQL(
+                "(%s, %s) %s (%s, %s)",
+                SQL.identifier(self._table, 'name'), SQL.identifier(self._table, 'id'),
+                SQL('>' if despues else '<'), clave[0], clave[1],
+            ))
+        objetos = self.browse(query)
+        return objetos[::-1] if inverso else objetos
+    
+    @api.model
+    def _sql_condicion_faceta(self, faceta, valor):
+        if faceta == 'decada':
+            return SQL(
+                "o.fecha_adquisicion >= %s AND o.fecha_adquisicion < %s",
+                date(valor, 1, 1), date(valor + 10, 1, 1),
+            )
+        return SQL("o.%s = %s", SQL.identifier(faceta), valor)
+    
+    @api.model
+    def get_facetas_catalogo(self, filtros):
+        """Devuelve el total y los conteos por faceta para los filtros dados.
+        
+        Cada faceta se cuenta aplicando todos los filtros activos excepto el
+        suyo propio, de modo que el visitante ve cuántos objetos obtendría
+        al cambiar de valor dentro de la misma faceta.
+        """
+        return self._get_facetas_catalogo(
+            self._normalizar_filtros_catalogo(filtros), version_cache(self.env.cr, CACHE_FACETAS)
+        )
+    
+    @api.model
+    @tools.ormcache('filtros', 'version')
+    def _get_facetas_catalogo(self, filtros, version):
+        """Calcula todas las facetas en una sola consulta con GROUPING SETS"""
+        self.flush_model(list(CAMPOS_FACETAS))
+        self.env['museo.museo'].flush_model(['active'])
+        
+        activos = dict(filtros)
+        columnas_filtro = [
+            SQL("%s AS %s",
+                self._sql_condicion_faceta(faceta, activos[faceta]) if faceta in activos else SQL("TRUE"),
+                SQL.identifier('f_' + faceta))
+            for faceta in FACETAS_CATALOGO
+        ]
+        
+        def _conteo_excepto(excluida=None):
+            condiciones = [
+                SQL.identifier('f_' + faceta)
+                for faceta in FACETAS_CATALOGO if faceta != excluida
+            ]
+            return SQL("COUNT(*) FILTER (WHERE %s)", SQL(" AND ").join(condiciones))
+        
+        conteo = SQL("CASE %s ELSE %s END", SQL(" ").join(
+            SQL("WHEN GROUPING(%s) = 0 THEN %s", SQL.identifier(faceta), _conteo_excepto(faceta))
+            for faceta in FACETAS_CATALOGO
+        ), _conteo_excepto())
+        
+        self.env.cr.execute(SQL("""
+            WITH base AS (
+                SELECT o.museo_id, o.categoria, o.estado_conservacion,
+                       (EXTRACT(YEAR FROM o.fecha_adquisicion)::int / 10) * 10 AS decada,
+                       %(columnas_filtro)s
+                  FROM museo_objeto o
+                  JOIN museo_museo m ON m.id = o.museo_id
+                 WHERE o.active AND m.active
+            )
+            SELECT GROUPING(museo_id), GROUPING(categoria),
+                   GROUPING(estado_conservacion), GROUPING(decada),
+                   museo_id, categoria, estado_conservacion, decada,
+                   %(conteo)s
+              FROM base
+             GROUP BY GROUPING SETS ((museo_id), (categoria), (estado_conservacion), (decada), ())
+        """, columnas_filtro=SQL(", ").join(columnas_filtro), conteo=conteo))
+        
+        facetas = {faceta: [] for faceta in FACETAS_CATALOGO}
+        facetas['total'] = 0
+        for fila in self.env.cr.fetchall():
+            agrupaciones, valores, total = fila[:4], fila[4:8], fila[8]
+            if all(agrupaciones):
+                facetas['total'] = total
+                continue
+            indice = agrupaciones.index(0)
+            valor = valores[indice]
+            if valor is not None and total:
+                facetas[FACETAS_CATALOGO[indice]].append((valor, total))
+        for faceta in FACETAS_CATALOGO:
+            facetas[faceta].sort()
+        return facetas
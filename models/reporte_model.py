@@ -110,6 +110,8 @@ class MuseoReporte(models.Model):
                 datos = self._generar_reporte_actividades_trabajador(reporte)
             elif reporte.tipo_reporte == 'actividades_fechas':
                 datos = self._generar_reporte_actividades_fechas(reporte)
+            elif reporte.tipo_reporte == 'objetos':
+                datos = self._generar_reporte_inventario_objetos(reporte)
             
             reporte.datos_reportes = json.dumps(datos, ensure_ascii=False)
     
@@ -284,6 +286,43 @@ class MuseoReporte(models.Model):
             }
         }
     
+    def _generar_reporte_inventario_objetos(self, reporte):
+        """Genera el inventario de objetos a partir de la analítica materializada"""
+        filas = self.env['museo.objeto.analitica'].sudo().search([
+            ('museo_id', '=', reporte.museo_id.id),
+        ])
+        estados = [estado for estado, _etiqueta in self.env['museo.objeto']._fields['estado_conservacion'].selection]
+        categorias = dict(self.env['museo.objeto']._fields['categoria'].selection)
+        
+        def _resumen(fila):
+            return {
+                'cantidad': fila.cantidad,
+                'valor_total': fila.valor_total,
+                'valor_promedio': fila.valor_promedio,
+                'valor_p25': fila.valor_p25,
+                'valor_mediana': fila.valor_mediana,
+                'valor_p90': fila.valor_p90,
+                **{f'cantidad_{estado}': fila[f'cantidad_{estado}'] for estado in estados},
+            }
+        
+        total = filas.filtered('es_total')[:1]
+        por_categoria = [
+            dict(_resumen(fila), categoria=categorias.get(fila.categoria, 'Sin categoría'))
+            for fila in filas.filtered(lambda f: not f.es_total).sorted('valor_total', reverse=True)
+        ]
+        
+        return {
+            'tipo_reporte': 'objetos',
+            'estadisticas': dict(_resumen(total), total_objetos=total.cantidad) if total else {'total_objetos': 0},
+            'categorias': por_categoria,
+            'tendencia_conservacion': self.env['museo.objeto.conservacion'].sudo().get_tendencia_mensual(
+                museo_id=reporte.museo_id.id
+            ),
+            'filtros_aplicados': {
+                'museo': reporte.museo_id.name,
+            }
+        }
+    
     def action_generar_reporte(self):
         """Genera el reporte y cambia su estado"""
         self.ensure_one()
@@ -495,11 +534,19 @@ class MuseoReporte(models.Model):
                     stats = datos['estadisticas']
                     story.append(Paragraph("<b>ESTADÍSTICAS GENERALES</b>", subtitle_style))
                     
-                    stats_data = [
-                        ['Total Actividades', str(stats.get('total_actividades', 0))],
-                        ['Total Asistentes', str(stats.get('total_asistentes', 0))],
-                        ['Total Horas', f"{stats.get('total_horas', 0):.2f}"],
-                    ]
+                    if self.tipo_reporte == 'objetos':
+                        stats_data = [
+                            ['Total Objetos', str(stats.get('total_objetos', 0))],
+                            ['Valor Total', f"{stats.get('valor_total', 0):,.2f}"],
+                            ['Valor Mediano', f"{stats.get('valor_mediana', 0):,.2f}"],
+                            ['Valor P90', f"{stats.get('valor_p90', 0):,.2f}"],
+                        ]
+                    else:
+                        stats_data = [
+                            ['Total Actividades', str(stats.get('total_actividades', 0))],
+                            ['Total Asistentes', str(stats.get('total_asistentes', 0))],
+                            ['Total Horas', f"{stats.get('total_horas', 0):.2f}"],
+                        ]
                     
                     if 'total_trabajadores' in stats:
                         stats_data.append(['Total Trabajadores', str(stats.get('total_trabajadores', 0))])
@@ -531,6 +578,19 @@ class MuseoReporte(models.Model):
                         story.append(Paragraph(f"Actividades: {trabajador.get('total_actividades', 0)} | Horas: {trabajador.get('total_horas', 0):.2f} | Asistentes: {trabajador.get('total_asistentes', 0)}", normal_style))
                         story.append(Spacer(1, 10))
                 
+                elif self.tipo_reporte == 'objetos' and 'categorias' in datos:
+                    story.append(Paragraph("<b>INVENTARIO POR CATEGORÍA</b>", subtitle_style))
+                    
+                    for categoria in datos['categorias']:
+                        story.append(Paragraph(f"<b>{categoria.get('categoria', 'N/A')}</b>", normal_style))
+                        story.append(Paragraph(f"Objetos: {categoria.get('cantidad', 0)} | Valor total: {categoria.get('valor_total', 0):,.2f} | Mediana: {categoria.get('valor_mediana', 0):,.2f}", normal_style))
+                        story.append(Spacer(1, 10))
+                    
+                    if datos.get('tendencia_conservacion'):
+                        story.append(Paragraph("<b>EVOLUCIÓN DE LA CONSERVACIÓN</b>", subtitle_style))
+                        for mes in datos['tendencia_conservacion']:
+                            story.append(Paragraph(f"{mes['mes']}: {mes['entradas_restauracion']} en restauración | {mes['degradaciones']} degradados", normal_style))
+                
                 elif self.tipo_reporte == 'actividades_fechas' and 'dias' in datos:
                     story.append(Paragraph("<b>ACTIVIDADES POR DÍA</b>", subtitle_style))
                     
@@ -655,6 +715,40 @@ class MuseoReporte(models.Model):
                         worksheet.write(row, 4, trabajador.get('total_asistentes', 0), number_format)
                         row += 1
                 
+                elif self.tipo_reporte == 'objetos' and 'categorias' in datos:
+                    worksheet.write(row, 0, 'INVENTARIO POR CATEGORÍA', header_format)
+                    row += 1
+                    
+                    # Encabezados de tabla
+                    headers = ['Categoría', 'Objetos', 'Valor Total', 'Valor Promedio', 'P25', 'Mediana', 'P90']
+                    for col, header in enumerate(headers):
+                        worksheet.write(row, col, header, header_format)
+                    row += 1
+                    
+                    # Datos por categoría
+                    for categoria in datos['categorias']:
+                        worksheet.write(row, 0, categoria.get('categoria', ''), normal_format)
+                        worksheet.write(row, 1, categoria.get('cantidad', 0), number_format)
+                        worksheet.write(row, 2, categoria.get('valor_total', 0), number_format)
+                        worksheet.write(row, 3, categoria.get('valor_promedio', 0), number_format)
+                        worksheet.write(row, 4, categoria.get('valor_p25', 0), number_format)
+                        worksheet.write(row, 5, categoria.get('valor_mediana', 0), number_format)
+                        worksheet.write(row, 6, categoria.get('valor_p90', 0), number_format)
+                        row += 1
+                    
+                    if datos.get('tendencia_conservacion'):
+                        row += 1
+                        worksheet.write(row, 0, 'EVOLUCIÓN DE LA CONSERVACIÓN', header_format)
+                        row += 1
+                        for col, header in enumerate(['Mes', 'Entradas en Restauración', 'Degradaciones']):
+                            worksheet.write(row, col, header, header_format)
+                        row += 1
+                        for mes in datos['tendencia_conservacion']:
+                            worksheet.write(row, 0, mes['mes'], normal_format)
+                            worksheet.write(row, 1, mes['entradas_restauracion'], number_format)
+                            worksheet.write(row, 2, mes['degradaciones'], number_format)
+                            row += 1
+                
                 elif self.tipo_reporte == 'actividades_fechas' and 'dias' in datos:
                     worksheet.write(row, 0, 'ACTIVIDADES POR DÍA', header_format)
                     row += 1
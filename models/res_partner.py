@@ -1,8 +1,28 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from .museo_cache import CACHE_TRABAJADORES, crear_version_cache, invalidar_cache, version_cache
+
+# Campos que deciden qué trabajadores aparecen en la página de un museo y en
+# qué orden
+CAMPOS_TRABAJADOR_PUBLICO = {'is_trabajador_museo', 'actividad_ids', 'name', 'active'}
+
+# Campos que se muestran en la tarjeta pública del trabajador; los cambios
+# en el resto de campos del contacto no afectan a las páginas de los museos
+CAMPOS_TARJETA_TRABAJADOR = CAMPOS_TRABAJADOR_PUBLICO | {
+    'cargo', 'especialidad', 'fecha_ingreso', 'horas_semanales',
+    'image_1920', 'image_1024', 'image_512', 'image_256', 'image_128',
+}
 
 class ResPartner(models.Model):
-    _inherit = 'res.partner'
+    _inherit = ['res.partner', 'museo.imagen.mixin']
+    _name = 'res.partner'
+    
+    # Las fotos de los trabajadores usan las variantes de image.mixin
+    _variantes_imagen = {
+        'miniatura': ('image_256', 256),
+        'tarjeta': ('image_512', 512),
+        'portada': ('image_1920', 1920),
+    }
     
     is_trabajador_museo = fields.Boolean(
         string='¿Es Trabajador del Museo?',
@@ -38,4 +58,72 @@ class ResPartner(models.Model):
         'museo.convenio',
         'responsable_museo',
         string='Convenios Responsables'
-    )
\ No newline at end of file
+    )
+    
+    def init(self):
+        super().init()
+        crear_version_cache(self.env.cr, CACHE_TRABAJADORES)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Un trabajador nuevo puede aparecer en la página de un museo"""
+        partners = super().create(vals_list)
+        if any(vals.get('is_trabajador_museo') and vals.get('actividad_ids') for vals in vals_list):
+            invalidar_cache(self.env, CACHE_TRABAJADORES)
+        return partners
+    
+    def write(self, vals):
+        """Los trabajadores aparecen en la página pública de los museos de
+        sus actividades: un cambio en su tarjeta la invalida"""
+        if not CAMPOS_TARJETA_TRABAJADOR.intersection(vals):
+            return super().write(vals)
+        # Los museos previos solo cambian si cambia la pertenencia
+        museo_ids = self._museos_trabajador() if CAMPOS_TRABAJADOR_PUBLICO.intersection(vals) else []
+        result = super().write(vals)
+        museo_ids += self._museos_trabajador()
+        if museo_ids:
+            self.env['museo.museo']._marcar_version_publica(museo_ids)
+            if CAMPOS_TRABAJADOR_PUBLICO.intersection(vals):
+                invalidar_cache(self.env, CACHE_TRABAJADORES)
+        return result
+    
+    def unlink(self):
+        """Invalida los trabajadores de la página de sus museos"""
+        trabajadores = self.filtered('is_trabajador_museo')
+        if trabajadores:
+            self.env['museo.museo']._marcar_version_publica(trabajadores.sudo().actividad_ids.museo_id.ids)
+        result = super().unlink()
+        if trabajadores:
+            invalidar_cache(self.env, CACHE_TRABAJADORES)
+        return result
+    
+    def _museos_trabajador(self):
+        """Ids de los museos de las actividades de estos contactos que son
+        trabajadores, con una sola consulta"""
+        if not self.ids:
+            return []
+        # sudo: cualquier usuario puede modificar contactos, no así leer actividades
+        return [museo.id for [museo] in self.env['museo.actividad'].sudo()._read_group(
+            [('trabajadores_ids', 'any', [('id', 'in', self.ids), ('is_trabajador_museo', '=', True)])],
+            ['museo_id'],
+        )]
+    
+    @api.model
+    def _get_ids_trabajadores_museo(self, museo_id):
+        """Ids de los trabajadores que participan en actividades del museo,
+        por nombre"""
+        return self._get_ids_trabajadores_museo_cache(museo_id, version_cache(self.env.cr, CACHE_TRABAJADORES))
+    
+    @api.model
+    @tools.ormcache('museo_id', 'version')
+    def _get_ids_trabajadores_museo_cache(self, museo_id, version):
+        """Se guardan ids y no registros para poder cachearlos"""
+        return tuple(self.sudo().with_context(active_test=True).search([
+            ('is_trabajador_museo', '=', True),
+            ('actividad_ids.museo_id', '=', museo_id),
+        ], order='name, id').ids)
+    
+    def _imagen_publica(self):
+        """Solo se publican las fotos del personal de los museos"""
+        self.ensure_one()
+        return self.active and (self.is_trabajador_museo or bool(self.convenio_ids))
\ No newline at end of file
@@ -1,9 +1,19 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from odoo.tools import SQL
 from datetime import date, timedelta
+from .museo_imagen_mixin import BANDAS_HUELLA, BITS_BANDA, HILOS_CARGA, LOTE_CARGA, preparar_imagen_carga
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import base64
+import io
 import json
+import logging
+import os
+import zipfile
+
+_logger = logging.getLogger(__name__)
 
 class MuseoWizardGenerarInforme(models.TransientModel):
     _name = 'museo.wizard.generar.informe'
@@ -812,4 +822,283 @@ class MuseoWizardPrevisualizacionAsignacion(models.TransientModel):
     
     conflicto = fields.Boolean(
         string='Conflicto'
-    )
\ No newline at end of file
+    )
+
+class MuseoWizardDuplicadosImagen(models.TransientModel):
+    _name = 'museo.wizard.duplicados.imagen'
+    _description = 'Wizard para Detectar Imágenes Casi Duplicadas'
+    
+    # Modelos cuyas imágenes llevan huella perceptual
+    _modelos_huella = ('museo.objeto', 'museo.museo.galeria')
+    
+    distancia_maxima = fields.Integer(
+        string='Distancia Máxima',
+        default=4,
+        help='Bits de diferencia permitidos entre huellas (0 = idénticas, máximo 7)'
+    )
+    
+    limite = fields.Integer(
+        string='Máximo de Resultados',
+        default=500
+    )
+    
+    linea_ids = fields.One2many(
+        'museo.wizard.duplicados.imagen.linea',
+        'wizard_id',
+        string='Posibles Duplicados'
+    )
+    
+    def action_buscar(self):
+        self.ensure_one()
+        if not 0 <= self.distancia_maxima <= 7:
+            raise UserError(_('La distancia máxima debe estar entre 0 y 7'))
+        
+        self.linea_ids.unlink()
+        self.linea_ids = [
+            (0, 0, {
+                'registro_a': f'{modelo_a},{id_a}',
+                'registro_b': f'{modelo_b},{id_b}',
+                'distancia': distancia,
+            })
+            for modelo_a, id_a, modelo_b, id_b, distancia
+            in self._buscar_pares(self.distancia_maxima, self.limite)
+        ]
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+    
+    def action_cancelar(self):
+        return {'type': 'ir.actions.act_window_close'}
+    
+    @api.model
+    def _buscar_pares(self, distancia_maxima, limite):
+        """Busca pares de imágenes a distancia de Hamming <= distancia_maxima.
+        
+        Solo se comparan imágenes que comparten una banda de la huella, o que
+        difieren en un bit de una banda cuando la distancia pedida supera el
+        número de bandas. Cada banda se cruza por igualdad (hash join), por lo
+        que el coste crece con el número de candidatos y no con N².
+        """
+        for modelo in self._modelos_huella:
+            self.env[modelo].flush_model()
+        
+        columnas = [f'imagen_phash_b{banda}' for banda in range(BANDAS_HUELLA)]
+        huellas = SQL(" UNION ALL ").join(
+            SQL("SELECT %s AS modelo, id, %s FROM %s WHERE imagen_phash IS NOT NULL AND active",
+                modelo,
+                SQL(", ").join(SQL.identifier(columna) for columna in columnas),
+                SQL.identifier(self.env[modelo]._table))
+            for modelo in self._modelos_huella
+        )
+        hamming = SQL(" + ").join(
+            SQL("length(replace(((%s # %s)::bit(%s))::text, '0', ''))",
+                SQL.identifier('a', columna), SQL.identifier('b', columna), SQL(str(BITS_BANDA)))
+            for columna in columnas
+        )
+        mascaras = [0]
+        if distancia_maxima >= BANDAS_HUELLA:
+            mascaras += [1 << bit for bit in range(BITS_BANDA)]
+        
+        ramas = SQL(" UNION ").join(
+            SQL("""
+                SELECT a.modelo AS modelo_a, a.id AS id_a, b.modelo AS modelo_b, b.id AS id_b,
+                       %(hamming)s AS distancia
+                  FROM huellas a
+                 CROSS JOIN unnest(%(mascaras)s::int[]) AS m(mascara)
+                  JOIN huellas b ON %(banda_b)s = (%(banda_a)s # m.mascara)
+                 WHERE (a.modelo, a.id) < (b.modelo, b.id)
+                   AND %(hamming)s <= %(distancia)s
+            """, hamming=hamming, mascaras=mascaras, distancia=distancia_maxima,
+                banda_a=SQL.identifier('a', columna), banda_b=SQL.identifier('b', columna))
+            for columna in columnas
+        )
+        self.env.cr.execute(SQL("""
+            WITH huellas AS MATERIALIZED (%s)
+            SELECT modelo_a, id_a, modelo_b, id_b, distancia
+              FROM (%s) pares
+             ORDER BY distancia, modelo_a, id_a, modelo_b, id_b
+             LIMIT %s
+        """, huellas, ramas, limite or None))
+        return self.env.cr.fetchall()
+
+class MuseoWizardDuplicadosImagenLinea(models.TransientModel):
+    _name = 'museo.wizard.duplicados.imagen.linea'
+    _description = 'Par de Imágenes Casi Duplicadas'
+    _order = 'distancia, id'
+    
+    wizard_id = fields.Many2one(
+        'museo.wizard.duplicados.imagen',
+        string='Wizard',
+        ondelete='cascade'
+    )
+    
+    registro_a = fields.Reference(
+        selection=[('museo.objeto', 'Objeto'), ('museo.museo.galeria', 'Galería')],
+        string='Imagen'
+    )
+    
+    registro_b = fields.Reference(
+        selection=[('museo.objeto', 'Objeto'), ('museo.museo.galeria', 'Galería')],
+        string='Posible Duplicado'
+    )
+    
+    distancia = fields.Integer(
+        string='Distancia'
+    )
+
+class MuseoWizardCargaGaleria(models.TransientModel):
+    _name = 'museo.wizard.carga.galeria'
+    _description = 'Wizard para Carga Masiva de Fotos en la Galería'
+    
+    # Límites de la carga para no agotar memoria con un ZIP malicioso
+    _max_archivos = 500
+    _max_bytes_zip = 512 * 1024 * 1024
+    _extensiones = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tif', '.tiff')
+    
+    museo_id = fields.Many2one(
+        'museo.museo',
+        string='Museo',
+        required=True
+    )
+    
+    archivo_ids = fields.Many2many(
+        'ir.attachment',
+        string='Imágenes',
+        help='Puede seleccionar varias imágenes a la vez'
+    )
+    
+    archivo_zip = fields.Binary(
+        string='Archivo ZIP',
+        help='ZIP con las imágenes; se cargan en el orden del archivo'
+    )
+    
+    archivo_zip_nombre = fields.Char(
+        string='Nombre del ZIP'
+    )
+    
+    categoria = fields.Selection(
+        selection=lambda self: self.env['museo.museo.galeria']._fields['categoria'].selection,
+        string='Categoría',
+        default='exterior'
+    )
+    
+    autor = fields.Char(
+        string='Autor/Fotógrafo'
+    )
+    
+    fecha_captura = fields.Date(
+        string='Fecha de Captura'
+    )
+    
+    def _leer_archivos(self):
+        """Genera (nombre, contenido) en el orden de subida, leyendo cada
+        imagen (adjunto o miembro del ZIP) sólo cuando se pide. Los límites
+        se comprueban antes de leer ninguna"""
+        self.ensure_one()
+        adjuntos = self.archivo_ids.sorted('id')
+        zip_imagenes = entradas = None
+        if self.archivo_zip:
+            try:
+                zip_imagenes = zipfile.ZipFile(io.BytesIO(base64.b64decode(self.archivo_zip)))
+            except zipfile.BadZipFile:
+                raise UserError(_('El archivo %s no es un ZIP válido', self.archivo_zip_nombre or ''))
+            entradas = [
+                entrada for entrada in zip_imagenes.infolist()
+                if not entrada.is_dir()
+                and not entrada.filename.startswith('__MACOSX/')
+                and not os.path.basename(entrada.filename).startswith('.')
+                and os.path.splitext(entrada.filename)[1].lower() in self._extensiones
+            ]
+            if sum(entrada.file_size for entrada in entradas) > self._max_bytes_zip:
+                zip_imagenes.close()
+                raise UserError(_('El ZIP descomprimido supera el tamaño máximo permitido'))
+        if len(adjuntos) + len(entradas or ()) > self._max_archivos:
+            if zip_imagenes:
+                zip_imagenes.close()
+            raise UserError(_('No se pueden cargar más de %s imágenes a la vez', self._max_archivos))
+        
+        def generar():
+            for adjunto in adjuntos:
+                yield adjunto.name, adjunto.raw
+            if zip_imagenes:
+                with zip_imagenes:
+                    for entrada in entradas:
+                        try:
+                            with zip_imagenes.open(entrada) as miembro:
+                                yield entrada.filename, miembro.read()
+                        except (zipfile.BadZipFile, OSError) as e:
+                            yield entrada.filename, e
+        
+        return generar() if adjuntos or entradas else None
+    
+    def action_cargar(self):
+        """Crea las fotos de la galería con una única creación múltiple.
+        
+        Las imágenes se leen de LOTE_CARGA en LOTE_CARGA y cada lote se
+        reduce en HILOS_CARGA hilos; sólo las versiones reducidas quedan en
+        memoria hasta la creación.
+        """
+        self.ensure_one()
+        archivos = self._leer_archivos()
+        if not archivos:
+            raise UserError(_('Debe seleccionar al menos una imagen o un archivo ZIP'))
+        
+        Galeria = self.env['museo.museo.galeria']
+        ultima = Galeria.search([('museo_id', '=', self.museo_id.id)], order='sequence desc', limit=1)
+        secuencia = ultima.sequence or 0
+        
+        def preparar(contenido):
+            if isinstance(contenido, Exception):
+                return False, {}, str(contenido)
+            return preparar_imagen_carga(contenido)
+        
+        vals_list = []
+        omitidos = []
+        with ThreadPoolExecutor(max_workers=HILOS_CARGA) as grupo:
+            while lote := list(islice(archivos, LOTE_CARGA)):
+                nombres = [nombre for nombre, _contenido in lote]
+                preparadas = grupo.map(preparar, [contenido for _nombre, contenido in lote])
+                del lote
+                for nombre, (imagen, huella, error) in zip(nombres, preparadas):
+                    if error:
+                        _logger.warning(f"Imagen omitida en la carga masiva ({nombre}): {error}")
+                        omitidos.append(os.path.basename(nombre))
+                        continue
+                    secuencia += 1
+                    vals_list.append(dict(
+                        huella,
+                        name=os.path.splitext(os.path.basename(nombre))[0],
+                        museo_id=self.museo_id.id,
+                        imagen=imagen,
+                        categoria=self.categoria,
+                        autor=self.autor,
+                        fecha_captura=self.fecha_captura,
+                        sequence=secuencia,
+                    ))
+        fotos = Galeria.create(vals_list)
+        Galeria.invalidate_model(['imagen'])
+        
+        self.archivo_ids.unlink()
+        
+        mensaje = _('Se cargaron %s fotos en la galería de %s.', len(fotos), self.museo_id.name)
+        if omitidos:
+            mensaje += ' ' + _('Omitidas por no ser imágenes válidas: %s', ', '.join(omitidos))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Carga Completada',
+                'message': mensaje,
+                'type': 'warning' if omitidos else 'success',
+                'sticky': bool(omitidos),
+                'next': self.museo_id.action_view_galeria(),
+            }
+        }
+    
+    def action_cancelar(self):
+        return {'type': 'ir.actions.act_window_close'}
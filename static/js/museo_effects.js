@@ -1,24 +1,26 @@
 // museo_effects.js - Versión sin jQuery
 function initMuseoEffects() {
-    // Carrusel básico
+    // Carrusel básico (las diapositivas pueden crecer con la carga diferida)
     const carousel = document.getElementById('galeriaCarousel');
     if (carousel) {
         const container = document.getElementById('carouselContainer');
-        const slides = carousel.querySelectorAll('.carousel-slide');
-        const indicators = carousel.querySelectorAll('.carousel-indicator');
+        const indicatorsContainer = carousel.querySelector('.carousel-indicators');
         const prevBtn = carousel.querySelector('.carousel-control.prev');
         const nextBtn = carousel.querySelector('.carousel-control.next');
+        const getSlides = () => carousel.querySelectorAll('.carousel-slide');
+        const getIndicators = () => carousel.querySelectorAll('.carousel-indicator');
         
         let currentIndex = 0;
         
         function updateCarousel() {
+            const slides = getSlides();
             if (slides.length === 0) return;
             
             const slideWidth = slides[0].offsetWidth;
             container.style.transform = `translateX(-${currentIndex * slideWidth}px)`;
             
             // Actualizar indicadores
-            indicators.forEach((indicator, index) => {
+            getIndicators().forEach((indicator, index) => {
                 if (index === currentIndex) {
                     indicator.classList.add('active');
                 } else {
@@ -34,45 +36,43 @@ function initMuseoEffects() {
                     slide.classList.remove('active');
                 }
             });
+            
+            // Pedir la página siguiente al acercarse a la última diapositiva
+            if (currentIndex >= slides.length - 2) {
+                carousel.dispatchEvent(new CustomEvent('galeria:cargar-mas'));
+            }
+        }
+        
+        function moveTo(index) {
+            const total = getSlides().length;
+            if (total === 0) return;
+            currentIndex = (index + total) % total;
+            updateCarousel();
         }
         
         if (prevBtn) {
-            prevBtn.addEventListener('click', () => {
-                currentIndex = (currentIndex - 1 + slides.length) % slides.length;
-                updateCarousel();
-            });
+            prevBtn.addEventListener('click', () => moveTo(currentIndex - 1));
         }
         
         if (nextBtn) {
-            nextBtn.addEventListener('click', () => {
-                currentIndex = (currentIndex + 1) % slides.length;
-                updateCarousel();
-            });
+            nextBtn.addEventListener('click', () => moveTo(currentIndex + 1));
         }
         
-        indicators.forEach((indicator, index) => {
-            indicator.addEventListener('click', () => {
-                currentIndex = index;
-                updateCarousel();
+        if (indicatorsContainer) {
+            indicatorsContainer.addEventListener('click', (event) => {
+                const indicator = event.target.closest('.carousel-indicator');
+                if (indicator) {
+                    moveTo(Array.from(getIndicators()).indexOf(indicator));
+                }
             });
-        });
+        }
         
         // Auto-play
-        let interval = setInterval(() => {
-            if (slides.length > 0) {
-                currentIndex = (currentIndex + 1) % slides.length;
-                updateCarousel();
-            }
-        }, 5000);
+        let interval = setInterval(() => moveTo(currentIndex + 1), 5000);
         
         carousel.addEventListener('mouseenter', () => clearInterval(interval));
         carousel.addEventListener('mouseleave', () => {
-            interval = setInterval(() => {
-                if (slides.length > 0) {
-                    currentIndex = (currentIndex + 1) % slides.length;
-                    updateCarousel();
-                }
-            }, 5000);
+            interval = setInterval(() => moveTo(currentIndex + 1), 5000);
         });
         
         // Inicializar
@@ -211,6 +211,121 @@ function initSlider(containerId, sectionClass) {
     nextBtn.disabled = container.scrollWidth <= container.clientWidth;
 }
 
+// Carga diferida de la galería: los contenedores con data-galeria-url
+// traen solo la primera página y piden las siguientes al endpoint JSON
+// cuando el usuario se acerca a ellos o al final del carrusel
+function crearElemento(tag, className, text) {
+    const el = document.createElement(tag);
+    if (className) el.className = className;
+    if (text) el.textContent = text;
+    return el;
+}
+
+var renderGaleria = {
+    carrusel(contenedor, foto) {
+        const slides = contenedor.querySelector('.carousel-container');
+        const indicators = contenedor.querySelector('.carousel-indicators');
+        const index = slides.querySelectorAll('.carousel-slide').length;
+        
+        const slide = crearElemento('div', 'carousel-slide');
+        slide.dataset.index = index;
+        const img = crearElemento('img');
+        img.src = foto.imagen;
+        img.srcset = foto.srcset;
+        img.sizes = '100vw';
+        img.alt = foto.nombre;
+        img.loading = 'lazy';
+        slide.appendChild(img);
+        
+        const caption = crearElemento('div', 'carousel-caption');
+        const titulo = crearElemento('h5', null, foto.nombre);
+        if (foto.principal) {
+            const badge = crearElemento('span', 'badge badge-warning ml-2', ' Principal');
+            badge.prepend(crearElemento('i', 'bi bi-star'));
+            titulo.appendChild(badge);
+        }
+        caption.appendChild(titulo);
+        let texto = foto.categoria;
+        if (foto.descripcion) {
+            texto += ' - ' + foto.descripcion.slice(0, 100) + (foto.descripcion.length > 100 ? '...' : '');
+        }
+        caption.appendChild(crearElemento('p', 'mb-0', texto));
+        slide.appendChild(caption);
+        slides.appendChild(slide);
+        
+        if (indicators) {
+            const indicator = crearElemento('button', 'carousel-indicator');
+            indicator.dataset.index = index;
+            indicators.appendChild(indicator);
+        }
+    },
+    grid(contenedor, foto) {
+        const item = crearElemento('a', 'gallery-item');
+        item.href = foto.imagen;
+        item.target = '_blank';
+        const img = crearElemento('img', 'gallery-img');
+        img.src = foto.miniatura;
+        img.alt = foto.nombre;
+        img.loading = 'lazy';
+        item.appendChild(img);
+        const caption = crearElemento('div', 'gallery-caption', foto.nombre);
+        if (foto.principal) {
+            caption.appendChild(crearElemento('i', 'fas fa-star ml-1'));
+        }
+        item.appendChild(caption);
+        contenedor.appendChild(item);
+    },
+};
+
+function initGaleriaLazy() {
+    document.querySelectorAll('[data-galeria-url]').forEach((contenedor) => {
+        const render = renderGaleria[contenedor.dataset.galeriaModo];
+        if (!render) return;
+        
+        let pagina = parseInt(contenedor.dataset.galeriaPagina || '1', 10);
+        let hayMas = contenedor.dataset.galeriaHayMas === '1';
+        let cargando = false;
+        let observer = null;
+        
+        async function cargarMas() {
+            if (!hayMas || cargando) return;
+            cargando = true;
+            try {
+                const respuesta = await fetch(`${contenedor.dataset.galeriaUrl}?page=${pagina + 1}`, {
+                    headers: { 'Accept': 'application/json' },
+                });
+                if (!respuesta.ok) throw new Error(respuesta.statusText);
+                const datos = await respuesta.json();
+                datos.fotos.forEach((foto) => render(contenedor, foto));
+                pagina = datos.pagina;
+                hayMas = datos.hay_mas;
+            } catch (error) {
+                // Sin red o error del servidor: dejar la galería como está
+                hayMas = false;
+                console.warn('No se pudo cargar la galería:', error);
+            } finally {
+                cargando = false;
+                if (!hayMas && observer) observer.disconnect();
+            }
+        }
+        
+        contenedor.addEventListener('galeria:cargar-mas', cargarMas);
+        
+        if (!hayMas) return;
+        if ('IntersectionObserver' in window) {
+            // Marcador al final del contenedor: cargar cuando entra en pantalla
+            const marcador = crearElemento('div', 'galeria-marcador');
+            contenedor.after(marcador);
+            observer = new IntersectionObserver((entradas) => {
+                if (entradas.some((entrada) => entrada.isIntersecting)) cargarMas();
+            }, { rootMargin: '200px' });
+            observer.observe(marcador);
+        } else {
+            cargarMas();
+        }
+    });
+}
+
 // Auto-inicializar cuando el DOM esté listo
 document.addEventListener('DOMContentLoaded', function() {
     if (typeof initMuseoEffects === 'function') {
@@ -218,6 +333,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     initObjetosSlider();
+    initGaleriaLazy();
     
     // También puedes reutilizar la función si ya tienes slider
     initSlider('objetosContainer', 'objetos');
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+from . import test_catalogo
+from . import test_imagenes
+from . import test_analitica
+from . import test_galeria
+from . import test_paginas
+from . import test_publicacion
+from . import test_sitemap
+from . import test_ics
+from . import test_snapshot
+from . import test_busqueda
+from . import test_historias
+from . import test_convenios
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import HttpCase, TransactionCase
+from PIL import Image
+from datetime import date, datetime, time, timedelta
+import base64
+import io
+
+
+def imagen_b64(color=(200, 30, 30), tamano=(64, 64), formato='PNG', franjas=0):
+    """Imagen de prueba en base64. Con ``franjas`` se dibujan bandas
+    verticales oscuras, para obtener huellas distintas"""
+    imagen = Image.new('RGB', tamano, color)
+    if franjas:
+        ancho = tamano[0] // (2 * franjas)
+        for franja in range(franjas):
+            imagen.paste((0, 0, 0), (2 * franja * ancho, 0, (2 * franja + 1) * ancho, tamano[1]))
+    salida = io.BytesIO()
+    imagen.save(salida, formato)
+    return base64.b64encode(salida.getvalue())
+
+
+class MuseoDatos:
+    """Museos de prueba y utilidades comunes a las pruebas del módulo"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Museo = cls.env['museo.museo']
+        cls.Objeto = cls.env['museo.objeto']
+        cls.museo = cls.Museo.create({
+            'name': 'Museo de Pruebas',
+            'fecha_creacion': date(2000, 1, 1),
+        })
+        cls.otro_museo = cls.Museo.create({
+            'name': 'Museo Vecino',
+            'fecha_creacion': date(2000, 1, 1),
+        })
+
+    @classmethod
+    def crear_objetos(cls, museo, valores):
+        """Crea un objeto por cada diccionario de ``valores``"""
+        return cls.Objeto.create([dict({
+            'name': f'Objeto {indice:03d}',
+            'museo_id': museo.id,
+            'codigo_inventario': f'PR-{museo.id}-{indice:03d}',
+            'historia': '<p>Historia</p>',
+        }, **vals) for indice, vals in enumerate(valores)])
+
+    @classmethod
+    def crear_historias(cls, museo, valores):
+        """Crea una historia de barrio por cada diccionario de ``valores``"""
+        return cls.env['museo.historia.barrio'].create([dict({
+            'name': f'Relato {indice:02d}',
+            'museo_id': museo.id,
+            'contenido_historico': '<p>Contenido</p>',
+            'barrio': 'Centro',
+        }, **vals) for indice, vals in enumerate(valores)])
+
+    @classmethod
+    def crear_actividad(cls, museo, **vals):
+        """Actividad de una hora que empieza dentro de ``dias`` días"""
+        inicio = datetime.combine(date.today(), time(10)) + timedelta(days=vals.pop('dias', 7))
+        return cls.env['museo.actividad'].create(dict({
+            'name': 'Taller de Pruebas',
+            'museo_id': museo.id,
+            'fecha_inicio': inicio,
+            'fecha_fin': inicio + timedelta(hours=1),
+        }, **vals))
+
+    @classmethod
+    def crear_convenio(cls, museo, dias, **vals):
+        """Convenio vigente que termina dentro de ``dias`` días (negativos
+        si ya terminó)"""
+        return cls.env['museo.convenio'].create(dict({
+            'name': f'Convenio {museo.name} ({dias} días)',
+            'museo_id': museo.id,
+            'fecha_inicio': date(2020, 1, 1),
+            'fecha_fin': date.today() + timedelta(days=dias),
+            'estado': 'vigente',
+        }, **vals))
+
+    def confirmar(self):
+        """Ejecuta lo que el módulo deja para el momento de confirmar la
+        transacción (versiones públicas, relacionadas, cachés) sin confirmarla"""
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        self.env.cr.postcommit.run()
+
+
+class MuseoCommon(MuseoDatos, TransactionCase):
+    pass
+
+
+class MuseoHttpCommon(MuseoDatos, HttpCase):
+    """Para las pruebas de las rutas públicas"""
+
+    def url_open(self, url, *args, **kwargs):
+        # La petición usa otro entorno: debe ver los cambios pendientes
+        self.env.flush_all()
+        return super().url_open(url, *args, **kwargs)
+
+    def get_json(self, url, **kwargs):
+        respuesta = self.url_open(url, **kwargs)
+        self.assertEqual(respuesta.status_code, 200, url)
+        return respuesta.json()
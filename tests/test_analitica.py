@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from .common import MuseoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestAnaliticaColeccion(MuseoCommon):
+
+    def test_analitica_se_refresca_al_confirmar(self):
+        Analitica = self.env['museo.objeto.analitica']
+        objetos = self.crear_objetos(self.museo, [
+            {'categoria': 'historico', 'valor_estimado': 100, 'estado_conservacion': 'bueno'},
+            {'categoria': 'historico', 'valor_estimado': 300, 'estado_conservacion': 'malo'},
+            {'categoria': 'artistico', 'valor_estimado': 0, 'estado_conservacion': 'bueno'},
+        ])
+        self.confirmar()
+        total = Analitica._totales_por_museo([self.museo.id])[self.museo.id]
+        self.assertEqual(total.cantidad, 3)
+        self.assertEqual(total.valor_total, 400)
+        # Los objetos sin valorar no cuentan para el promedio ni la mediana
+        self.assertEqual(total.valor_promedio, 200)
+        self.assertEqual(total.valor_mediana, 200)
+        self.assertEqual((total.cantidad_bueno, total.cantidad_malo), (2, 1))
+        historico = Analitica.search([('museo_id', '=', self.museo.id), ('categoria', '=', 'historico')])
+        self.assertEqual(historico.cantidad, 2)
+
+        objetos[1].active = False
+        self.confirmar()
+        total = Analitica._totales_por_museo([self.museo.id])[self.museo.id]
+        self.assertEqual((total.cantidad, total.valor_total), (2, 100))
+
+
+@tagged('post_install', '-at_install')
+class TestHistorialConservacion(MuseoCommon):
+
+    def test_transiciones_y_tendencia(self):
+        Conservacion = self.env['museo.objeto.conservacion']
+        objeto = self.crear_objetos(self.museo, [{'estado_conservacion': 'bueno'}])
+        objeto.estado_conservacion = 'malo'
+        objeto.estado_conservacion = 'restauracion'
+        # Repetir el mismo estado no es una transición
+        objeto.estado_conservacion = 'restauracion'
+
+        historial = Conservacion.search([('objeto_id', '=', objeto.id)], order='id')
+        self.assertEqual(
+            [(fila.estado_anterior, fila.estado_nuevo, fila.es_degradacion) for fila in historial],
+            [(False, 'bueno', False), ('bueno', 'malo', True), ('malo', 'restauracion', False)],
+        )
+
+        tendencia = Conservacion.get_tendencia_mensual(self.museo.id, meses=3)
+        self.assertEqual(len(tendencia), 3)
+        self.assertEqual(tendencia[0]['degradaciones'], 0, "Los meses sin movimientos aparecen con cero")
+        self.assertEqual(tendencia[-1]['degradaciones'], 1)
+        self.assertEqual(tendencia[-1]['entradas_restauracion'], 1)
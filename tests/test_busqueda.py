@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.addons.museos.controllers import museo_controllers
+from odoo.addons.museos.models.museo_busqueda import _cache_busquedas
+from .common import MuseoCommon, MuseoHttpCommon
+from unittest.mock import patch
+
+
+@tagged('post_install', '-at_install')
+class TestBusqueda(MuseoCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Busqueda = cls.env['museo.busqueda']
+        cls.objetos = cls.crear_objetos(cls.museo, [
+            {'name': 'Collar de zafiro'},
+            {'name': 'Zafiro azul'},
+            {'name': 'Zafiro'},
+        ])
+
+    def setUp(self):
+        super().setUp()
+        _cache_busquedas.clear()
+        self.addCleanup(_cache_busquedas.clear)
+
+    def test_normalizacion_del_texto(self):
+        self.assertEqual(self.Busqueda._normalizar_texto('  Gran \n  ZAFIRO '), 'gran zafiro')
+        self.assertEqual(self.Busqueda._normalizar_texto(' z '), '')
+        self.assertEqual(self.Busqueda.buscar('z'), {'museo': [], 'objeto': [], 'historia': []})
+
+    def test_orden_exacta_prefijo_parcial(self):
+        objetos = self.Busqueda.buscar('zafiro')['objeto']
+        self.assertEqual([titulo for _id, titulo, _detalle, _museo in objetos],
+                         ['Zafiro', 'Zafiro azul', 'Collar de zafiro'])
+        self.assertEqual(objetos[0][3], self.museo.id)
+
+    def test_excluye_museos_archivados(self):
+        self.crear_objetos(self.otro_museo, [{'name': 'Zafiro del vecino'}])
+        self.otro_museo.active = False
+        self.env.flush_all()
+        titulos = [titulo for _id, titulo, _detalle, _museo in self.Busqueda.buscar('zafiro')['objeto']]
+        self.assertNotIn('Zafiro del vecino', titulos)
+
+    def test_variantes_comparten_cache(self):
+        self.Busqueda.buscar('zafiro')
+        self.objetos[2].active = False
+        self.env.flush_all()
+        # Dentro del TTL se sirve el resultado guardado, también para las
+        # variantes de mayúsculas y espacios
+        self.assertEqual(len(self.Busqueda.buscar('  ZAFIRO ')['objeto']), 3)
+        self.assertEqual(len(_cache_busquedas), 1)
+        _cache_busquedas.clear()
+        self.assertEqual(len(self.Busqueda.buscar('zafiro')['objeto']), 2)
+
+
+@tagged('post_install', '-at_install')
+class TestBusquedaPublica(MuseoHttpCommon):
+
+    def setUp(self):
+        super().setUp()
+        _cache_busquedas.clear()
+        self.addCleanup(_cache_busquedas.clear)
+        contadores = patch.dict(museo_controllers._busquedas_por_ip, {'ventana': None, 'contadores': {}})
+        contadores.start()
+        self.addCleanup(contadores.stop)
+
+    def test_limite_de_busquedas_por_ip(self):
+        self.crear_objetos(self.museo, [{'name': 'Zafiro'}])
+        with patch.object(museo_controllers, 'BUSQUEDAS_POR_IP', 2):
+            # Las búsquedas demasiado cortas no consultan ni cuentan
+            self.assertEqual(self.get_json('/museos/buscar/json?q=z')['objetos'], [])
+            for _intento in range(2):
+                objetos = self.get_json('/museos/buscar/json?q=zafiro')['objetos']
+                self.assertEqual(objetos[0]['url'], f'/museos/{self.museo.id}/objetos')
+            respuesta = self.url_open('/museos/buscar/json?q=zafiro')
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(respuesta.headers['Retry-After'], str(museo_controllers.VENTANA_BUSQUEDAS))
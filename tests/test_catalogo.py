@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from datetime import date
+from .common import MuseoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCatalogo(MuseoCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.objetos = cls.crear_objetos(cls.museo, [
+            {'categoria': 'historico', 'estado_conservacion': 'bueno', 'fecha_adquisicion': date(1985, 5, 1)},
+            {'categoria': 'historico', 'estado_conservacion': 'malo', 'fecha_adquisicion': date(1992, 3, 1)},
+            {'categoria': 'artistico', 'estado_conservacion': 'bueno', 'fecha_adquisicion': date(1987, 7, 1)},
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.confirmar()
+
+    def test_facetas_excluyen_su_propio_filtro(self):
+        facetas = self.Objeto.get_facetas_catalogo({'museo_id': self.museo.id, 'categoria': 'historico'})
+        self.assertEqual(facetas['total'], 2)
+        # La faceta filtrada cuenta los objetos del museo sin su propio filtro
+        self.assertEqual(dict(facetas['categoria']), {'artistico': 1, 'historico': 2})
+        self.assertEqual(dict(facetas['estado_conservacion']), {'bueno': 1, 'malo': 1})
+        self.assertEqual(dict(facetas['decada']), {1980: 1, 1990: 1})
+        self.assertEqual(dict(facetas['museo_id']).get(self.museo.id), 2)
+
+    def test_facetas_se_invalidan_al_cambiar_un_objeto(self):
+        filtros = {'museo_id': self.museo.id}
+        self.assertEqual(self.Objeto.get_facetas_catalogo(filtros)['total'], 3)
+        self.objetos[0].active = False
+        self.confirmar()
+        self.assertEqual(self.Objeto.get_facetas_catalogo(filtros)['total'], 2)
+
+    def test_filtros_no_validos_se_descartan(self):
+        normalizar = self.Objeto._normalizar_filtros_catalogo
+        self.assertEqual(normalizar({'categoria': 'inexistente', 'decada': 'abc'}), ())
+        self.assertEqual(normalizar({'decada': '1987'}), (('decada', 1980),))
+        # Fuera del rango de date() la década no se puede filtrar
+        self.assertEqual(normalizar({'decada': '99999'}), ())
+        self.assertEqual(normalizar({'decada': '5'}), ())
+
+
+@tagged('post_install', '-at_install')
+class TestPaginacionPorClave(MuseoCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Dos objetos con el mismo nombre: el id desempata
+        cls.a, cls.b1, cls.b2, cls.c, cls.d = cls.crear_objetos(cls.museo, [
+            {'name': 'A'}, {'name': 'B'}, {'name': 'B'}, {'name': 'C'}, {'name': 'D'},
+        ])
+        cls.filtros = cls.Objeto._normalizar_filtros_catalogo({'museo_id': cls.museo.id})
+
+    def _pagina(self, **kwargs):
+        return self.Objeto._buscar_catalogo(self.filtros, **dict({'limit': 2}, **kwargs))
+
+    def _clave(self, objeto):
+        return objeto.name, objeto.id
+
+    def test_siguiente_y_anterior(self):
+        self.assertEqual(self._pagina(), self.a | self.b1)
+        self.assertEqual(self._pagina(despues=self._clave(self.b1)), self.b2 | self.c)
+        self.assertEqual(self._pagina(antes=self._clave(self.b2)), self.a | self.b1)
+        self.assertFalse(self._pagina(despues=self._clave(self.d)))
+
+    def test_saltos_desde_la_clave_y_desde_el_final(self):
+        # Saltar una página desde el borde de la primera
+        self.assertEqual(self._pagina(despues=self._clave(self.b1), offset=2), self.d)
+        self.assertEqual(self._pagina(antes=self._clave(self.d), offset=2), self.a | self.b1)
+        # La última página, incompleta, se lee desde el final
+        self.assertEqual(self._pagina(limit=1, desde_final=True), self.d)
+        self.assertEqual(self._pagina(offset=1, desde_final=True), self.b2 | self.c)
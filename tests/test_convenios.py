@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import tagged
+from .common import MuseoCommon
+from datetime import timedelta
+
+
+@tagged('post_install', '-at_install')
+class TestConvenios(MuseoCommon):
+
+    def notas_vencidos(self, museo):
+        return museo.message_ids.filtered(lambda mensaje: 'Convenios marcados como vencidos' in mensaje.body)
+
+    def test_vencimientos_con_una_nota_por_museo(self):
+        primero, segundo = self.crear_convenio(self.museo, -10), self.crear_convenio(self.museo, -1)
+        vecino = self.crear_convenio(self.otro_museo, -3)
+        en_curso = self.crear_convenio(self.museo, 5)
+        borrador = self.crear_convenio(self.museo, -5, estado='borrador')
+
+        self.env['museo.convenio']._cron_verificar_vencimientos()
+        self.assertEqual(set((primero | segundo | vecino).mapped('estado')), {'vencido'})
+        self.assertEqual(en_curso.estado, 'vigente')
+        self.assertEqual(borrador.estado, 'borrador')
+
+        [nota] = self.notas_vencidos(self.museo)
+        self.assertIn(primero.name, nota.body)
+        self.assertIn(segundo.name, nota.body)
+        self.assertNotIn(vecino.name, nota.body)
+        self.assertEqual(len(self.notas_vencidos(self.otro_museo)), 1)
+
+        # Una segunda pasada no encuentra nada nuevo
+        self.env['museo.convenio']._cron_verificar_vencimientos()
+        self.assertEqual(len(self.notas_vencidos(self.museo)), 1)
+
+
+@tagged('post_install', '-at_install')
+class TestAvisosConvenio(MuseoCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.Aviso = self.env['museo.convenio.aviso']
+        parametros = self.env['ir.config_parameter'].sudo()
+        parametros.set_param('museos.dias_previos_aviso', 30)
+        parametros.set_param('museos.aviso_vencimiento_convenio', 7)
+
+    def avisos(self, convenio):
+        return [(aviso.nivel, aviso.fecha_fin) for aviso in convenio.aviso_ids.sorted('id')]
+
+    def test_un_aviso_por_nivel_y_fecha_de_fin(self):
+        responsable = self.env['res.partner'].create({'name': 'Responsable', 'email': 'responsable@example.com'})
+        previo = self.crear_convenio(self.museo, 20, responsable_museo=responsable.id)
+        proximo = self.crear_convenio(self.museo, 3)
+        lejano = self.crear_convenio(self.museo, 60)
+
+        self.Aviso._enviar_avisos()
+        self.assertEqual(self.avisos(previo), [('previo', previo.fecha_fin)])
+        self.assertEqual(previo.aviso_ids.destinatario_id, responsable)
+        self.assertEqual(self.avisos(proximo), [('vencimiento', proximo.fecha_fin)])
+        self.assertFalse(lejano.aviso_ids)
+        self.assertEqual(self.env['mail.mail'].search_count([('recipient_ids', 'in', responsable.ids)]), 1)
+        [nota] = self.museo.message_ids.filtered(lambda mensaje: 'Convenios próximos a vencer' in mensaje.body)
+        self.assertIn(proximo.name, nota.body)
+        self.assertNotIn(previo.name, nota.body)
+
+        # Nada se repite en la siguiente ejecución
+        self.Aviso._enviar_avisos()
+        self.assertEqual(len(previo.aviso_ids | proximo.aviso_ids), 2)
+
+        # El convenio que entra en la ventana de vencimiento recibe su
+        # segundo aviso; una prórroga vuelve a avisarse con la fecha nueva
+        previo.fecha_fin = fields.Date.today() + timedelta(days=5)
+        proximo.fecha_fin = fields.Date.today() + timedelta(days=25)
+        self.Aviso._enviar_avisos()
+        self.assertEqual(self.avisos(previo)[1:], [('vencimiento', previo.fecha_fin)])
+        self.assertEqual(self.avisos(proximo)[1:], [('previo', proximo.fecha_fin)])
+
+    def test_aviso_de_vencimiento_no_deja_previo_pendiente(self):
+        convenio = self.crear_convenio(self.museo, 3)
+        self.Aviso._enviar_avisos()
+        self.env['ir.config_parameter'].sudo().set_param('museos.aviso_vencimiento_convenio', 2)
+        # Ya avisado en el nivel más cercano: no se avisa el previo después
+        self.Aviso._enviar_avisos()
+        self.assertEqual(self.avisos(convenio), [('vencimiento', convenio.fecha_fin)])
+
+    def test_parametro_a_cero_desactiva_el_nivel(self):
+        self.env['ir.config_parameter'].sudo().set_param('museos.dias_previos_aviso', 0)
+        previo, proximo = self.crear_convenio(self.museo, 20), self.crear_convenio(self.museo, 3)
+        self.assertEqual(self.Aviso._ventanas_aviso(), {'vencimiento': 7})
+        self.Aviso._enviar_avisos()
+        self.assertFalse(previo.aviso_ids)
+        self.assertEqual(self.avisos(proximo), [('vencimiento', proximo.fecha_fin)])
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError, ValidationError
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+from odoo.tools.image import base64_to_image
+from .common import MuseoCommon, imagen_b64
+import base64
+import io
+import psycopg2
+import zipfile
+
+
+@tagged('post_install', '-at_install')
+class TestFotoPrincipal(MuseoCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Galeria = cls.env['museo.museo.galeria']
+
+    def crear_fotos(self, museo, cantidad, **vals):
+        return self.Galeria.create([dict({
+            'name': f'Foto {indice}',
+            'museo_id': museo.id,
+            'imagen': imagen_b64(tamano=(40, 30)),
+        }, **vals) for indice in range(cantidad)])
+
+    def test_principal_por_referencia(self):
+        foto = self.crear_fotos(self.museo, 1)
+        self.assertFalse(self.museo.galeria_principal_id)
+        foto.action_set_as_principal()
+        self.assertEqual(self.museo.galeria_principal_id, foto)
+        self.assertFalse(self.museo.imagen_principal, "El binario no se copia al museo")
+        self.assertEqual(self.museo._fuente_imagen_principal(), foto)
+        self.assertIn('/museos/imagen/galeria/%s/' % foto.id, self.museo._url_imagen_principal())
+
+        foto.active = False
+        self.assertFalse(self.museo.galeria_principal_id)
+        self.assertEqual(self.museo._fuente_imagen_principal(), self.museo)
+
+    def test_una_principal_por_museo_en_lote(self):
+        with self.assertRaises(ValidationError):
+            self.crear_fotos(self.museo, 2, es_imagen_principal=True)
+        self.crear_fotos(self.museo, 1, es_imagen_principal=True)
+        with self.assertRaises(ValidationError):
+            self.crear_fotos(self.museo, 1, es_imagen_principal=True)
+        # Una principal por museo en el mismo lote sí es válida
+        self.crear_fotos(self.otro_museo, 1, es_imagen_principal=True)
+        fotos = self.crear_fotos(self.otro_museo, 2)
+        with self.assertRaises(ValidationError):
+            fotos.write({'es_imagen_principal': True})
+
+    def test_indice_unico_parcial(self):
+        fotos = self.crear_fotos(self.museo, 2)
+        fotos.flush_recordset()
+        with mute_logger('odoo.sql_db'), self.assertRaises(psycopg2.IntegrityError), self.env.cr.savepoint():
+            self.env.cr.execute(
+                "UPDATE museo_museo_galeria SET es_imagen_principal = TRUE WHERE id = ANY(%s)", [fotos.ids]
+            )
+        # Las archivadas no cuentan
+        fotos[1].write({'active': False})
+        fotos.flush_recordset()
+        self.env.cr.execute(
+            "UPDATE museo_museo_galeria SET es_imagen_principal = TRUE WHERE id = ANY(%s)", [fotos.ids]
+        )
+
+    def test_migracion_deja_una_principal(self):
+        fotos = self.crear_fotos(self.museo, 3)
+        fotos[2].sequence = 1
+        fotos.flush_recordset()
+        self.env.cr.execute("DROP INDEX museo_museo_galeria_principal_unica")
+        self.env.cr.execute(
+            "UPDATE museo_museo_galeria SET es_imagen_principal = TRUE WHERE id = ANY(%s)", [fotos.ids]
+        )
+        self.Galeria.init()
+        fotos.invalidate_recordset()
+        self.museo.invalidate_recordset()
+        # Se conserva la primera en el orden de la galería
+        self.assertEqual(fotos.filtered('es_imagen_principal'), fotos[2])
+        self.assertEqual(self.museo.galeria_principal_id, fotos[2])
+        self.env.cr.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'museo_museo_galeria_principal_unica'")
+        self.assertTrue(self.env.cr.fetchone())
+
+
+@tagged('post_install', '-at_install')
+class TestCargaGaleria(MuseoCommon):
+
+    def _zip(self, archivos):
+        contenido = io.BytesIO()
+        with zipfile.ZipFile(contenido, 'w') as archivo_zip:
+            for nombre, datos in archivos.items():
+                archivo_zip.writestr(nombre, datos)
+        return base64.b64encode(contenido.getvalue())
+
+    def test_carga_zip(self):
+        archivo_zip = self._zip({
+            'sala/b_fachada.png': base64.b64decode(imagen_b64(tamano=(3000, 2000))),
+            'a_patio.png': base64.b64decode(imagen_b64(color=(10, 120, 10))),
+            'rota.jpg': b'no es una imagen',
+            'notas.txt': b'se ignora',
+            '__MACOSX/._a_patio.png': b'se ignora',
+        })
+        asistente = self.env['museo.wizard.carga.galeria'].create({
+            'museo_id': self.museo.id,
+            'archivo_zip': archivo_zip,
+            'categoria': 'interior',
+        })
+        resultado = asistente.action_cargar()
+
+        fotos = self.env['museo.museo.galeria'].search([('museo_id', '=', self.museo.id)], order='sequence')
+        # En el orden del ZIP, con la imagen grande ya reducida a portada
+        self.assertEqual(fotos.mapped('name'), ['b_fachada', 'a_patio'])
+        self.assertEqual(fotos.mapped('categoria'), ['interior', 'interior'])
+        self.assertEqual(max(base64_to_image(fotos[0].imagen).size), 1920)
+        self.assertTrue(all(fotos.mapped('imagen_phash')))
+        self.assertEqual(resultado['params']['type'], 'warning')
+        self.assertIn('rota.jpg', resultado['params']['message'])
+
+    def test_limite_de_archivos(self):
+        Asistente = self.env['museo.wizard.carga.galeria']
+        archivo_zip = self._zip({
+            f'foto_{indice}.png': b'' for indice in range(Asistente._max_archivos + 1)
+        })
+        asistente = Asistente.create({'museo_id': self.museo.id, 'archivo_zip': archivo_zip})
+        with self.assertRaises(UserError):
+            asistente.action_cargar()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.addons.museos.models import historia_barrio_model
+from odoo.addons.museos.models.historia_barrio_model import LONGITUD_EXTRACTO, PALABRAS_POR_MINUTO
+from .common import MuseoCommon, MuseoHttpCommon
+from unittest.mock import patch
+
+
+@tagged('post_install', '-at_install')
+class TestExtractos(MuseoCommon):
+
+    def test_extracto_en_texto_plano(self):
+        historia = self.crear_historias(self.museo, [{
+            'contenido_historico': '<p>La plaza</p><p>Los vecinos <a href="/museos">recuerdan</a>\n\n'
+                                   '<span>la feria</span> de los domingos.</p>',
+            'testimonios': 'Yo vendía\n   flores\tallí.',
+        }])
+        self.assertEqual(historia.extracto, 'La plaza Los vecinos recuerdan la feria de los domingos.')
+        self.assertEqual(historia.extracto_testimonio, 'Yo vendía flores allí.')
+        self.assertEqual(historia.palabras, 10)
+        self.assertEqual(historia.minutos_lectura, 1)
+
+    def test_recorte_en_limite_de_palabra(self):
+        palabras = ['palabra'] * (2 * PALABRAS_POR_MINUTO + 1)
+        historia = self.crear_historias(self.museo, [{'contenido_historico': f"<p>{' '.join(palabras)}</p>"}])
+        self.assertLessEqual(len(historia.extracto), LONGITUD_EXTRACTO + 1)
+        self.assertTrue(historia.extracto.endswith('palabra…'))
+        self.assertEqual(historia.minutos_lectura, 3)
+
+        historia.contenido_historico = '<p>Breve.</p>'
+        self.assertEqual(historia.extracto, 'Breve.')
+        self.assertEqual(historia.minutos_lectura, 1)
+
+    def test_recortar_quita_la_puntuacion_final(self):
+        Historia = self.env['museo.historia.barrio']
+        self.assertEqual(Historia._recortar('uno, dos, tres', 9), 'uno…')
+        self.assertEqual(Historia._recortar('uno dos', 7), 'uno dos')
+
+
+@tagged('post_install', '-at_install')
+class TestRelacionadas(MuseoCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Relacionada = cls.env['museo.historia.relacionada']
+        cls.origen, cls.mismo_museo = cls.crear_historias(cls.museo, [
+            {'name': 'Alfa', 'barrio': 'Pruebas Uno', 'ciudad': 'Ciudad de Pruebas'},
+            {'name': 'Bravo', 'barrio': 'Pruebas Dos', 'ciudad': 'Otra Ciudad'},
+        ])
+        cls.mismo_barrio, cls.misma_ciudad = cls.crear_historias(cls.otro_museo, [
+            {'name': 'Charlie', 'barrio': 'pruebas uno', 'ciudad': 'Otra Ciudad'},
+            {'name': 'Delta', 'barrio': 'Pruebas Tres', 'ciudad': 'Ciudad de Pruebas'},
+        ])
+
+    def test_orden_por_barrio_museo_y_ciudad(self):
+        self.confirmar()
+        self.assertEqual(self.Relacionada._ids_relacionadas(self.origen.id),
+                         [self.mismo_barrio.id, self.mismo_museo.id, self.misma_ciudad.id])
+        # La puntuación es simétrica: la vecina también ve a la historia
+        self.assertIn(self.origen.id, self.Relacionada._ids_relacionadas(self.mismo_barrio.id))
+
+    def test_cambios_refrescan_las_relacionadas(self):
+        self.confirmar()
+        self.misma_ciudad.barrio = 'Pruebas Uno'
+        self.confirmar()
+        self.assertEqual(self.Relacionada._ids_relacionadas(self.origen.id),
+                         [self.misma_ciudad.id, self.mismo_barrio.id, self.mismo_museo.id])
+
+        # Las historias de museos archivados dejan de sugerirse
+        self.otro_museo.active = False
+        self.confirmar()
+        self.assertEqual(self.Relacionada._ids_relacionadas(self.origen.id), [self.mismo_museo.id])
+
+
+@tagged('post_install', '-at_install')
+class TestMapa(MuseoCommon):
+
+    # Recuadro en medio del Pacífico, lejos de las historias de demostración
+    RECUADRO = (-150, -40, -140, -30)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Historia = cls.env['museo.historia.barrio']
+        cls.ubicadas = cls.crear_historias(cls.museo, [
+            {'name': f'Isla {indice}', 'ciudad': 'Ninguna', 'latitud': -35.0, 'longitud': -145.0 + indice}
+            for indice in range(4)
+        ])
+
+    def test_ubicacion_por_nomenclator(self):
+        barrio, ciudad, desconocida = self.crear_historias(self.museo, [
+            {'ciudad': ' QUITO ', 'barrio': 'san  marcos'},
+            {'ciudad': 'Quito', 'barrio': 'Barrio Inventado'},
+            {'ciudad': 'Ciudad Inventada', 'barrio': 'Barrio Inventado'},
+        ])
+        self.assertEqual((barrio.precision_ubicacion, barrio.latitud, barrio.longitud), ('barrio', -0.2221, -78.5079))
+        self.assertEqual((ciudad.precision_ubicacion, ciudad.latitud, ciudad.longitud), ('ciudad', -0.2202, -78.5123))
+        self.assertFalse(desconocida.precision_ubicacion)
+        self.assertEqual(self.ubicadas[0].precision_ubicacion, 'manual')
+
+        # Corregir las coordenadas a mano las marca como manuales; cambiar el
+        # barrio vuelve a geocodificar
+        barrio.latitud = -0.3
+        self.assertEqual(barrio.precision_ubicacion, 'manual')
+        barrio.barrio = 'La Loma Grande'
+        self.assertEqual((barrio.precision_ubicacion, barrio.latitud), ('barrio', -0.2251))
+
+    def test_agrupacion_por_zoom(self):
+        self.env.flush_all()
+        detalle = self.Historia._agrupar_mapa(*self.RECUADRO, 20)
+        self.assertEqual(sorted(grupo['id'] for grupo in detalle), self.ubicadas.ids)
+        self.assertTrue(all(grupo['total'] == 1 for grupo in detalle))
+
+        [grupo] = self.Historia._agrupar_mapa(*self.RECUADRO, 0)
+        self.assertEqual(grupo['total'], 4)
+        self.assertNotIn('id', grupo)
+        self.assertAlmostEqual(grupo['longitud'], -143.5)
+
+    def test_rejilla_se_agranda_sin_perder_historias(self):
+        self.env.flush_all()
+        with patch.object(historia_barrio_model, 'MAXIMO_GRUPOS_MAPA', 2):
+            grupos = self.Historia._agrupar_mapa(*self.RECUADRO, 20)
+        self.assertLessEqual(len(grupos), 2)
+        self.assertEqual(sum(grupo['total'] for grupo in grupos), 4)
+
+    def test_excluye_museos_archivados(self):
+        self.museo.active = False
+        self.env.flush_all()
+        self.assertEqual(self.Historia._agrupar_mapa(*self.RECUADRO, 20), [])
+
+
+@tagged('post_install', '-at_install')
+class TestMapaPublico(MuseoHttpCommon):
+
+    def test_parametros_del_mapa(self):
+        self.crear_historias(self.museo, [{'ciudad': 'Ninguna', 'latitud': -35.0, 'longitud': -145.0}])
+        datos = self.get_json('/museos/historias/mapa.json?bbox=-150,-40,-140,-30&zoom=25')
+        self.assertEqual([grupo['total'] for grupo in datos['grupos']], [1])
+        for bbox in ('-150,-40,-140', 'a,b,c,d', '-140,-40,-150,-30', '-150,-95,-140,-30'):
+            respuesta = self.url_open(f'/museos/historias/mapa.json?bbox={bbox}')
+            self.assertEqual(respuesta.status_code, 400, bbox)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.addons.museos.models.actividad_model import _plegar_ics, _texto_ics
+from .common import MuseoCommon
+
+
+def desplegar(feed):
+    """Deshace el plegado de líneas de un feed (RFC 5545, 3.1)"""
+    return feed.replace('\r\n ', '').split('\r\n')
+
+
+@tagged('post_install', '-at_install')
+class TestFeedIcs(MuseoCommon):
+
+    def test_escapado(self):
+        self.assertEqual(_texto_ics('Sala 1; planta 2, ala\\norte\nsegunda línea'),
+                         'Sala 1\\; planta 2\\, ala\\\\norte\\nsegunda línea')
+        self.assertEqual(_texto_ics(False), '')
+
+    def test_plegado_por_octetos(self):
+        linea = 'DESCRIPTION:' + 'Año de la fundación ñandú ' * 10
+        plegada = _plegar_ics(linea)
+        partes = plegada.split('\r\n')
+        self.assertGreater(len(partes), 1)
+        self.assertTrue(all(len(parte.encode()) <= 75 for parte in partes))
+        self.assertTrue(all(parte.startswith(' ') for parte in partes[1:]))
+        self.assertEqual(desplegar(plegada), [linea])
+        self.assertEqual(_plegar_ics('SUMMARY:corta'), 'SUMMARY:corta')
+
+    def test_feed_del_museo(self):
+        Actividad = self.env['museo.actividad']
+        publicada = self.crear_actividad(self.museo, name='Taller; grabado, xilografía', sala='Sala A',
+                                         descripcion='<p>' + 'Técnicas de impresión. ' * 8 + '</p>')
+        self.crear_actividad(self.museo, name='Cancelada', estado='cancelada')
+        self.crear_actividad(self.museo, name='Lejana', dias=400)
+        self.crear_actividad(self.otro_museo, name='De otro museo')
+        self.confirmar()
+
+        feed = Actividad.get_ics(self.museo.id).decode()
+        self.assertTrue(feed.endswith('END:VCALENDAR\r\n'))
+        self.assertTrue(all(len(linea.encode()) <= 75 for linea in feed.split('\r\n')))
+        lineas = desplegar(feed)
+        self.assertEqual([linea for linea in lineas if linea.startswith('SUMMARY:')],
+                         ['SUMMARY:Taller\\; grabado\\, xilografía'])
+        self.assertIn(f'LOCATION:Sala A\\, {self.museo.name}', lineas)
+        self.assertIn(f'UID:museo-actividad-{publicada.id}@', feed)
+
+        # El feed cacheado se regenera al cambiar una actividad publicada
+        publicada.name = 'Taller renovado'
+        self.confirmar()
+        self.assertIn('SUMMARY:Taller renovado', desplegar(Actividad.get_ics(self.museo.id).decode()))
+        # El feed de la red incluye todos los museos activos
+        self.assertIn('SUMMARY:De otro museo', desplegar(Actividad.get_ics().decode()))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tools.image import base64_to_image
+from odoo.addons.museos.models.museo_imagen_mixin import valores_huella
+from .common import MuseoCommon, imagen_b64
+
+
+@tagged('post_install', '-at_install')
+class TestVariantesImagen(MuseoCommon):
+
+    def test_variantes_reducidas_al_guardar(self):
+        objeto = self.crear_objetos(self.museo, [{'imagen': imagen_b64(tamano=(2400, 1200))}])
+        tamanos = {
+            'imagen_miniatura': 256,
+            'imagen_tarjeta': 512,
+            'imagen_portada': 1920,
+        }
+        for campo, maximo in tamanos.items():
+            self.assertEqual(max(base64_to_image(objeto[campo]).size), maximo, campo)
+        self.assertFalse(objeto.imagen_tarjeta_webp, "Sin la opción no se generan variantes WebP")
+
+    def test_variantes_webp_segun_configuracion(self):
+        self.env['ir.config_parameter'].sudo().set_param('museos.generar_webp', 'True')
+        objeto = self.crear_objetos(self.museo, [{'imagen': imagen_b64(tamano=(800, 600))}])
+        self.assertEqual(base64_to_image(objeto.imagen_tarjeta_webp).format, 'WEBP')
+
+
+@tagged('post_install', '-at_install')
+class TestHuellaImagen(MuseoCommon):
+
+    def _fijar_huellas(self, registros, valores):
+        """Fija las huellas directamente, sin depender de la imagen"""
+        for registro, valor in zip(registros, valores):
+            registro.write(valores_huella(valor))
+
+    def _pares(self, distancia_maxima, registros):
+        ids = set(registros.ids)
+        return {
+            (id_a, id_b): distancia
+            for _modelo_a, id_a, _modelo_b, id_b, distancia
+            in self.env['museo.wizard.duplicados.imagen']._buscar_pares(distancia_maxima, 0)
+            if {id_a, id_b} <= ids
+        }
+
+    def test_bandas_de_la_huella(self):
+        valores = valores_huella(0x0123456789abcdef)
+        self.assertEqual(valores['imagen_phash'], '0123456789abcdef')
+        self.assertEqual(
+            [valores[f'imagen_phash_b{banda}'] for banda in range(4)],
+            [0x0123, 0x4567, 0x89ab, 0xcdef],
+        )
+
+    def test_imagenes_iguales_comparten_huella(self):
+        objetos = self.crear_objetos(self.museo, [
+            {'imagen': imagen_b64(franjas=3)},
+            {'imagen': imagen_b64(franjas=3)},
+            {'imagen': imagen_b64(franjas=5)},
+        ])
+        self.assertTrue(objetos[0].imagen_phash)
+        self.assertEqual(objetos[0].imagen_phash, objetos[1].imagen_phash)
+        self.assertNotEqual(objetos[0].imagen_phash, objetos[2].imagen_phash)
+
+    def test_busqueda_por_bandas(self):
+        objetos = self.crear_objetos(self.museo, [{}, {}, {}, {}])
+        un_bit_por_banda = 0x0001000100010001
+        dos_bits_por_banda = 0x0003000300030003
+        self._fijar_huellas(objetos, [0, 0b11, un_bit_por_banda, dos_bits_por_banda])
+        a, b, c, d = objetos.ids
+
+        # Distancia 2 sin bandas distintas: coinciden tres bandas exactas
+        self.assertEqual(self._pares(2, objetos), {(a, b): 2})
+        # Distancia 4 con un bit en cada banda: ninguna banda coincide y el
+        # par solo se encuentra probando las bandas a un bit
+        pares = self._pares(4, objetos)
+        self.assertEqual(pares.get((a, c)), 4)
+        self.assertNotIn((a, d), pares)
+        # Dos bits por banda (distancia 8) quedan fuera del máximo de 7
+        self.assertNotIn((a, d), self._pares(7, objetos))
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.addons.museos.controllers.museo_controllers import FOTOS_POR_PAGINA, OBJETOS_POR_PAGINA
+from .common import MuseoHttpCommon, imagen_b64
+import base64
+import html
+import re
+
+
+@tagged('post_install', '-at_install')
+class TestGaleriaPaginada(MuseoHttpCommon):
+
+    def test_paginas_de_la_galeria(self):
+        self.env['museo.museo.galeria'].create([{
+            'name': f'Foto {indice}',
+            'museo_id': self.museo.id,
+            'imagen': imagen_b64(tamano=(20, 20)),
+            'sequence': indice,
+        } for indice in range(FOTOS_POR_PAGINA + 2)])
+        url = f'/museos/{self.museo.id}/galeria/json'
+
+        primera = self.get_json(url)
+        self.assertEqual(primera['total'], FOTOS_POR_PAGINA + 2)
+        self.assertEqual(len(primera['fotos']), FOTOS_POR_PAGINA)
+        self.assertTrue(primera['hay_mas'])
+        self.assertEqual(primera['fotos'][0]['nombre'], 'Foto 0')
+
+        segunda = self.get_json(url + '?page=2')
+        self.assertEqual([foto['nombre'] for foto in segunda['fotos']],
+                         [f'Foto {indice}' for indice in range(FOTOS_POR_PAGINA, FOTOS_POR_PAGINA + 2)])
+        self.assertFalse(segunda['hay_mas'])
+
+        # Una página enorme no llega a consultar con ese offset
+        lejana = self.get_json(url + '?page=%s' % 10 ** 18)
+        self.assertEqual(lejana['fotos'], [])
+        self.assertEqual(self.url_open(url + '?page=x').json()['pagina'], 1)
+
+
+@tagged('post_install', '-at_install')
+class TestImagenesPublicas(MuseoHttpCommon):
+
+    def test_url_versionada_e_inmutable(self):
+        objeto = self.crear_objetos(self.museo, [{'imagen': imagen_b64(tamano=(900, 600))}])
+        url = objeto._url_imagen('tarjeta')
+        self.assertTrue(url.startswith(f'/museos/imagen/objeto/{objeto.id}/tarjeta/'))
+        self.assertIn(f'{url} 512w', objeto._srcset_imagen())
+
+        respuesta = self.url_open(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('immutable', respuesta.headers['Cache-Control'])
+
+        # Una versión antigua redirige a la actual
+        antigua = self.url_open(url.rsplit('/', 1)[0] + '/0000000000000000', allow_redirects=False)
+        self.assertIn(antigua.status_code, (301, 302, 303))
+        self.assertTrue(antigua.headers['Location'].endswith(url))
+
+    def test_imagenes_no_publicas(self):
+        objeto = self.crear_objetos(self.museo, [{'imagen': imagen_b64()}])
+        url = objeto._url_imagen('miniatura')
+        objeto.active = False
+        self.assertEqual(self.url_open(url).status_code, 404)
+        self.assertEqual(self.url_open(f'/museos/imagen/desconocida/{objeto.id}/miniatura/x').status_code, 404)
+        # Los contactos que no son personal del museo no exponen su foto
+        contacto = self.env['res.partner'].create({'name': 'Contacto', 'image_1920': imagen_b64()})
+        self.assertEqual(self.url_open(f'/museos/imagen/trabajador/{contacto.id}/miniatura/x').status_code, 404)
+
+
+@tagged('post_install', '-at_install')
+class TestSeccionesAcotadas(MuseoHttpCommon):
+
+    def test_portada_y_listado_de_historias(self):
+        historias = self.crear_historias(self.museo, [{}] * 8)
+        portada = self.url_open(f'/museos/{self.museo.id}')
+        self.assertEqual(portada.status_code, 200)
+        # La portada muestra solo las primeras y enlaza al listado completo
+        self.assertEqual(sum(historia.name in portada.text for historia in historias), 6)
+        self.assertIn(f'/museos/{self.museo.id}/historias', portada.text)
+
+        listado = self.url_open(f'/museos/{self.museo.id}/historias')
+        self.assertEqual(listado.status_code, 200)
+        self.assertTrue(all(historia.name in listado.text for historia in historias))
+
+
+@tagged('post_install', '-at_install')
+class TestGetCondicional(MuseoHttpCommon):
+
+    def test_museo_no_modificado(self):
+        url = f'/museos/{self.museo.id}'
+        primera = self.url_open(url)
+        self.assertEqual(primera.status_code, 200)
+        etag, modificado = primera.headers['ETag'], primera.headers['Last-Modified']
+        self.assertTrue(etag.startswith('W/'))
+
+        self.assertEqual(self.url_open(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.url_open(url, headers={'If-Modified-Since': modificado}).status_code, 304)
+
+        # Un cambio publicado invalida la copia del cliente
+        self.crear_historias(self.museo, [{}])
+        self.confirmar()
+        cambiada = self.url_open(url, headers={'If-None-Match': etag})
+        self.assertEqual(cambiada.status_code, 200)
+        self.assertNotEqual(cambiada.headers['ETag'], etag)
+
+    def test_catalogo_no_modificado(self):
+        self.crear_objetos(self.museo, [{}])
+        url = f'/museos/{self.museo.id}/objetos'
+        etag = self.url_open(url).headers['ETag']
+        self.assertEqual(self.url_open(url, headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.url_open(url, headers={'If-None-Match': 'W/"otra"'}).status_code, 200)
+
+
+@tagged('post_install', '-at_install')
+class TestApiMuseos(MuseoHttpCommon):
+
+    def _cursor(self, museo_id):
+        return base64.urlsafe_b64encode(str(museo_id).encode()).decode()
+
+    def test_paginacion_por_cursor(self):
+        self.otro_museo.active = False
+        tercero = self.Museo.create({'name': 'Tercer Museo', 'fecha_creacion': '2001-01-01'})
+
+        primera = self.get_json(f'/api/museos?limit=1&cursor={self._cursor(self.museo.id - 1)}')
+        self.assertEqual(primera['datos'], [{
+            'id': self.museo.id,
+            'name': self.museo.name,
+            'total_objetos': 0,
+            'url': f'/museos/{self.museo.id}',
+        }])
+        # Los museos archivados se saltan
+        segunda = self.get_json(f"/api/museos?limit=1&cursor={primera['siguiente']}")
+        self.assertEqual([dato['id'] for dato in segunda['datos']], [tercero.id])
+
+    def test_seleccion_de_campos(self):
+        datos = self.get_json(
+            f'/api/museos?limit=1&cursor={self._cursor(self.museo.id - 1)}&fields=fecha_creacion,descripcion_corta'
+        )['datos']
+        self.assertEqual(datos, [{'id': self.museo.id, 'fecha_creacion': '2000-01-01', 'descripcion_corta': ''}])
+
+    def test_parametros_no_validos(self):
+        for consulta in ('fields=name,clave_secreta', 'limit=abc', 'cursor=%%%'):
+            respuesta = self.url_open(f'/api/museos?{consulta}')
+            self.assertEqual(respuesta.status_code, 400, consulta)
+            self.assertIn('error', respuesta.json())
+
+
+@tagged('post_install', '-at_install')
+class TestCatalogoPaginado(MuseoHttpCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Nueve páginas: la quinta queda lejos de ambos extremos
+        cls.objetos = cls.crear_objetos(cls.museo, [
+            {'name': f'Pieza {indice:03d}'} for indice in range(8 * OBJETOS_POR_PAGINA + 1)
+        ])
+
+    def _nombres(self, html):
+        return re.findall(r'Pieza \d{3}', html)
+
+    def test_enlaces_con_clave(self):
+        url = f'/museos/{self.museo.id}/objetos'
+        primera = self.url_open(url)
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(self._nombres(primera.text), self.objetos[:OBJETOS_POR_PAGINA].mapped('name'))
+
+        # El enlace a la página 3 parte de la clave del último objeto y salta una página
+        enlace = re.search(r'href="(/museos/%s/objetos/page/3\?[^"]+)"' % self.museo.id, primera.text)
+        self.assertTrue(enlace)
+        destino = html.unescape(enlace.group(1))
+        self.assertIn('despues=', destino)
+        self.assertIn('salto=1', destino)
+        tercera = self.url_open(destino)
+        self.assertEqual(self._nombres(tercera.text),
+                         self.objetos[2 * OBJETOS_POR_PAGINA:3 * OBJETOS_POR_PAGINA].mapped('name'))
+
+    def test_paginas_sin_clave(self):
+        url = f'/museos/{self.museo.id}/objetos/page/%s'
+        # La última se lee desde el final
+        ultima = self.url_open(url % 9)
+        self.assertEqual(self._nombres(ultima.text), [self.objetos[-1].name])
+        # Las del medio necesitan clave: sin ella se vuelve a la primera
+        medio = self.url_open(url % 5, allow_redirects=False)
+        self.assertIn(medio.status_code, (301, 302, 303))
+        self.assertTrue(medio.headers['Location'].endswith(f'/museos/{self.museo.id}/objetos'))
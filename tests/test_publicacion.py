@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from .common import MuseoCommon
+
+
+@tagged('post_install', '-at_install')
+class TestVersionPublica(MuseoCommon):
+
+    def test_una_version_por_museo_y_transaccion(self):
+        self.confirmar()
+        version, otra_version = self.museo.version_publica, self.otro_museo.version_publica
+        objetos = self.crear_objetos(self.museo, [{}, {}])
+        objetos[0].name = 'Renombrado'
+        objetos[1].unlink()
+        self.confirmar()
+        self.assertEqual(self.museo.version_publica, version + 1)
+        self.assertEqual(self.otro_museo.version_publica, otra_version)
+
+    def test_traslado_cambia_ambos_museos(self):
+        objeto = self.crear_objetos(self.museo, [{}])
+        self.confirmar()
+        version, otra_version = self.museo.version_publica, self.otro_museo.version_publica
+        objeto.museo_id = self.otro_museo
+        self.confirmar()
+        self.assertEqual(self.museo.version_publica, version + 1)
+        self.assertEqual(self.otro_museo.version_publica, otra_version + 1)
+
+
+@tagged('post_install', '-at_install')
+class TestEquipoMuseo(MuseoCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Partner = cls.env['res.partner']
+        cls.ana, cls.bruno = cls.Partner.create([
+            {'name': 'Ana', 'is_trabajador_museo': True},
+            {'name': 'Bruno', 'is_trabajador_museo': True},
+        ])
+        cls.actividad = cls.crear_actividad(cls.museo, trabajadores_ids=[(6, 0, (cls.bruno | cls.ana).ids)])
+
+    def setUp(self):
+        super().setUp()
+        self.confirmar()
+
+    def test_equipo_cacheado_e_invalidado(self):
+        self.assertEqual(self.Partner._get_ids_trabajadores_museo(self.museo.id), (self.ana.id, self.bruno.id))
+        self.ana.name = 'Zoe'
+        self.confirmar()
+        self.assertEqual(self.Partner._get_ids_trabajadores_museo(self.museo.id), (self.bruno.id, self.ana.id))
+        self.bruno.is_trabajador_museo = False
+        self.confirmar()
+        self.assertEqual(self.Partner._get_ids_trabajadores_museo(self.museo.id), (self.ana.id,))
+        self.assertEqual(self.Partner._get_ids_trabajadores_museo(self.otro_museo.id), ())
+
+    def test_cambios_ajenos_a_la_tarjeta(self):
+        version = self.museo.version_publica
+        self.ana.comment = 'Nota interna'
+        self.confirmar()
+        self.assertEqual(self.museo.version_publica, version)
+        self.ana.cargo = 'Conservadora'
+        self.confirmar()
+        self.assertEqual(self.museo.version_publica, version + 1)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.addons.museos.controllers import museo_controllers
+from odoo.addons.museos.controllers.museo_controllers import (
+    OBJETOS_POR_PAGINA, sitemap_historias, sitemap_museos, sitemap_objetos,
+)
+from .common import MuseoCommon
+from datetime import datetime
+from unittest.mock import patch
+
+
+@tagged('post_install', '-at_install')
+class TestSitemap(MuseoCommon):
+
+    def _locs(self, generador, qs=None):
+        return {loc['loc']: loc.get('lastmod') for loc in generador(self.env, None, qs)}
+
+    def test_museos_activos_con_fecha_de_publicacion(self):
+        self.otro_museo.active = False
+        self.museo.fecha_publicacion = datetime(2024, 5, 17, 12)
+        self.env.flush_all()
+        locs = self._locs(sitemap_museos)
+        self.assertEqual(locs[f'/museos/{self.museo.id}'].isoformat(), '2024-05-17')
+        self.assertNotIn(f'/museos/{self.otro_museo.id}', locs)
+        self.assertEqual(list(self._locs(sitemap_museos, qs=f'/museos/{self.museo.id}')), [f'/museos/{self.museo.id}'])
+
+    def test_version_publica_mueve_la_fecha_de_publicacion(self):
+        self.museo.fecha_publicacion = datetime(2020, 1, 1)
+        self.env.flush_all()
+        self.env.cr.execute("SELECT write_date FROM museo_museo WHERE id = %s", [self.museo.id])
+        modificado = self.env.cr.fetchone()[0]
+        self.Museo._incrementar_version_publica([self.museo.id])
+        self.assertGreater(self.museo.fecha_publicacion, datetime(2020, 1, 1))
+        self.env.cr.execute("SELECT write_date FROM museo_museo WHERE id = %s", [self.museo.id])
+        self.assertEqual(self.env.cr.fetchone()[0], modificado, "write_date queda para los cambios del museo")
+
+    def test_paginas_del_catalogo(self):
+        self.crear_objetos(self.museo, [{}] * (9 * OBJETOS_POR_PAGINA))
+        self.env.flush_all()
+        paginas = sorted(
+            int(loc.rsplit('/', 1)[1]) if '/page/' in loc else 1
+            for loc in self._locs(sitemap_objetos, qs=f'/museos/{self.museo.id}/objetos')
+        )
+        # Solo las páginas servidas sin clave: tres más allá de cada extremo
+        self.assertEqual(paginas, [1, 2, 3, 4, 6, 7, 8, 9])
+
+    def test_historias_por_lotes(self):
+        historias = self.crear_historias(self.museo, [{}] * 5)
+        archivada = self.crear_historias(self.otro_museo, [{}])
+        self.otro_museo.active = False
+        self.env.flush_all()
+        with patch.object(museo_controllers, 'SITEMAP_LOTE', 2):
+            locs = self._locs(sitemap_historias)
+        self.assertLessEqual({f'/historia/barrio/{historia.id}' for historia in historias}, set(locs))
+        self.assertNotIn(f'/historia/barrio/{archivada.id}', locs, "Las historias de museos archivados no se publican")